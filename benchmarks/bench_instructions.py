@@ -0,0 +1,62 @@
+import timeit
+import tracemalloc
+
+from swml import AI, DataMap
+from swml.SWMLTypes import Instruction
+
+
+class DictInstruction:
+    # The Instruction layout before __slots__, kept here as the baseline
+    def __init__(self, class_name: str = None, **kwargs):
+        self.name = class_name
+        self.params = {k: v for k, v in kwargs.items() if v is not None and k != 'class_name'}
+
+
+def build_ai(functions: int = 100, properties: int = 5, expressions: int = 5):
+    # A realistic agent: every function has typed arguments and a data map answering a few patterns
+    return AI(
+        voice="en-US-Neural2-F",
+        prompt=AI.PromptParams(text="You are a support agent for a large retailer.", temperature=0.3),
+        params=AI.AIParams(direction="inbound", wait_for_user=True, end_of_speech_timeout=500),
+        SWAIG=AI.SWAIGParams(
+            defaults=AI.SWAIGDefaults(web_hook_url="https://example.com/swaig"),
+            functions=[AI.SWAIGFunction(
+                function=f"function_{index}",
+                purpose=f"Look up record {index} for the caller",
+                argument=AI.SWAIGFunction.FunctionArgs(type_="object", properties={
+                    f"property_{number}": AI.SWAIGFunction.FunctionArgs.PropertyDetail(
+                        type_="string", description=f"Property {number}")
+                    for number in range(properties)}),
+                data_map=DataMap(expressions=[DataMap.Expressions(
+                    string="${args.property_0}", pattern=f"^value_{number}$",
+                    output=DataMap.Expressions.DataMapExpressionOutput(response=f"Matched {number}"))
+                    for number in range(expressions)]))
+                for index in range(functions)]),
+        hints=[f"hint {index}" for index in range(100)],
+        languages=[AI.LanguageParams(name="English", code="en-US", voice="en-US-Neural2-F", fillers=["um", "uh"])])
+
+
+def measure_memory(factory, count: int):
+    tracemalloc.start()
+    objects = [factory() for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / count
+
+
+def main(number: int = 20, count: int = 100000):
+    seconds = timeit.timeit(build_ai, number=number)
+    print(f"AI config: {number / seconds:.1f} builds/s, {measure_memory(build_ai, 5) / 1024:.1f} KiB per config")
+
+    for label, instruction_class in (('dict layout', DictInstruction), ('slots layout', Instruction)):
+        def factory():
+            return instruction_class(type='string', description='Property')
+
+        seconds = timeit.timeit(factory, number=count)
+        print(f"{label:>12}: {count / seconds:,.0f} instances/s, "
+              f"{measure_memory(factory, count):.0f} bytes per instance")
+
+
+if __name__ == '__main__':
+    main()
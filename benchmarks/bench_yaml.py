@@ -0,0 +1,40 @@
+import timeit
+
+from swml import SignalWireML, AI
+from swml.Encoders import dump_yaml, CustomCDumper, _libyaml_matches
+
+
+def build_document(functions: int = 50):
+    response = SignalWireML()
+    main_section = response.add_section('main')
+    main_section.answer()
+    main_section.ai(
+        prompt=AI.PromptParams(text="You are a support agent for a large retailer.\n" * 40),
+        post_prompt=AI.PromptParams(text="Summarize the conversation.\nList any follow ups."),
+        hints=[f"hint {index}" for index in range(100)],
+        SWAIG=AI.SWAIGParams(functions=[
+            AI.SWAIGFunction(function=f"function_{index}", purpose=f"Look up record {index} for the caller",
+                             web_hook_url=f"https://example.com/swaig/{index}",
+                             argument=AI.SWAIGFunction.FunctionArgs(type_="object", properties={
+                                 "id": AI.SWAIGFunction.FunctionArgs.PropertyDetail(type_="string",
+                                                                                    description="Record id")}))
+            for index in range(functions)]))
+    main_section.hangup()
+    return {'sections': response.serialize_sections()}
+
+
+def main(number: int = 20):
+    document = build_document()
+    if dump_yaml(document, accelerated=True) != dump_yaml(document, accelerated=False):
+        raise AssertionError("libyaml output differs from the pure Python output")
+    if not _libyaml_matches(document):
+        raise AssertionError("The document falls back to the pure Python dumper, libyaml wouldn't be measured")
+
+    print(f"libyaml available: {CustomCDumper is not None}")
+    for label, accelerated in (('pure python', False), ('libyaml', True)):
+        seconds = timeit.timeit(lambda: dump_yaml(document, accelerated=accelerated), number=number)
+        print(f"{label:>12}: {seconds / number * 1000:.2f} ms per document")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import argparse
+import functools
+import json
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+
+from swml import SignalWireML, Section, Switch, Play, DataMap, DataMapExpression, DataMapExpressionOutput, Say
+from swml.DataMaps import CompiledDataMap
+from swml.Loader import VERBS
+from swml.Encoders import dump_yaml, CustomCDumper
+from swml.Expressions import compile_expression
+from swml.SWMLTypes import Instruction
+
+from .bench_instructions import build_ai, DictInstruction
+from .bench_yaml import build_document
+
+# Constructor arguments used to build one instance of every verb
+VERB_ARGUMENTS = {
+    'ai': {'prompt': {'text': "You are a helpful assistant."}, 'hints': ["one", "two"]},
+    'answer': {'max_duration': 3600},
+    'cond': {'when': "vars.answer == 'yes'", 'then': [{'play': {'url': "say:Yes"}}], 'else_': ["hangup"]},
+    'connect': {'from_number': "+15550000000", 'to_number': "+15551234567", 'timeout': 30},
+    'denoise': {},
+    'execute': {'dest': "voicemail", 'params': {'mailbox': "1"}},
+    'hangup': {'reason': "busy"},
+    'join_room': {'name': "support"},
+    'play': {'url': "say:Hello", 'volume': 2.0},
+    'prompt': {'play': "say:Press 1", 'max_digits': 1, 'terminators': "#"},
+    'receive_fax': {},
+    'record': {'format_': "wav", 'direction': "both", 'beep': True},
+    'record_call': {'control_id': "recording", 'format_': "mp3", 'stereo': True},
+    'request': {'url': "https://example.com/hook", 'method': "POST", 'body': {'event': "call"}},
+    'return': {'return_value': {'status': "ok"}},
+    'send_digits': {'digits': "1234#"},
+    'send_fax': {'document': "https://example.com/fax.pdf"},
+    'send_sms': {'to_number': "+15551234567", 'from_number': "+15550000000", 'body': "Thanks for calling"},
+    'set': {'variables': {'attempt': 1}},
+    'sip_refer': {'to_uri': "sip:agent@example.com", 'result': {}},
+    'stop_denoise': {},
+    'stop_record_call': {'control_id': "recording"},
+    'stop_tap': {'control_id': "tap"},
+    'switch': {'variable': "vars.choice", 'case': {'1': ["hangup"]}, 'default': ["hangup"]},
+    'tap': {'uri': "rtp://127.0.0.1:5000", 'direction': "both", 'codec': "PCMU"},
+    'transfer': {'dest': "sales"},
+    'unset': {'vars_': "attempt"},
+}
+
+
+def build_switch(cases: int = 1000):
+    return Switch(variable="vars.account", case={str(index): [Play(url=f"say:Account {index}"), {'transfer': 'main'}]
+                                                 for index in range(cases)}, default=["hangup"])
+
+
+def build_sections(instructions: int = 1000):
+    section = Section('main')
+    for index in range(instructions):
+        section.add_instruction(Play(url=f"say:Step {index}", volume=1.0))
+    return section
+
+
+def build_response(sections: int = 10, instructions: int = 100):
+    response = SignalWireML()
+    for number in range(sections):
+        section = response.add_section('main' if number == 0 else f"section_{number}")
+        section.add_many('play', url=[f"say:Step {index}" for index in range(instructions)])
+        section.add_instruction(build_ai(10, 3, 3))
+    return response
+
+
+def build_data_map(expressions: int = 100):
+    return DataMap(expressions=[
+        DataMapExpression(string="${args.city}", pattern=f"^(Expression {index})$",
+                          output=DataMapExpressionOutput(response="Matched ${match.1}", action=[Say("${args.city}")]))
+        for index in range(expressions)])
+
+
+def build_interpreter():
+    response = SignalWireML()
+    main_section = response.add_section('main')
+    main_section.answer()
+    main_section.prompt(play="say:Press 1 for sales", max_digits=1)
+    main_section.switch(variable="prompt_value", case={'1': [{'execute': "sales"}]}, default=["hangup"])
+    main_section.hangup()
+    sales = response.add_section('sales')
+    sales.request(url="https://example.com/hours", method="GET", save_variables=True)
+    sales.cond(when="vars.open == true", then=[{'return': "open"}], else_=[{'return': "closed"}])
+    return response.interpreter()
+
+
+def uncached(response, function):
+    # Runs function with the section fragment caches emptied first, so every call encodes the whole document
+    def run():
+        for section in response._sections.values():
+            section._invalidate_cache()
+        return function()
+    return run
+
+
+def benchmarks():
+    # name -> zero argument callable. One call is one op, setup happens here and isn't measured.
+    cases = {}
+    for verb, instruction_class in VERBS.items():
+        cases[f"construct.{verb}"] = lambda cls=instruction_class, kwargs=VERB_ARGUMENTS[verb]: cls(**kwargs)
+    cases['construct.instruction_slots'] = lambda: Instruction(type='string', description='Property')
+    cases['construct.instruction_dict'] = lambda: DictInstruction(type='string', description='Property')
+
+    ai = build_ai(100, 5, 5)
+    cases['ai.build_100_functions'] = lambda: build_ai(100, 5, 5)
+    cases['ai.serialize_100_functions'] = ai.serialize
+
+    switch = build_switch()
+    cases['switch.build_1000_cases'] = build_switch
+    cases['switch.serialize_1000_cases'] = switch.serialize
+
+    urls = [f"say:Step {index}" for index in range(1000)]
+    cases['section.add_instruction_1000'] = build_sections
+    cases['section.add_many_1000'] = lambda: Section('main').add_many('play', url=urls, volume=[1.0] * 1000)
+
+    response = build_response()
+    for data_format in ('json', 'yaml'):
+        generate = functools.partial(response.generate_swml, data_format)
+        cases[f"generate.{data_format}"] = uncached(response, generate)
+        cases[f"generate.{data_format}_cached"] = generate
+        cases[f"stream.{data_format}"] = uncached(response, lambda data_format=data_format: sum(
+            1 for _ in response.stream_swml(data_format)))
+    cases['generate.json_compact'] = lambda: response.generate_swml(compact=True)
+
+    interpreter = build_interpreter()
+    cases['interpreter.run'] = lambda: interpreter.run(inputs=["1"], responses={"https://example.com/hours": {}})
+    calls = [{'inputs': [str(index % 2 + 1)], 'responses': {"https://example.com/hours": {'open': True}}}
+             for index in range(1000)]
+    cases['interpreter.run_many_1000'] = lambda: interpreter.run_many(calls)
+
+    expression = compile_expression("vars.count > 2 && (call.from == '+15551234567' || vars.vip)")
+    variables = {'vars': {'count': "3", 'vip': False}, 'call': {'from': "+15551234567"}}
+    cases['expression.evaluate'] = lambda: expression.evaluate(variables)
+
+    data_map = CompiledDataMap(build_data_map(100))
+    cases['data_map.evaluate_100_expressions'] = lambda: data_map.evaluate({'city': "Expression 99"})
+
+    document = build_document()
+    cases['yaml.dump_pure_python'] = lambda: dump_yaml(document, accelerated=False)
+    if CustomCDumper is not None:
+        cases['yaml.dump_libyaml'] = lambda: dump_yaml(document, accelerated=True)
+    return cases
+
+
+def measure(function, repeat: int, min_time: float):
+    # ops/s from the best of repeat timings, each long enough to last min_time seconds
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        seconds = timer.timeit(number)
+        if seconds >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(seconds, 1e-9)))
+    best = min([seconds] + timer.repeat(repeat - 1, number)) if repeat > 1 else seconds
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ops_per_sec': number / best, 'seconds_per_op': best / number, 'peak_memory_bytes': peak,
+            'number': number, 'repeat': repeat}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(selected=None, repeat: int = 3, min_time: float = 0.2):
+    results = {}
+    for name, function in benchmarks().items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        results[name] = measure(function, repeat, min_time)
+        print(f"{name:<36} {results[name]['ops_per_sec']:>14,.1f} ops/s "
+              f"{results[name]['peak_memory_bytes'] / 1024:>10,.1f} KiB peak", file=sys.stderr)
+    return {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'libyaml': CustomCDumper is not None,
+        'results': results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float):
+    # Returns the benchmarks that got slower than threshold (0.1 = 10%) against the baseline
+    regressions = []
+    for name, result in report['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        ratio = result['ops_per_sec'] / before['ops_per_sec']
+        print(f"{name:<36} {ratio:>7.2f}x", file=sys.stderr)
+        if ratio < 1 - threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SWML benchmark suite")
+    parser.add_argument('names', nargs='*', help="only run benchmarks whose name contains one of these")
+    parser.add_argument('--output', '-o', help="write the JSON report to this file instead of stdout")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per timing run")
+    parser.add_argument('--compare', help="JSON report of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown reported as a regression")
+    parser.add_argument('--list', action='store_true', help="list the benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(benchmarks()))
+        return 0
+
+    report = run(args.names, args.repeat, args.min_time)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(report, json.load(fp), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import os
+import traceback
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+from .SignalWireML import SignalWireML
+
+
+class RenderResult:
+    # Outcome of one document of a batch. output is None when the document failed or was written to path.
+    __slots__ = ('index', 'output', 'path', 'error')
+
+    def __init__(self, index: int, output=None, path: str = None, error: str = None):
+        self.index = index
+        self.output = output
+        self.path = path
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return f"RenderResult(index={self.index}, ok={self.ok}, path={self.path!r})"
+
+
+def build_document(item: Any):
+    # A batch item is a SignalWireML, a SWML mapping like {'sections': {...}}, or a picklable callable (a module
+    # level function or functools.partial) returning one of those
+    if callable(item) and not isinstance(item, SignalWireML):
+        item = item()
+    if isinstance(item, dict):
+        item = SignalWireML.from_dict(item)
+    if not isinstance(item, SignalWireML):
+        raise TypeError(f"Invalid batch item type '{type(item)}'. Expected SignalWireML, dict or a builder.")
+    return item
+
+
+def render_item(index: int, item: Any, options: dict):
+    try:
+        output = build_document(item).generate_swml(options['data_format'], options['json_backend'],
+                                                    options['compact'], options['as_bytes'] or bool(options['path']))
+        if options['path']:
+            path = options['path'].format(index=index)
+            with open(path, 'wb') as fp:
+                fp.write(output)
+            return RenderResult(index, path=path)
+        return RenderResult(index, output)
+    except Exception:
+        # Only the formatted error goes back, the exception itself may not be picklable
+        return RenderResult(index, error=traceback.format_exc())
+
+
+def render_chunk(chunk, options: dict):
+    return [render_item(index, item, options) for index, item in chunk]
+
+
+def _chunks(items: Iterable, chunksize: int):
+    iterator = iter(enumerate(items))
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_batch(items: Iterable, data_format: str = 'json', json_backend: str = None, compact: bool = False,
+                 as_bytes: bool = False, path: Optional[str] = None, processes: Optional[int] = None,
+                 chunksize: int = 64, ordered: bool = True, executor=None) -> Iterator[RenderResult]:
+    # Renders many documents across a process pool and yields a RenderResult per item, in input order when ordered,
+    # or as chunks finish otherwise. Items are sent to the workers chunksize at a time and only a few chunks per
+    # worker are in flight, so items can be a generator of any length. path is a format string like
+    # 'out/{index}.json', the workers then write the outputs as bytes themselves instead of sending them back.
+    # processes=1 without an executor renders in this process, which helps when debugging builders.
+    # Invalid arguments raise here, before the first result is asked for.
+    if data_format not in ('json', 'yaml'):
+        raise ValueError(f"Invalid data format '{data_format}'. Valid formats are 'json' and 'yaml'.")
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1.")
+    if processes is not None and processes < 1:
+        raise ValueError("processes must be at least 1.")
+    options = {'data_format': data_format, 'json_backend': json_backend or SignalWireML.json_backend,
+               'compact': compact, 'as_bytes': as_bytes, 'path': path}
+    processes = processes or os.cpu_count() or 1
+
+    if executor is None and processes == 1:
+        return _render_local(_chunks(items, chunksize), options)
+    return _render_pooled(_Pool(executor, processes), _chunks(items, chunksize), options, processes * 2, ordered)
+
+
+def _render_local(chunks, options: dict):
+    for chunk in chunks:
+        yield from render_chunk(chunk, options)
+
+
+def _error_results(chunk, error: BaseException):
+    message = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+    return [RenderResult(index, error=message) for index, _ in chunk]
+
+
+class _Pool:
+    # The executor chunks are submitted to. Our own pool is created on the first submit and replaced when it broke (a
+    # worker died), a given executor is used as is.
+    def __init__(self, executor, processes: int):
+        self.own = executor is None
+        self.processes = processes
+        self.executor = executor
+
+    def submit(self, chunk, options: dict) -> Future:
+        try:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+            try:
+                return self.executor.submit(render_chunk, chunk, options)
+            except BrokenExecutor:
+                if not self.own:
+                    raise
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+                return self.executor.submit(render_chunk, chunk, options)
+        except Exception as error:
+            return self._failed(error)
+
+    @staticmethod
+    def _failed(error: BaseException) -> Future:
+        future = Future()
+        future.set_exception(error)
+        return future
+
+    def results(self, future: Future, chunk, options: dict):
+        # Results of a finished chunk. A chunk that failed as a whole (an item that can't be pickled, a worker that
+        # died) is rendered again item by item, so only the items at fault get error results.
+        try:
+            return future.result()
+        except Exception as error:
+            if len(chunk) == 1 and not isinstance(error, BrokenExecutor):
+                return _error_results(chunk, error)
+        results = []
+        for item in chunk:
+            results.extend(self._retry(item, options))
+        return results
+
+    def _retry(self, item, options: dict, attempts: int = 2):
+        # A dying worker breaks every task in flight, not just its own, so an item is only blamed for a broken pool
+        # when it broke a fresh one too
+        failure = None
+        for _ in range(attempts):
+            try:
+                return self.submit([item], options).result()
+            except BrokenExecutor as error:
+                failure = error
+                if not self.own:
+                    break
+            except Exception as error:
+                return _error_results([item], error)
+        return _error_results([item], failure)
+
+    def shutdown(self):
+        if self.own and self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+
+def _render_pooled(pool: _Pool, chunks, options: dict, in_flight: int, ordered: bool):
+    try:
+        pending = [(pool.submit(chunk, options), chunk) for chunk in islice(chunks, in_flight)]
+        while pending:
+            if ordered:
+                done = [pending.pop(0)]
+            else:
+                finished, _ = wait([future for future, _ in pending], return_when=FIRST_COMPLETED)
+                done = [entry for entry in pending if entry[0] in finished]
+                pending = [entry for entry in pending if entry[0] not in finished]
+            for future, chunk in done:
+                # refill before yielding so the workers stay busy while the caller handles the results
+                for new_chunk in islice(chunks, 1):
+                    pending.append((pool.submit(new_chunk, options), new_chunk))
+                yield from pool.results(future, chunk, options)
+    finally:
+        pool.shutdown()
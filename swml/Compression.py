@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def gzip_compress(data: bytes):
+    # mtime=0 keeps the output identical for identical input, so it can be cached and served with a stable ETag
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+# compressors by Content-Encoding token, 'br' is only present when the brotli package is installed
+COMPRESSORS = {'gzip': gzip_compress}
+if brotli is not None:
+    COMPRESSORS['br'] = brotli.compress
+
+
+def get_compressor(encoding: str):
+    if encoding not in COMPRESSORS:
+        raise ValueError(f"Invalid encoding '{encoding}'. Available encodings are: {', '.join(COMPRESSORS)}.")
+    return COMPRESSORS[encoding]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def select_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    # Picks the best available encoding from an Accept-Encoding header, brotli first, None for identity
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(','):
+        token, _, parameters = item.strip().partition(';')
+        quality = 1.0
+        parameter = parameters.strip()
+        if parameter.startswith('q='):
+            try:
+                quality = float(parameter[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    for encoding in ('br', 'gzip'):
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in COMPRESSORS and quality > 0:
+            return encoding
+    return None
+
+
+class CompressionCache:
+    # Compressed outputs keyed by encoding and content hash, the least recently used ones are dropped past maxsize
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, encoding: str, digest: str):
+        compressed = self._entries.get((encoding, digest))
+        if compressed is not None:
+            self._entries.move_to_end((encoding, digest))
+        return compressed
+
+    def compress(self, data: bytes, encoding: str = 'gzip', digest: str = None):
+        # digest identifies the data, it's hashed here when the caller doesn't already have a hash for it
+        compressor = get_compressor(encoding)
+        key = (encoding, digest or content_hash(data))
+        compressed = self.get(*key)
+        if compressed is not None:
+            return compressed
+        return self.put(encoding, key[1], compressor(data))
+
+    def put(self, encoding: str, digest: str, compressed: bytes):
+        self._entries[(encoding, digest)] = compressed
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return compressed
+
+    def clear(self):
+        self._entries.clear()
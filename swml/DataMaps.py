@@ -0,0 +1,163 @@
+import functools
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from .Expressions import get_member, to_string
+from .SWMLTypes import Instruction, DataMapExpressionOutput, serialize_value
+
+# Evaluates SWAIG data_map expressions locally: the 'string' template is expanded with the function arguments, the
+# first expression whose 'pattern' matches it is selected and its output is expanded with the arguments and the match
+# groups. Templates and patterns are compiled once and shared by every data map in the process.
+
+# ${args.city} or %{args.city}
+REFERENCE = re.compile(r'[$%]\{([^}]*)}')
+# /pattern/flags, like the JavaScript regex literals data maps are often written with
+REGEX_LITERAL = re.compile(r'^/(.*)/([a-z]*)$', re.DOTALL)
+FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'g': 0, 'u': 0}
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_pattern(pattern: str):
+    literal = REGEX_LITERAL.match(pattern)
+    flags = 0
+    if literal:
+        pattern, letters = literal.groups()
+        for letter in letters:
+            if letter not in FLAGS:
+                raise ValueError(f"Invalid data map pattern flag '{letter}' in {pattern!r}.")
+            flags |= FLAGS[letter]
+    # JavaScript named groups
+    pattern = pattern.replace('(?<', '(?P<').replace('(?P<=', '(?<=').replace('(?P<!', '(?<!')
+    try:
+        return re.compile(pattern, flags)
+    except re.error as error:
+        raise ValueError(f"Invalid data map pattern {pattern!r}: {error}.") from None
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(template: str):
+    # A template that is a single reference returns the value itself, anything else is joined into a string
+    whole = REFERENCE.fullmatch(template)
+    if whole:
+        return _path(whole.group(1))
+    parts = []
+    position = 0
+    for match in REFERENCE.finditer(template):
+        if match.start() > position:
+            parts.append(template[position:match.start()])
+        parts.append(_path(match.group(1)))
+        position = match.end()
+    if position < len(template):
+        parts.append(template[position:])
+    return parts
+
+
+def _path(reference: str):
+    return tuple(reference.strip().split('.'))
+
+
+def lookup(path: tuple, variables: Dict[str, Any]):
+    value = variables
+    for key in path:
+        if value is None:
+            return None
+        value = get_member(value, key)
+    return value
+
+
+def expand(value, variables: Dict[str, Any]):
+    # Expands the references in strings, and in the strings nested in mappings and lists
+    if isinstance(value, str):
+        if '{' not in value:
+            return value
+        compiled = compile_template(value)
+        if isinstance(compiled, tuple):
+            return lookup(compiled, variables)
+        return ''.join(part if isinstance(part, str) else _stringify(lookup(part, variables)) for part in compiled)
+    if isinstance(value, dict):
+        return {key: expand(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item, variables) for item in value]
+    return value
+
+
+def _stringify(value):
+    return '' if value is None else to_string(value)
+
+
+def match_groups(match) -> Dict[str, Any]:
+    # match.0 is the whole match, match.1 the first group, named groups also by name
+    groups = {'0': match.group(0)}
+    for index, group in enumerate(match.groups(), 1):
+        groups[str(index)] = group
+    groups.update(match.groupdict())
+    return groups
+
+
+def _output(output: dict, output_class=DataMapExpressionOutput):
+    instance = output_class.__new__(output_class)
+    instance.name = None
+    instance.params = {key: value for key, value in output.items() if value is not None}
+    return instance
+
+
+class CompiledDataMap:
+    # The expressions of one data map with their patterns compiled, ready to evaluate many argument sets
+    __slots__ = ('expressions',)
+
+    def __init__(self, data_map):
+        if isinstance(data_map, Instruction):
+            data_map = serialize_value(data_map)
+        if not isinstance(data_map, dict):
+            raise TypeError(f"Invalid data map type '{type(data_map).__name__}'. Expected DataMap or dict.")
+        self.expressions = [(expression['string'], compile_pattern(expression['pattern']), expression['output'])
+                            for expression in data_map.get('expressions') or ()]
+
+    def evaluate(self, args: Dict[str, Any], variables: Optional[Dict[str, Any]] = None):
+        # Returns the expanded DataMapExpressionOutput of the first matching expression, None when none matches.
+        # variables are extra names for the templates next to 'args' and 'match', e.g. {'meta_data': {...}}.
+        scope = dict(variables or (), args=args)
+        # expressions of one data map usually test the same template against different patterns
+        strings = {}
+        for template, pattern, output in self.expressions:
+            string = strings.get(template)
+            if string is None:
+                string = strings[template] = _stringify(expand(template, scope))
+            match = pattern.search(string)
+            if match is not None:
+                scope['match'] = match_groups(match)
+                return _output(expand(output, scope))
+        return None
+
+
+def evaluate_data_map(data_map, args: Dict[str, Any], variables: Optional[Dict[str, Any]] = None):
+    return CompiledDataMap(data_map).evaluate(args, variables)
+
+
+def swaig_functions(config) -> List[Dict[str, Any]]:
+    # Serialized SWAIG functions of an AI instruction, SWAIGParams, a list of SWAIGFunction or their serialized forms
+    serialized = serialize_value(config) if isinstance(config, (Instruction, list, dict)) else config
+    if isinstance(serialized, dict) and 'ai' in serialized:
+        serialized = serialized['ai']
+    if isinstance(serialized, dict) and 'SWAIG' in serialized:
+        serialized = serialized['SWAIG']
+    if isinstance(serialized, dict):
+        serialized = serialized.get('functions') or []
+    return [function for function in serialized if isinstance(function, dict) and 'function' in function]
+
+
+def data_map_functions(config) -> Dict[str, CompiledDataMap]:
+    # Compiled data map of every function with one, by function name
+    return {function['function']: CompiledDataMap(function['data_map'])
+            for function in swaig_functions(config) if function.get('data_map')}
+
+
+def evaluate_table(config, table: Dict[str, Iterable[Dict[str, Any]]],
+                   variables: Optional[Dict[str, Any]] = None) -> Dict[str, List]:
+    # Runs every argument set of table ({function name: [args, ...]}) through that function's data map and returns
+    # the outputs in the same shape. Each data map is compiled once for the whole table.
+    functions = data_map_functions(config)
+    missing = [name for name in table if name not in functions]
+    if missing:
+        raise ValueError(f"No data map for function(s): {', '.join(missing)}.")
+    return {name: [functions[name].evaluate(args, variables) for args in rows] for name, rows in table.items()}
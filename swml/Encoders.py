@@ -0,0 +1,253 @@
+import json
+import re
+
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# PyYAML wraps long scalars at 80 columns. Section fragments are dumped on their own and then indented by two
+# spaces under 'sections:', so they are dumped two columns narrower to wrap at exactly the same places.
+YAML_WIDTH = 80
+YAML_INDENT = 2
+YAML_DOCUMENT_END = '...\n'
+YAML_HEADER = 'sections:\n'
+YAML_MARKER = 'swmlmarker'
+
+
+class CustomDumper(yaml.Dumper):
+    # Serialized instructions share the output of sub-objects they have in common, which must still be written out
+    # in full rather than as YAML anchors and aliases
+    def ignore_aliases(self, data):
+        return True
+
+
+def represent_str(dumper, data):
+    # Check if the string contains newlines
+    if '\n' in data:
+        # Use block literal style for multiline strings
+        return dumper.represent_scalar('tag:yaml.org,2002:str', data, style='|')
+
+    else:
+        # Use plain style for other strings
+        return dumper.represent_scalar('tag:yaml.org,2002:str', data, style=None)
+
+
+CustomDumper.add_representer(str, represent_str)
+
+# libyaml's emitter is used when PyYAML was built with it
+if getattr(yaml, '__with_libyaml__', False):
+    class CustomCDumper(yaml.CDumper):
+        def ignore_aliases(self, data):
+            return True
+
+
+    CustomCDumper.add_representer(str, represent_str)
+else:
+    CustomCDumper = None
+
+
+# Characters PyYAML only writes in double-quoted scalars with escape sequences (unicode isn't allowed)
+ESCAPED_CHARACTERS = re.compile(r'[^\n\x20-\x7e]')
+# PyYAML writes longer keys as '? key' complex keys
+YAML_MAX_SIMPLE_KEY = 60
+
+
+def _needs_double_quotes(text: str) -> bool:
+    if ESCAPED_CHARACTERS.search(text):
+        return True
+    # multiline strings that can't be block literals, or end up as '|+' literals closing the document with '...'. A
+    # single trailing newline gives a plain '|' literal, which both write the same.
+    return '\n' in text and (text == '\n' or text.endswith(('\n\n', ' ')) or ' \n' in text or '\n ' in text)
+
+
+def _libyaml_matches(data) -> bool:
+    # libyaml wraps double-quoted scalars at different points than PyYAML, ends the document with '...' after any
+    # '|+' literal rather than only a trailing one and writes long and empty keys differently. Data without such
+    # strings is dumped byte for byte the same by both.
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            if _needs_double_quotes(value):
+                return False
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                if isinstance(key, str) and (not key or len(key) > YAML_MAX_SIMPLE_KEY or _needs_double_quotes(key)):
+                    return False
+                stack.append(item)
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return True
+
+
+def dump_yaml(data, width: int = YAML_WIDTH, accelerated: bool = True):
+    # The strings that libyaml would write differently are found before dumping, so every document is dumped once
+    dumper = CustomCDumper if accelerated and CustomCDumper is not None and _libyaml_matches(data) else CustomDumper
+    return yaml.dump(data, Dumper=dumper, sort_keys=False, indent=YAML_INDENT, width=width)
+
+
+def indent_yaml(text: str, depth: int = 1):
+    # Blank lines (inside block literals) are emitted without indentation, so they are left alone
+    prefix = ' ' * (YAML_INDENT * depth)
+    return ''.join(prefix + line if line != '\n' else line for line in text.splitlines(True))
+
+
+def _indent_nested_yaml(text: str, depth: int = 1):
+    # A trailing '|+' literal makes PyYAML close the document with '...', which stays unindented and is only kept
+    # when the fragment ends up last in the document
+    if text.endswith(YAML_DOCUMENT_END):
+        return indent_yaml(text[:-len(YAML_DOCUMENT_END)], depth) + YAML_DOCUMENT_END
+    return indent_yaml(text, depth)
+
+
+def encode_yaml_fragment(name: str, actions):
+    return _indent_nested_yaml(dump_yaml({name: actions}, width=YAML_WIDTH - YAML_INDENT))
+
+
+def encode_yaml_section_header(name: str):
+    # Returns the '  name:' line that precedes a section's instructions, or None for names that PyYAML can only
+    # write as complex keys, whose instructions can't be emitted one at a time
+    text = indent_yaml(dump_yaml({name: [YAML_MARKER]}, width=YAML_WIDTH - YAML_INDENT))
+    if text.count('\n') == 2 and text.endswith(f":\n  - {YAML_MARKER}\n"):
+        return text[:-len(YAML_MARKER) - 5]
+    return None
+
+
+def encode_yaml_instruction(instruction):
+    # Sequence items are indented the same standalone as under a section key, so one-item lists can be streamed
+    return _indent_nested_yaml(dump_yaml([instruction], width=YAML_WIDTH - YAML_INDENT))
+
+
+def strip_yaml_document_end(chunk: str):
+    if chunk.endswith(YAML_DOCUMENT_END):
+        return chunk[:-len(YAML_DOCUMENT_END)], True
+    return chunk, False
+
+
+def join_yaml_fragments(fragments):
+    last = len(fragments) - 1
+    return YAML_HEADER + ''.join(
+        fragment[:-len(YAML_DOCUMENT_END)] if index != last and fragment.endswith(YAML_DOCUMENT_END) else fragment
+        for index, fragment in enumerate(fragments))
+
+
+def to_output(data, as_bytes: bool = False):
+    if as_bytes:
+        return data if isinstance(data, bytes) else data.encode('utf-8')
+    return data.decode('utf-8') if isinstance(data, bytes) else data
+
+
+class JSONBackend:
+    # Backends return their native output type, bytes or str, and documents are assembled in that type so a bytes
+    # backend never goes through str on its way to the socket
+    produces_bytes = False
+    # Backends that can't emit the stdlib ', ' and ': ' separators always produce compact output
+    always_compact = False
+
+    def dumps(self, data, compact: bool = False):
+        raise NotImplementedError
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def _literal(self, text: str):
+        return text.encode('utf-8') if self.produces_bytes else text
+
+    def is_compact(self, compact: bool = False):
+        return compact or self.always_compact
+
+    def separators(self, compact: bool = False):
+        # item and key separators in the backend's native type
+        if self.is_compact(compact):
+            return self._literal(','), self._literal(':')
+        return self._literal(', '), self._literal(': ')
+
+    def document_head(self, compact: bool = False):
+        return self._literal('{"sections":{' if self.is_compact(compact) else '{"sections": {')
+
+    def document_tail(self):
+        return self._literal('}}')
+
+    def section_head(self, name: str, compact: bool = False):
+        return self.dumps(name, compact) + self.separators(compact)[1] + self._literal('[')
+
+    def section_tail(self):
+        return self._literal(']')
+
+    def iter_dumps(self, data, compact: bool = False, is_large=None):
+        # Yields the same text as dumps, opening up the mappings and lists is_large picks so a huge value isn't encoded
+        # in one piece. Mappings with non-string keys are always encoded whole, the backends differ in converting them.
+        if not isinstance(data, (dict, list)) or is_large is None or not is_large(data) \
+                or isinstance(data, dict) and not all(isinstance(key, str) for key in data):
+            yield self.dumps(data, compact)
+            return
+        item_separator, key_separator = self.separators(compact)
+        if isinstance(data, list):
+            yield self._literal('[')
+            for index, item in enumerate(data):
+                if index:
+                    yield item_separator
+                yield from self.iter_dumps(item, compact, is_large)
+            yield self._literal(']')
+        else:
+            yield self._literal('{')
+            for index, (key, value) in enumerate(data.items()):
+                key = self.dumps(key, compact) + key_separator
+                yield item_separator + key if index else key
+                yield from self.iter_dumps(value, compact, is_large)
+            yield self._literal('}')
+
+    def encode_fragment(self, name: str, actions, compact: bool = False):
+        return self.dumps(name, compact) + self.separators(compact)[1] + self.dumps(actions, compact)
+
+    def join_fragments(self, fragments, compact: bool = False):
+        return self.document_head(compact) + self.separators(compact)[0].join(fragments) + self.document_tail()
+
+
+class StdlibJSONBackend(JSONBackend):
+    def dumps(self, data, compact: bool = False):
+        if compact:
+            return json.dumps(data, separators=(',', ':'))
+        return json.dumps(data)
+
+
+class OrjsonBackend(JSONBackend):
+    produces_bytes = True
+    always_compact = True
+
+    def dumps(self, data, compact: bool = False):
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class UjsonBackend(JSONBackend):
+    always_compact = True
+
+    def dumps(self, data, compact: bool = False):
+        return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False)
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+JSON_BACKENDS = {'stdlib': StdlibJSONBackend()}
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = OrjsonBackend()
+if ujson is not None:
+    JSON_BACKENDS['ujson'] = UjsonBackend()
+
+
+def get_json_backend(name: str):
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Invalid JSON backend '{name}'. Available backends are: {', '.join(JSON_BACKENDS)}.")
+    return JSON_BACKENDS[name]
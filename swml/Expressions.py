@@ -0,0 +1,693 @@
+import functools
+import math
+import re
+from typing import Any, Callable, Dict
+
+# Compiles the JavaScript-like expressions of cond 'when', switch 'variable' and %{...} substitutions. Source strings
+# are tokenized and parsed once into a small AST of tuples, which is then turned into nested closures. Compiled
+# expressions are cached by source, so evaluating one again only runs its closures.
+
+TOKEN = re.compile(r"""\s*(?:
+    (?P<number>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|\.\d+) |
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*") |
+    (?P<name>[A-Za-z_$][A-Za-z0-9_$]*) |
+    (?P<unsupported>\?\.(?!\d)|\?\?|\*\*|<<|>>|\+\+|--|=>|[`{}~^]|&(?!&)|\|(?!\|)|=(?!=)) |
+    (?P<operator>===|!==|==|!=|<=|>=|&&|\|\||[-+*/%<>!().\[\]?:,])
+)""", re.VERBOSE)
+# Valid JavaScript the evaluator doesn't implement, property names aside. Expressions using it, or the operators above
+# such as ?. ?? and template literals, raise UnsupportedExpression.
+UNSUPPORTED_KEYWORDS = frozenset(('typeof', 'instanceof', 'new', 'void', 'delete', 'function'))
+# /pattern/flags, only where an operand can start, elsewhere / divides
+REGEX = re.compile(r'\s*(?P<regex>/(?:[^/\\\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*])+/[a-z]*)')
+REGEX_FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'g': 0, 'u': 0}
+ESCAPE = re.compile(r'\\(.)')
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0'}
+
+# SWML variable scopes. Other names are looked up in 'vars', or in the context itself when it has no 'vars'.
+SCOPES = frozenset(('call', 'vars', 'params', 'envs'))
+LITERALS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+# left binding power of the infix operators
+BINDING = {
+    '?': 20,
+    '||': 30,
+    '&&': 40,
+    '==': 50, '!=': 50, '===': 50, '!==': 50,
+    '<': 60, '<=': 60, '>': 60, '>=': 60,
+    '+': 70, '-': 70,
+    '*': 80, '/': 80, '%': 80,
+    'in': 60,
+    '.': 100, '[': 100, '(': 100,
+}
+PREFIX_BINDING = 90
+
+
+def tokenize(source: str):
+    tokens = []
+    position = 0
+    length = len(source)
+    while position < length:
+        match = None
+        if not tokens or _starts_operand(tokens[-1]):
+            match = REGEX.match(source, position)
+        match = match or TOKEN.match(source, position)
+        if match is None:
+            position = length - len(source[position:].lstrip())
+            if position < length:
+                raise _error(source, f"unexpected character {source[position]!r}", position)
+            break
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'unsupported' or kind == 'name' and text in UNSUPPORTED_KEYWORDS and \
+                not (tokens and tokens[-1][:2] == ('operator', '.')):
+            raise UnsupportedExpression(source, repr(text), match.start(kind))
+        tokens.append((kind, text, match.start(kind)))
+        position = match.end()
+    tokens.append(('end', None, length))
+    return tokens
+
+
+def _starts_operand(previous):
+    # True when the token after previous is an operand, not an operator
+    kind, text, _ = previous
+    return kind == 'operator' and text not in (')', ']') or kind == 'name' and text == 'in'
+
+
+def _error(source: str, problem: str, position: int):
+    return ValueError(f"Invalid expression {source!r}: {problem} at position {position}.")
+
+
+class UnsupportedExpression(ValueError):
+    # Raised for expressions that may well be valid JavaScript but use something the evaluator doesn't implement.
+    # Building instructions lets them through, only evaluating them fails.
+    def __init__(self, source: str, construct: str, position: int):
+        super().__init__(f"Unsupported expression {source!r}: {construct} at position {position}.")
+
+
+class _Parser:
+    # Pratt parser: every token kind has a prefix (nud) handler, operators also have an infix (led) handler with a
+    # binding power that decides how far to the right they reach
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens = tokenize(source)
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value: str):
+        kind, text, position = self.advance()
+        if text != value or kind != 'operator':
+            raise self.unexpected((kind, text, position), f"expected {value!r}")
+
+    def unexpected(self, token, expected: str = None):
+        kind, text, position = token
+        found = 'end of expression' if kind == 'end' else repr(text)
+        problem = f"unexpected {found}" + (f", {expected}" if expected else '')
+        return _error(self.source, problem, position)
+
+    def parse(self):
+        if self.peek()[0] == 'end':
+            raise _error(self.source, "empty expression", 0)
+        tree = self.expression(0)
+        if self.peek()[0] != 'end':
+            raise self.unexpected(self.peek())
+        return tree
+
+    def expression(self, right_binding: int):
+        left = self.prefix(self.advance())
+        while True:
+            kind, text, _ = self.peek()
+            if not (kind == 'operator' or text == 'in') or BINDING.get(text, 0) <= right_binding:
+                return left
+            self.advance()
+            left = self.infix(text, left)
+
+    def prefix(self, token):
+        kind, text, _ = token
+        if kind == 'number':
+            return ('literal', float(text) if any(char in text for char in '.eE') else int(text))
+        if kind == 'string':
+            return ('literal', ESCAPE.sub(lambda match: ESCAPES.get(match.group(1), match.group(1)), text[1:-1]))
+        if kind == 'regex':
+            return ('literal', _regex(self.source, text, token[2]))
+        if kind == 'name':
+            if text in LITERALS:
+                return ('literal', LITERALS[text])
+            return ('name', text)
+        if text == '(':
+            inner = self.expression(0)
+            self.expect(')')
+            return inner
+        if text == '[':
+            return ('array', self.arguments(']'))
+        if text in ('!', '-', '+'):
+            return ('unary', text, self.expression(PREFIX_BINDING))
+        raise self.unexpected(token)
+
+    def arguments(self, closing: str):
+        items = []
+        if self.peek()[1] == closing and self.peek()[0] == 'operator':
+            self.advance()
+            return tuple(items)
+        while True:
+            items.append(self.expression(0))
+            kind, text, position = self.advance()
+            if kind == 'operator' and text == closing:
+                return tuple(items)
+            if kind != 'operator' or text != ',':
+                raise self.unexpected((kind, text, position), f"expected ',' or {closing!r}")
+
+    def infix(self, operator: str, left):
+        if operator == '.':
+            token = self.advance()
+            if token[0] != 'name':
+                raise self.unexpected(token, "expected a property name")
+            return ('member', left, ('literal', token[1]))
+        if operator == '[':
+            key = self.expression(0)
+            self.expect(']')
+            return ('member', left, key)
+        if operator == '(':
+            token = self.tokens[self.index - 1]
+            if left[0] == 'name' and left[1] not in FUNCTIONS:
+                raise UnsupportedExpression(self.source, f"function {left[1]!r}", token[2])
+            if left[0] not in ('name', 'member'):
+                raise self.unexpected(token)
+            return ('call', left, self.arguments(')'))
+        if operator == '?':
+            then = self.expression(0)
+            self.expect(':')
+            # right associative: a ? b : c ? d : e
+            return ('ternary', left, then, self.expression(BINDING['?'] - 1))
+        right = self.expression(BINDING[operator])
+        if operator in ('&&', '||'):
+            return ('logical', operator, left, right)
+        return ('binary', operator, left, right)
+
+
+def parse(source: str):
+    return _Parser(source).parse()
+
+
+class Regex:
+    # A JavaScript regex literal: the compiled pattern and whether it has the g flag
+    __slots__ = ('pattern', 'is_global')
+
+    def __init__(self, pattern, is_global: bool):
+        self.pattern = pattern
+        self.is_global = is_global
+
+    def __repr__(self):
+        return f"Regex({self.pattern.pattern!r})"
+
+
+def _regex(source: str, literal: str, position: int) -> Regex:
+    body, letters = literal[1:].rsplit('/', 1)
+    flags = 0
+    for letter in letters:
+        if letter not in REGEX_FLAGS:
+            raise _error(source, f"invalid regex flag {letter!r}", position)
+        flags |= REGEX_FLAGS[letter]
+    # JavaScript named groups
+    body = body.replace('(?<', '(?P<').replace('(?P<=', '(?<=').replace('(?P<!', '(?<!')
+    try:
+        return Regex(re.compile(body, flags), 'g' in letters)
+    except re.error as error:
+        raise _error(source, f"invalid regex ({error})", position) from None
+
+
+def truthy(value) -> bool:
+    # JavaScript truthiness: empty mappings and lists are true, NaN is false
+    if value is None or value is False or value == '':
+        return False
+    if isinstance(value, (int, float)):
+        return value == value and value != 0
+    return True
+
+
+def to_number(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return 0
+        try:
+            return int(text)
+        except ValueError:
+            try:
+                return float(text)
+            except ValueError:
+                return math.nan
+    return math.nan
+
+
+def to_string(value) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def loose_equals(left, right) -> bool:
+    # ==: null only equals null, and a number compared with a string or boolean compares as numbers
+    if left is None or right is None:
+        return left is None and right is None
+    if type(left) is type(right) or (isinstance(left, (int, float)) and isinstance(right, (int, float))
+                                     and not isinstance(left, bool) and not isinstance(right, bool)):
+        return left == right
+    if isinstance(left, (int, float, bool)) or isinstance(right, (int, float, bool)):
+        if isinstance(left, (dict, list)) or isinstance(right, (dict, list)):
+            return False
+        return to_number(left) == to_number(right)
+    return left == right
+
+
+def strict_equals(left, right) -> bool:
+    if isinstance(left, bool) or isinstance(right, bool):
+        return left is right
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return left == right
+    return type(left) is type(right) and left == right
+
+
+def _compare(operator):
+    def compare(left, right):
+        if not (isinstance(left, str) and isinstance(right, str)):
+            left, right = to_number(left), to_number(right)
+        return operator(left, right)
+    return compare
+
+
+def _add(left, right):
+    if isinstance(left, str) or isinstance(right, str):
+        return to_string(left) + to_string(right)
+    return to_number(left) + to_number(right)
+
+
+def _divide(left, right):
+    left, right = to_number(left), to_number(right)
+    if right == 0:
+        return math.nan if left == 0 or left != left else math.copysign(math.inf, left)
+    return left / right
+
+
+def _modulo(left, right):
+    left, right = to_number(left), to_number(right)
+    if right == 0 or left != left or right != right:
+        return math.nan
+    return math.fmod(left, right)
+
+
+def _in(key, container):
+    # key in object: a property of a mapping or an index of a list
+    if isinstance(container, dict):
+        return to_string(key) in container
+    if isinstance(container, (list, tuple)):
+        index = to_number(key)
+        return isinstance(index, (int, float)) and index == index and index == int(index) and \
+            0 <= index < len(container)
+    raise ValueError(f"Cannot use 'in' to search for {to_string(key)!r} in {to_string(container)!r}.")
+
+
+BINARY = {
+    'in': _in,
+    '==': loose_equals,
+    '!=': lambda left, right: not loose_equals(left, right),
+    '===': strict_equals,
+    '!==': lambda left, right: not strict_equals(left, right),
+    '<': _compare(lambda left, right: left < right),
+    '<=': _compare(lambda left, right: left <= right),
+    '>': _compare(lambda left, right: left > right),
+    '>=': _compare(lambda left, right: left >= right),
+    '+': _add,
+    '-': lambda left, right: to_number(left) - to_number(right),
+    '*': lambda left, right: to_number(left) * to_number(right),
+    '/': _divide,
+    '%': _modulo,
+}
+
+
+def get_member(value, key):
+    if isinstance(value, dict):
+        return value.get(key)
+    if isinstance(value, (list, tuple, str)):
+        if key == 'length':
+            return len(value)
+        if isinstance(key, float) and key.is_integer():
+            key = int(key)
+        elif isinstance(key, str) and key.isdigit():
+            key = int(key)
+        if isinstance(key, int) and not isinstance(key, bool) and 0 <= key < len(value):
+            return value[key]
+    return None
+
+
+def _integer(value, default: int = 0) -> int:
+    number = to_number(value) if value is not None else default
+    if number != number:
+        return 0
+    if number in (math.inf, -math.inf):
+        return int(math.copysign(2 ** 53, number))
+    return int(number)
+
+
+def _position(value, length: int, default: int) -> int:
+    # slice() style position: negative counts from the end
+    position = _integer(value, default)
+    return max(length + position, 0) if position < 0 else min(position, length)
+
+
+def _pattern(value) -> Regex:
+    if isinstance(value, Regex):
+        return value
+    return Regex(re.compile(re.escape(to_string(value))), False)
+
+
+def _expand_replacement(replacement: str, match) -> str:
+    # $& is the whole match, $1-$99 the groups, $<name> a named group and $$ a dollar sign
+    def group(found):
+        text = found.group(0)
+        if text == '$$':
+            return '$'
+        if text == '$&':
+            return match.group(0)
+        if text.startswith('$<'):
+            return match.groupdict().get(text[2:-1]) or ''
+        index = int(text[1:])
+        return (match.group(index) or '') if index <= len(match.groups()) else text
+    return re.sub(r'\$(?:\$|&|<[^>]*>|\d{1,2})', group, replacement)
+
+
+def _replace(value: str, pattern, replacement=None):
+    regex = _pattern(pattern)
+    replacement = to_string(replacement)
+    return regex.pattern.sub(lambda match: _expand_replacement(replacement, match), value,
+                             count=0 if regex.is_global else 1)
+
+
+def _match(value: str, pattern=None):
+    regex = _pattern(pattern if pattern is not None else '')
+    if regex.is_global:
+        return [match.group(0) for match in regex.pattern.finditer(value)] or None
+    match = regex.pattern.search(value)
+    return [match.group(0), *match.groups()] if match else None
+
+
+def _search(value: str, pattern=None):
+    match = _pattern(pattern if pattern is not None else '').pattern.search(value)
+    return match.start() if match else -1
+
+
+def _split(value: str, separator=None, limit=None):
+    if separator is None:
+        parts = [value]
+    elif isinstance(separator, Regex):
+        parts = separator.pattern.split(value)
+    elif to_string(separator) == '':
+        parts = list(value)
+    else:
+        parts = value.split(to_string(separator))
+    return parts if limit is None else parts[:max(_integer(limit), 0)]
+
+
+def _substring(value: str, start=None, end=None):
+    length = len(value)
+    start = min(max(_integer(start), 0), length)
+    end = length if end is None else min(max(_integer(end), 0), length)
+    return value[min(start, end):max(start, end)]
+
+
+def _index_of(value, search, start=None):
+    if isinstance(value, str):
+        return value.find(to_string(search), _position(start, len(value), 0))
+    for index in range(_position(start, len(value), 0), len(value)):
+        if strict_equals(value[index], search):
+            return index
+    return -1
+
+
+def _includes(value, search, start=None):
+    if isinstance(value, str):
+        return to_string(search) in value[_position(start, len(value), 0):]
+    # SameValueZero: NaN includes NaN
+    return any(strict_equals(item, search) or (item != item and search != search)
+               for item in value[_position(start, len(value), 0):])
+
+
+def _pad(value: str, length, fill=None, start: bool = True):
+    fill = ' ' if fill is None else to_string(fill)
+    missing = _integer(length) - len(value)
+    if missing <= 0 or not fill:
+        return value
+    padding = (fill * (missing // len(fill) + 1))[:missing]
+    return padding + value if start else value + padding
+
+
+def _to_fixed(value, digits=None):
+    return f"{to_number(value):.{_integer(digits)}f}"
+
+
+# JavaScript methods by receiver type, method(receiver, *arguments)
+STRING_METHODS = {
+    'startsWith': lambda value, search, start=None: value.startswith(to_string(search),
+                                                                     _position(start, len(value), 0)),
+    'endsWith': lambda value, search, end=None: value[:_position(end, len(value), len(value))].endswith(
+        to_string(search)),
+    'includes': _includes,
+    'indexOf': _index_of,
+    'lastIndexOf': lambda value, search: value.rfind(to_string(search)),
+    'toLowerCase': str.lower,
+    'toUpperCase': str.upper,
+    'trim': str.strip,
+    'trimStart': str.lstrip,
+    'trimEnd': str.rstrip,
+    'charAt': lambda value, index=None: value[_integer(index)] if 0 <= _integer(index) < len(value) else '',
+    'substring': _substring,
+    'slice': lambda value, start=None, end=None: value[_position(start, len(value), 0):
+                                                       _position(end, len(value), len(value))],
+    'split': _split,
+    'replace': _replace,
+    'match': _match,
+    'search': _search,
+    'padStart': lambda value, length, fill=None: _pad(value, length, fill),
+    'padEnd': lambda value, length, fill=None: _pad(value, length, fill, start=False),
+    'repeat': lambda value, count: value * max(_integer(count), 0),
+    'concat': lambda value, *others: value + ''.join(to_string(other) for other in others),
+    'toString': lambda value: value,
+}
+LIST_METHODS = {
+    'includes': _includes,
+    'indexOf': _index_of,
+    'join': lambda value, separator=None: (',' if separator is None else to_string(separator)).join(
+        '' if item is None else to_string(item) for item in value),
+    'slice': lambda value, start=None, end=None: list(value[_position(start, len(value), 0):
+                                                            _position(end, len(value), len(value))]),
+    'concat': lambda value, *others: list(value) + [item for other in others
+                                                    for item in (other if isinstance(other, (list, tuple))
+                                                                 else [other])],
+}
+NUMBER_METHODS = {
+    'toString': lambda value: to_string(value),
+    'toFixed': _to_fixed,
+}
+REGEX_METHODS = {
+    'test': lambda regex, value=None: regex.pattern.search(to_string(value)) is not None,
+}
+
+
+def call_method(receiver, name, arguments):
+    if isinstance(receiver, str):
+        methods = STRING_METHODS
+    elif isinstance(receiver, (list, tuple)):
+        methods = LIST_METHODS
+    elif isinstance(receiver, (int, float)) and not isinstance(receiver, bool):
+        methods = NUMBER_METHODS
+    elif isinstance(receiver, Regex):
+        methods = REGEX_METHODS
+    else:
+        methods = {}
+    method = methods.get(name)
+    if method is None:
+        raise ValueError(f"{to_string(receiver)!r}.{name} is not a supported function.")
+    return method(receiver, *arguments)
+
+
+def _parse_prefix(pattern):
+    def parse_number(value=None, *_):
+        match = pattern.match(to_string(value))
+        if not match:
+            return math.nan
+        number = float(match.group(0))
+        return int(number) if number.is_integer() and 'e' not in match.group(0).lower() else number
+    return parse_number
+
+
+# global functions by name, function(*arguments)
+FUNCTIONS = {
+    'parseInt': _parse_prefix(re.compile(r'\s*[-+]?\d+')),
+    'parseFloat': _parse_prefix(re.compile(r'\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')),
+    'Number': lambda value=0, *_: to_number(value),
+    'String': lambda value='', *_: to_string(value),
+    'Boolean': lambda value=None, *_: truthy(value),
+    'isNaN': lambda value=None, *_: to_number(value) != to_number(value),
+}
+
+
+def load_name(name: str, context):
+    if name in SCOPES and name in context:
+        return context[name]
+    variables = context.get('vars')
+    if isinstance(variables, dict):
+        return variables.get(name)
+    return context.get(name)
+
+
+def _static_path(node):
+    # ('member', ('member', ('name', 'vars'), 'a'), 'b') -> ('vars', 'a', 'b'), None when a key is computed
+    keys = []
+    while node[0] == 'member':
+        if node[2][0] != 'literal':
+            return None
+        keys.append(node[2][1])
+        node = node[1]
+    if node[0] != 'name':
+        return None
+    keys.append(node[1])
+    return tuple(reversed(keys))
+
+
+def compile_tree(node) -> Callable:
+    kind = node[0]
+    if kind == 'literal':
+        value = node[1]
+        return lambda context: value
+    if kind in ('name', 'member'):
+        path = _static_path(node)
+        if path is not None:
+            root, keys = path[0], path[1:]
+            if not keys:
+                return lambda context: load_name(root, context)
+
+            def load_path(context):
+                value = load_name(root, context)
+                for key in keys:
+                    if value is None:
+                        return None
+                    value = get_member(value, key)
+                return value
+            return load_path
+        target, key = compile_tree(node[1]), compile_tree(node[2])
+        return lambda context: get_member(target(context), key(context))
+    if kind == 'unary':
+        operand = compile_tree(node[2])
+        if node[1] == '!':
+            return lambda context: not truthy(operand(context))
+        if node[1] == '-':
+            return lambda context: -to_number(operand(context))
+        return lambda context: to_number(operand(context))
+    if kind == 'logical':
+        left, right = compile_tree(node[2]), compile_tree(node[3])
+        if node[1] == '&&':
+            def both(context):
+                value = left(context)
+                return right(context) if truthy(value) else value
+            return both
+
+        def either(context):
+            value = left(context)
+            return value if truthy(value) else right(context)
+        return either
+    if kind == 'ternary':
+        condition, then, otherwise = compile_tree(node[1]), compile_tree(node[2]), compile_tree(node[3])
+        return lambda context: then(context) if truthy(condition(context)) else otherwise(context)
+    if kind == 'array':
+        items = [compile_tree(item) for item in node[1]]
+        return lambda context: [item(context) for item in items]
+    if kind == 'call':
+        callee, arguments = node[1], [compile_tree(argument) for argument in node[2]]
+        if callee[0] == 'name':
+            function = FUNCTIONS[callee[1]]
+            return lambda context: function(*[argument(context) for argument in arguments])
+        receiver, name = compile_tree(callee[1]), compile_tree(callee[2])
+        return lambda context: call_method(receiver(context), name(context),
+                                           [argument(context) for argument in arguments])
+    operator, left, right = BINARY[node[1]], compile_tree(node[2]), compile_tree(node[3])
+    return lambda context: operator(left(context), right(context))
+
+
+def _names(node, found):
+    # Variable paths an expression reads, as dotted strings up to the first computed key
+    kind = node[0]
+    if kind in ('name', 'member'):
+        path = _static_path(node)
+        if path is not None:
+            found.add('.'.join(str(key) for key in path))
+            return
+    if kind == 'call':
+        # the method or function name isn't a variable, its receiver and arguments are
+        if node[1][0] == 'member':
+            _names(node[1][1], found)
+            _names(node[1][2], found)
+        for argument in node[2]:
+            _names(argument, found)
+        return
+    if kind == 'array':
+        for item in node[1]:
+            _names(item, found)
+        return
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            _names(child, found)
+
+
+class Expression:
+    __slots__ = ('source', 'tree', 'evaluate', 'names')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.tree = parse(source)
+        self.evaluate = compile_tree(self.tree)
+        names = set()
+        _names(self.tree, names)
+        self.names = frozenset(names)
+
+    def __call__(self, context: Dict[str, Any]):
+        return self.evaluate(context)
+
+    def test(self, context: Dict[str, Any]) -> bool:
+        return truthy(self.evaluate(context))
+
+    def __repr__(self):
+        return f"Expression({self.source!r})"
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_expression(source: str) -> Expression:
+    # Raises ValueError with the position of the problem for invalid expressions, UnsupportedExpression for ones
+    # using JavaScript the evaluator doesn't implement
+    if not isinstance(source, str):
+        raise TypeError(f"Expression must be a string, not '{type(source).__name__}'.")
+    return Expression(source)
+
+
+def evaluate(source: str, context: Dict[str, Any]):
+    return compile_expression(source).evaluate(context)
+
+
+def is_true(source: str, context: Dict[str, Any]) -> bool:
+    # Truthiness of an expression, the evaluator cond 'when' uses
+    return truthy(compile_expression(source).evaluate(context))
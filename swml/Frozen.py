@@ -0,0 +1,187 @@
+import threading
+import weakref
+
+from .SWMLTypes import Instruction, InstructionType, serialize_value
+
+
+class FrozenParams(dict):
+    # Read-only, hashable params of a frozen instruction. It's still a dict, so it compares equal to the same params
+    # in a plain dict and encodes like one.
+    __slots__ = ('_hash',)
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Frozen instruction params can't be changed.")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(frozenset(self.items()))
+            return self._hash
+
+    def __reduce__(self):
+        return FrozenParams, (dict(self),)
+
+
+class FrozenList(tuple):
+    # A list value of frozen params, serialized back into a list
+    __slots__ = ()
+
+
+def freeze_value(value):
+    if isinstance(value, Instruction):
+        return freeze(value)
+    if isinstance(value, (FrozenParams, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenParams((key, freeze_value(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze_value(item) for item in value)
+    if isinstance(value, tuple):
+        return tuple(freeze_value(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        raise TypeError(f"Can't freeze parameter value of type '{type(value).__name__}'.") from None
+    return value
+
+
+def _typed_key(value):
+    # Tells apart frozen values that compare equal but encode differently: True, 1 and 1.0, or mappings in another
+    # key order. Nested frozen instructions are interned, so they stand for themselves.
+    if isinstance(value, FrozenParams):
+        return FrozenParams, tuple((key, type(key), _typed_key(item)) for key, item in value.items())
+    if isinstance(value, tuple) and not isinstance(value, FrozenInstruction):
+        return type(value), tuple(_typed_key(item) for item in value)
+    if isinstance(value, FrozenInstruction):
+        return value
+    return type(value), value
+
+
+def thaw_value(value):
+    # The serialized form of a frozen value. Frozen instructions nested in it share their cached serialized form.
+    if isinstance(value, FrozenInstruction):
+        return value.shared_serialized()
+    if isinstance(value, FrozenParams):
+        return {key: thaw_value(item) for key, item in value.items()}
+    if isinstance(value, FrozenList):
+        return [thaw_value(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(thaw_value(item) for item in value)
+    return value
+
+
+class FrozenInstruction:
+    # Mixed into the Frozen<Class> subclass of every frozen instruction class. Instances are immutable, compare and
+    # hash by class, name and params, value types included, and serialize once.
+    __slots__ = ()
+    frozen = True
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Frozen instruction '{type(self).__name__}' can't be changed.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Frozen instruction '{type(self).__name__}' can't be changed.")
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenInstruction):
+            return NotImplemented
+        return self is other or (type(self) is type(other) and self._hash == other._hash and
+                                 self.name == other.name and _typed_key(self.params) == _typed_key(other.params))
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # Unpickled copies are interned again in the receiving process
+        return _thaw_and_freeze, (self.thawed_class, self.name, thaw_value(self.params))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, {dict(self.params)!r})"
+
+    def freeze(self):
+        return self
+
+    def thaw(self):
+        # A mutable copy of the instruction in its original class
+        instruction = self.thawed_class.__new__(self.thawed_class)
+        instruction.name = self.name
+        instruction.params = serialize_value(thaw_value(self.params))
+        return instruction
+
+    def shared_serialized(self):
+        serialized = self._serialized
+        if serialized is None:
+            params = thaw_value(self.params)
+            if self.name:
+                serialized = {self.name: params} if params else self.name
+            else:
+                serialized = params
+            object.__setattr__(self, '_serialized', serialized)
+        return serialized
+
+    def serialize(self, memo=None):
+        # A private deep copy, the cached form is shared between every document using this instruction
+        return serialize_value(self.shared_serialized())
+
+    def section_serialized(self):
+        # The form stored in sections: the top level is copied and the nested parts stay shared. Sections never
+        # change stored actions in place, and get_instruction hands out a deep copy.
+        serialized = self.shared_serialized()
+        if isinstance(serialized, dict):
+            if self.name:
+                return {self.name: dict(serialized[self.name])}
+            return dict(serialized)
+        return serialized
+
+
+_frozen_classes = {}
+_interned = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+
+def frozen_class(instruction_class):
+    frozen = _frozen_classes.get(instruction_class)
+    if frozen is None:
+        # subclasses defined outside the package may already have a __weakref__ slot
+        weakref_slot = () if instruction_class.__weakrefoffset__ else ('__weakref__',)
+        frozen = InstructionType(f"Frozen{instruction_class.__name__}", (FrozenInstruction, instruction_class),
+                                 {'__slots__': ('_hash', '_serialized') + weakref_slot,
+                                  '__module__': instruction_class.__module__, 'thawed_class': instruction_class})
+        _frozen_classes[instruction_class] = frozen
+    return frozen
+
+
+def freeze(instruction: Instruction):
+    # Returns the interned frozen copy of instruction: equal instructions frozen anywhere in the process give the same
+    # object, as long as one of them is still in use
+    if isinstance(instruction, FrozenInstruction):
+        return instruction
+    if not isinstance(instruction, Instruction):
+        raise TypeError("Invalid instruction type. Must be an instance of Instruction.")
+    instruction_class = frozen_class(type(instruction))
+    params = freeze_value(instruction.params)
+    key = (instruction_class, instruction.name, _typed_key(params))
+    with _lock:
+        frozen = _interned.get(key)
+        if frozen is None:
+            frozen = instruction_class.__new__(instruction_class)
+            object.__setattr__(frozen, 'name', instruction.name)
+            object.__setattr__(frozen, 'params', params)
+            object.__setattr__(frozen, '_hash', hash(key))
+            object.__setattr__(frozen, '_serialized', None)
+            _interned[key] = frozen
+    return frozen
+
+
+def _thaw_and_freeze(instruction_class, name, params):
+    instruction = instruction_class.__new__(instruction_class)
+    instruction.name = name
+    instruction.params = params
+    return freeze(instruction)
+
+
+def interned_count():
+    return len(_interned)
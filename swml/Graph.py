@@ -0,0 +1,123 @@
+from typing import Dict, List, Tuple
+
+# verbs whose 'dest' names a section to run, and the params holding nested instruction lists
+SECTION_VERBS = ('execute', 'transfer')
+NESTED_PARAMS = {'cond': ('then', 'else'), 'switch': ('case', 'default')}
+
+
+def is_section_name(dest) -> bool:
+    # execute and transfer also accept URLs and relative paths to fetch SWML from, and '%{...}' variables that are
+    # only known during the call. Anything else names a section.
+    return isinstance(dest, str) and bool(dest) and '%{' not in dest and ':' not in dest and '/' not in dest
+
+
+def section_references(actions) -> List[str]:
+    # Section names referenced by a serialized section, in order of appearance, including the ones nested in cond and
+    # switch branches
+    references = []
+    stack = [actions]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple)):
+            stack.extend(reversed(value))
+            continue
+        if not isinstance(value, dict) or len(value) != 1:
+            continue
+        verb, params = next(iter(value.items()))
+        if verb in SECTION_VERBS:
+            # {"execute": "voicemail"} is shorthand for {"execute": {"dest": "voicemail"}}
+            dest = params.get('dest') if isinstance(params, dict) else params
+            if is_section_name(dest):
+                references.append(dest)
+        elif verb in NESTED_PARAMS and isinstance(params, dict):
+            for key in reversed(NESTED_PARAMS[verb]):
+                branch = params.get(key)
+                if isinstance(branch, dict) and verb == 'switch':
+                    stack.extend(reversed(list(branch.values())))
+                elif branch is not None:
+                    stack.append(branch)
+    return references
+
+
+def strongly_connected(edges: Dict[str, List[str]]) -> List[List[str]]:
+    # Iterative Tarjan, so long execute chains can't hit the recursion limit
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for start in edges:
+        if start in index:
+            continue
+        work = [(start, iter(edges[start]))]
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if target not in edges:
+                    continue
+                if target not in index:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(edges[target])))
+                    break
+                if target in on_stack:
+                    low[node] = min(low[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component[::-1])
+    return components
+
+
+class SectionGraph:
+    # The execute/transfer graph of a document. edges maps every section to the sections it references.
+    def __init__(self, edges: Dict[str, List[str]], root: str = 'main'):
+        self.edges = edges
+        self.root = root
+        self.dangling: List[Tuple[str, str]] = [(name, target) for name, targets in edges.items()
+                                                for target in targets if target not in edges]
+        self.cycles: List[List[str]] = [component for component in strongly_connected(edges)
+                                        if len(component) > 1 or component[0] in edges[component[0]]]
+        self.reachable = self._reachable()
+        self.unreachable: List[str] = [name for name in edges if name not in self.reachable]
+
+    @classmethod
+    def from_sections(cls, sections: Dict[str, list], root: str = 'main'):
+        edges = {}
+        for name, actions in sections.items():
+            # each target once, in order of first appearance
+            edges[name] = list(dict.fromkeys(section_references(actions)))
+        return cls(edges, root)
+
+    def _reachable(self):
+        if self.root not in self.edges:
+            return set()
+        seen = {self.root}
+        stack = [self.root]
+        while stack:
+            for target in self.edges[stack.pop()]:
+                if target in self.edges and target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return seen
+
+    def __repr__(self):
+        return (f"SectionGraph(root={self.root!r}, dangling={self.dangling!r}, cycles={self.cycles!r}, "
+                f"unreachable={self.unreachable!r})")
@@ -0,0 +1,55 @@
+import hashlib
+import json
+
+# Content hashes only depend on what a document generates, not on how it's encoded: serialized values are hashed in a
+# canonical JSON form with sorted keys. Placeholders hash by name, so a template and its document differ.
+# Mappings that only differ in key order hash the same, even though they're encoded differently.
+
+
+def _canonical_default(value):
+    return repr(value)
+
+
+def _string_keys(value):
+    # JSON turns non-string keys (switch cases written as numbers) into strings anyway, sorting them needs it first
+    if isinstance(value, dict):
+        return {key if isinstance(key, str) else json.dumps(key): _string_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_string_keys(item) for item in value]
+    return value
+
+
+def canonical_bytes(value) -> bytes:
+    try:
+        encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                             default=_canonical_default)
+    except TypeError:
+        encoded = json.dumps(_string_keys(value), sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                             default=_canonical_default)
+    return encoded.encode('utf-8')
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+def hash_value(value) -> str:
+    return hashlib.sha256(canonical_bytes(value)).hexdigest()
+
+
+def update_hasher(hasher, actions):
+    # Every action is terminated by a newline, which canonical JSON never contains, so appending actions one by one
+    # hashes the same as hashing the whole list at once
+    for action in actions:
+        hasher.update(canonical_bytes(action))
+        hasher.update(b'\n')
+    return hasher
+
+
+def combine_hashes(parts) -> str:
+    # Merkle style: the parent hash only covers the child hashes, unchanged children are never hashed again
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode('ascii'))
+        hasher.update(b'\n')
+    return hasher.hexdigest()
@@ -0,0 +1,156 @@
+import functools
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict
+
+from .SWMLTypes import InstructionType
+from .Sections import Section
+from .SignalWireML import SignalWireML
+
+# The hooks are only installed while at least one Profiler is running. Without one, constructing, serializing and
+# generating run the plain methods and pay nothing for instrumentation. Events only go to the profilers started in
+# the current thread or asyncio task (and tasks it creates), other threads just pass through the hooks.
+_active = []
+_lock = threading.Lock()
+_originals = {}
+_profilers = ContextVar('swml_profilers', default=())
+
+# Eager sections serialize while instructions are added, lazy ones while the document is generated. Either way the
+# time is reported as 'serialize', and is also part of the 'add' or 'encode' time around it.
+SECTION_METHODS = {'add_instruction': 'add', 'extend': 'add', 'add_many': 'add', '_serialize_instruction': 'serialize',
+                   '_serialize_batch': 'serialize', 'serialized_actions': 'serialize', 'encode_fragment': 'encode'}
+
+
+def _dispatch(kind: str, key, seconds: float, size: int = 0):
+    for profiler in _profilers.get():
+        if profiler._running:
+            profiler.record(kind, key, seconds, size)
+
+
+def _timed_call(cls, *args, **kwargs):
+    if not _profilers.get():
+        return type.__call__(cls, *args, **kwargs)
+    start = perf_counter()
+    instance = type.__call__(cls, *args, **kwargs)
+    _dispatch('construct', instance.name or cls.__name__, perf_counter() - start)
+    return instance
+
+
+def _section_hook(method, phase: str):
+    @functools.wraps(method)
+    def hook(self, *args, **kwargs):
+        if not _profilers.get():
+            return method(self, *args, **kwargs)
+        start = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _dispatch('section', (self.name, phase), perf_counter() - start)
+    return hook
+
+
+def _generate_hook(method):
+    @functools.wraps(method)
+    def hook(self, data_format: str = 'json', *args, **kwargs):
+        if not _profilers.get():
+            return method(self, data_format, *args, **kwargs)
+        start = perf_counter()
+        output = method(self, data_format, *args, **kwargs)
+        seconds = perf_counter() - start
+        _dispatch('generate', data_format, seconds, len(output.encode('utf-8')) if isinstance(output, str)
+                  else len(output))
+        return output
+    return hook
+
+
+def _install():
+    InstructionType.__call__ = _timed_call
+    for name, phase in SECTION_METHODS.items():
+        _originals[(Section, name)] = Section.__dict__[name]
+        setattr(Section, name, _section_hook(Section.__dict__[name], phase))
+    _originals[(SignalWireML, 'generate_swml')] = SignalWireML.__dict__['generate_swml']
+    SignalWireML.generate_swml = _generate_hook(SignalWireML.__dict__['generate_swml'])
+
+
+def _uninstall():
+    del InstructionType.__call__
+    for (owner, name), method in _originals.items():
+        setattr(owner, name, method)
+    _originals.clear()
+
+
+class Profiler:
+    # Records instruction construction per verb, add/serialize/encode time per section, and generate_swml time and
+    # output size per format while running. Use it as a context manager or with start and stop, and read the stats
+    # with export. Subclasses can override record to forward every event somewhere else as well. A profiler records
+    # the thread or task that started it, and asyncio tasks created while it runs.
+    def __init__(self):
+        self._running = False
+        self.constructions: Dict[str, Dict[str, float]] = {}
+        self.sections: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self.generated: Dict[str, Dict[str, float]] = {}
+
+    def record(self, kind: str, key, seconds: float, size: int = 0):
+        if kind == 'construct':
+            stats = self.constructions.get(key)
+            if stats is None:
+                stats = self.constructions[key] = {'count': 0, 'seconds': 0.0}
+        elif kind == 'section':
+            name, phase = key
+            phases = self.sections.setdefault(name, {})
+            stats = phases.get(phase)
+            if stats is None:
+                stats = phases[phase] = {'count': 0, 'seconds': 0.0}
+        else:
+            stats = self.generated.get(key)
+            if stats is None:
+                stats = self.generated[key] = {'count': 0, 'seconds': 0.0, 'bytes': 0}
+            stats['bytes'] += size
+        stats['count'] += 1
+        stats['seconds'] += seconds
+
+    def start(self):
+        with _lock:
+            if self._running:
+                raise ValueError("Profiler is already running.")
+            if not _active:
+                _install()
+            _active.append(self)
+            self._running = True
+        _profilers.set(_profilers.get() + (self,))
+        return self
+
+    def stop(self):
+        with _lock:
+            if not self._running:
+                raise ValueError("Profiler is not running.")
+            self._running = False
+            _active.remove(self)
+            if not _active:
+                _uninstall()
+        _profilers.set(tuple(profiler for profiler in _profilers.get() if profiler is not self))
+
+    @property
+    def running(self):
+        return self._running
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset(self):
+        self.constructions = {}
+        self.sections = {}
+        self.generated = {}
+
+    def export(self):
+        # Plain nested dicts of the stats, copied so they can be handed to a metrics exporter while still recording
+        return {
+            'constructions': {verb: dict(stats) for verb, stats in self.constructions.items()},
+            'sections': {name: {phase: dict(stats) for phase, stats in phases.items()}
+                         for name, phases in self.sections.items()},
+            'generate': {data_format: dict(stats) for data_format, stats in self.generated.items()},
+        }
@@ -0,0 +1,222 @@
+import re
+from typing import Any, Callable, Dict, Iterable
+
+from .Expressions import evaluate, is_true, to_string
+from .SWMLTypes import serialize_value
+
+# Runs SWML documents locally against a simulated call. Flow control (cond, switch, execute, transfer, return, set,
+# unset, hangup) is interpreted, prompt and record take their results from scripted inputs, and every other verb is
+# recorded in the trace and answered by a stub that sets the variables the real verb would. Expressions are compiled
+# once by the Expressions module and cached, so simulated calls only evaluate them.
+
+VARIABLE = re.compile(r'%\{([^}]*)}')
+
+
+def resolve(expression: str, context: Dict[str, Any]):
+    # Value of a variable path or expression like 'vars.count' or '%{params.team}'
+    match = VARIABLE.fullmatch(expression.strip())
+    return evaluate(match.group(1) if match else expression, context)
+
+
+def _stringify(value):
+    return '' if value is None else to_string(value)
+
+
+def substitute(value, context: Dict[str, Any]):
+    # Replaces %{path} references in strings, including the ones nested in mappings and lists
+    if isinstance(value, str):
+        if '%{' not in value:
+            return value
+        match = VARIABLE.fullmatch(value)
+        if match:
+            # a value that is only a reference keeps the type of what it refers to
+            return resolve(match.group(1), context)
+        return VARIABLE.sub(lambda found: _stringify(resolve(found.group(1), context)), value)
+    if isinstance(value, dict):
+        return {key: substitute(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, context) for item in value]
+    return value
+
+
+def _request_stub(params, context):
+    response = context['responses'].get(params.get('url'), {})
+    variables = {'request_result': 'success', 'request_url': params.get('url'), 'request_response': response}
+    if params.get('save_variables') and isinstance(response, dict):
+        variables.update(response)
+    return variables
+
+
+# verb -> function(params, context) returning the variables the verb leaves behind
+STUBS = {
+    'connect': lambda params, context: {'connect_result': 'connected'},
+    'request': _request_stub,
+    'send_sms': lambda params, context: {'send_sms_result': 'success'},
+    'send_fax': lambda params, context: {'send_fax_result': 'success'},
+    'receive_fax': lambda params, context: {'receive_fax_result': 'success'},
+    'sip_refer': lambda params, context: {'sip_refer_result': 'success'},
+    'join_room': lambda params, context: {'join_room_result': 'joined'},
+    'record_call': lambda params, context: {'record_call_result': 'success'},
+    'tap': lambda params, context: {'tap_result': 'success'},
+}
+
+
+# parameter given by a verb written with a plain value instead of a mapping
+SHORTHANDS = {'return': 'return_value', 'unset': 'vars'}
+
+
+class CallResult:
+    # outcome is 'completed' when main ran to its end, 'return', 'hangup', 'transferred' (to a URL) or 'step_limit'
+    __slots__ = ('outcome', 'trace', 'variables', 'return_value', 'hangup_reason', 'transfer_dest', 'steps')
+
+    def __init__(self):
+        self.outcome = 'completed'
+        self.trace = []
+        self.variables = {}
+        self.return_value = None
+        self.hangup_reason = None
+        self.transfer_dest = None
+        self.steps = 0
+
+    @property
+    def verbs(self):
+        return [verb for _, verb, _ in self.trace]
+
+    def __repr__(self):
+        return f"CallResult(outcome={self.outcome!r}, steps={self.steps}, verbs={self.verbs!r})"
+
+
+class _Frame:
+    __slots__ = ('actions', 'index', 'section', 'boundary', 'params')
+
+    def __init__(self, actions, section: str, boundary: bool, params=None):
+        self.actions = actions if isinstance(actions, list) else [actions]
+        self.index = 0
+        self.section = section
+        # frames of a whole section started by execute or transfer, return unwinds to the nearest one
+        self.boundary = boundary
+        self.params = params
+
+
+class Interpreter:
+    # Takes a snapshot of a document's sections, then runs any number of simulated calls on it with run. The snapshot
+    # is a deep copy, later changes to the document or the mapping it was given don't affect it.
+    def __init__(self, document, evaluator: Callable = None, stubs: Dict[str, Callable] = None,
+                 max_steps: int = 10000):
+        sections = document.serialize_sections() if hasattr(document, 'serialize_sections') else document
+        self.sections = serialize_value(sections)
+        self.evaluator = evaluator or is_true
+        self.stubs = dict(STUBS, **(stubs or {}))
+        self.max_steps = max_steps
+
+    def run(self, call: Dict[str, Any] = None, inputs: Iterable = (), variables: Dict[str, Any] = None,
+            responses: Dict[str, Any] = None, entry: str = 'main'):
+        # call:      the call scope, e.g. {'from': '+15551234567', 'to': '+15550000000'}
+        # inputs:    answers for prompt and record in order, a string (digits, speech or a recording url) or a
+        #            mapping of the variables to set. Prompts without input get 'no_input'.
+        # responses: request url -> response body for the request stub
+        result = CallResult()
+        context = {'call': call or {}, 'vars': dict(variables or {}), 'params': {}, 'envs': {},
+                   'responses': responses or {}}
+        inputs = iter(inputs)
+        stack = [_Frame(self._section(entry), entry, True)]
+        while stack:
+            frame = stack[-1]
+            if frame.index >= len(frame.actions):
+                stack.pop()
+                if frame.boundary and frame.params is not None:
+                    context['params'] = frame.params
+                continue
+            if result.steps >= self.max_steps:
+                result.outcome = 'step_limit'
+                break
+            result.steps += 1
+            instruction = frame.actions[frame.index]
+            frame.index += 1
+
+            if isinstance(instruction, str):
+                verb, params = instruction, {}
+            elif isinstance(instruction, dict) and len(instruction) == 1:
+                verb, params = next(iter(instruction.items()))
+            else:
+                raise ValueError(f"Invalid instruction in section '{frame.section}': {instruction!r}")
+            result.trace.append((frame.section, verb, params))
+            if not isinstance(params, dict):
+                # {"execute": "voicemail"} and {"return": 1} style shorthands
+                params = {SHORTHANDS.get(verb, 'dest'): params}
+
+            if verb == 'cond':
+                branch = params.get('then') if self.evaluator(params.get('when', ''), context) else params.get('else')
+                if branch is not None:
+                    stack.append(_Frame(branch, frame.section, False))
+            elif verb == 'switch':
+                value = resolve(params.get('variable', ''), context)
+                cases = params.get('case') or {}
+                branch = cases.get(_stringify(value), params.get('default'))
+                if branch is not None:
+                    stack.append(_Frame(branch, frame.section, False))
+            elif verb == 'set':
+                context['vars'].update(substitute(params.get('variables', {}), context))
+            elif verb == 'unset':
+                names = params.get('vars', [])
+                for name in [names] if isinstance(names, str) else names:
+                    context['vars'].pop(name, None)
+            elif verb == 'execute':
+                dest = substitute(params.get('dest'), context)
+                previous = context['params']
+                context['params'] = substitute(params.get('params', {}), context)
+                stack.append(_Frame(self._section(dest), dest, True, previous))
+            elif verb == 'transfer':
+                dest = substitute(params.get('dest'), context)
+                if dest in self.sections:
+                    stack = [_Frame(self._section(dest), dest, True)]
+                else:
+                    result.outcome = 'transferred'
+                    result.transfer_dest = dest
+                    break
+            elif verb == 'return':
+                value = substitute(params.get('return_value'), context)
+                context['vars']['return_value'] = value
+                result.return_value = value
+                while stack:
+                    popped = stack.pop()
+                    if popped.boundary:
+                        if popped.params is not None:
+                            context['params'] = popped.params
+                        break
+                if not stack:
+                    result.outcome = 'return'
+            elif verb == 'hangup':
+                result.outcome = 'hangup'
+                result.hangup_reason = params.get('reason', 'hangup')
+                break
+            elif verb in ('prompt', 'record'):
+                context['vars'].update(self._scripted(verb, next(inputs, None)))
+            elif verb in self.stubs:
+                context['vars'].update(self.stubs[verb](substitute(params, context), context))
+        result.variables = context['vars']
+        return result
+
+    def _section(self, name):
+        if name not in self.sections:
+            raise ValueError(f"Section with name '{name}' does not exist.")
+        return self.sections[name]
+
+    @staticmethod
+    def _scripted(verb: str, value):
+        if isinstance(value, dict):
+            return value
+        if value is not None:
+            value = to_string(value)
+        if verb == 'record':
+            if value is None:
+                return {'record_result': 'no_input'}
+            return {'record_result': 'success', 'record_url': value}
+        if value is None:
+            return {'prompt_result': 'no_input', 'prompt_value': None}
+        result = 'match_digits' if value.replace('#', '').replace('*', '').isdigit() else 'match_speech'
+        return {'prompt_result': result, 'prompt_value': value}
+
+    def run_many(self, calls: Iterable[Dict[str, Any]]):
+        # Runs one call per mapping of run arguments, e.g. [{'inputs': ['1']}, {'inputs': ['2']}]
+        return [self.run(**arguments) for arguments in calls]
@@ -0,0 +1,72 @@
+import yaml
+
+from .SWMLTypes import Instruction, ExplicitParams, AI, Answer, Cond, Connect, Denoise, Execute, Hangup, JoinRoom, \
+    Play, Prompt, ReceiveFax, Record, RecordCall, Request, Return, SendDigits, SendFax, SendSMS, Set, SipRefer, \
+    StopDenoise, StopRecordCall, StopTap, Switch, Tap, Transfer, Unset
+
+# SWML verb name -> Instruction class used when a loaded instruction is accessed
+VERBS = {
+    'ai': AI,
+    'answer': Answer,
+    'cond': Cond,
+    'connect': Connect,
+    'denoise': Denoise,
+    'execute': Execute,
+    'hangup': Hangup,
+    'join_room': JoinRoom,
+    'play': Play,
+    'prompt': Prompt,
+    'receive_fax': ReceiveFax,
+    'record': Record,
+    'record_call': RecordCall,
+    'request': Request,
+    'return': Return,
+    'send_digits': SendDigits,
+    'send_fax': SendFax,
+    'send_sms': SendSMS,
+    'set': Set,
+    'sip_refer': SipRefer,
+    'stop_denoise': StopDenoise,
+    'stop_record_call': StopRecordCall,
+    'stop_tap': StopTap,
+    'switch': Switch,
+    'tap': Tap,
+    'transfer': Transfer,
+    'unset': Unset,
+}
+
+YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def materialize_instruction(raw):
+    # Turns a serialized instruction into its Instruction class without running the constructor, the params are
+    # taken as they are. Shorthand like {"execute": "voicemail"} and other mappings that aren't a single verb with
+    # params become a nameless Instruction holding the mapping, which serializes back to it unchanged.
+    if isinstance(raw, str):
+        verb, params = raw, {}
+    elif isinstance(raw, dict) and len(raw) == 1 and isinstance(next(iter(raw.values())), dict):
+        verb, params = next(iter(raw.items()))
+        if not params:
+            params = ExplicitParams()
+    elif isinstance(raw, dict):
+        verb, params = None, raw
+    else:
+        raise ValueError(f"Invalid instruction {raw!r}. Expected a verb name or a mapping.")
+
+    instruction_class = VERBS.get(verb, Instruction)
+    instruction = instruction_class.__new__(instruction_class)
+    instruction.name = verb
+    instruction.params = params
+    return instruction
+
+
+def parse_document(data, data_format: str = None, json_backend=None):
+    if data_format is None:
+        # SWML documents are always mappings, so JSON ones start with a brace
+        data_format = 'json' if data.lstrip()[:1] in ('{', b'{') else 'yaml'
+
+    if data_format == 'json':
+        return json_backend.loads(data)
+    elif data_format == 'yaml':
+        return yaml.load(data, Loader=YAMLLoader)
+    raise ValueError(f"Invalid data format '{data_format}'. Valid formats are 'json' and 'yaml'.")
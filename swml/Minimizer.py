@@ -0,0 +1,146 @@
+import json
+from typing import Dict, List
+
+from .Schema import VERB_SCHEMAS
+from .Graph import NESTED_PARAMS
+
+# The passes never change the serialized data they're given, which can be shared with sections and their caches.
+# Changed containers are copied, unchanged ones are reused as is.
+
+def map_instructions(actions, function):
+    # Applies function to every instruction of a list, including the ones nested in cond and switch branches, and
+    # returns the same list when nothing changed
+    if not isinstance(actions, list):
+        return actions
+    changed = False
+    result = []
+    for instruction in actions:
+        new = function(_map_branches(instruction, function))
+        changed = changed or new is not instruction
+        result.append(new)
+    return result if changed else actions
+
+
+def _map_branches(instruction, function):
+    if not isinstance(instruction, dict) or len(instruction) != 1:
+        return instruction
+    verb, params = next(iter(instruction.items()))
+    if verb not in NESTED_PARAMS or not isinstance(params, dict):
+        return instruction
+    new_params = dict(params)
+    changed = False
+    for key in NESTED_PARAMS[verb]:
+        branch = params.get(key)
+        if isinstance(branch, dict) and verb == 'switch':
+            cases = {name: map_instructions(actions, function) for name, actions in branch.items()}
+            if any(cases[name] is not actions for name, actions in branch.items()):
+                new_params[key] = cases
+        elif isinstance(branch, list):
+            new_params[key] = map_instructions(branch, function)
+        elif branch is not None:
+            new_params[key] = map_instructions([branch], function)[0]
+        changed = changed or new_params.get(key) is not branch
+    return {verb: new_params} if changed else instruction
+
+
+# verb -> optional parameters whose empty value means the same as leaving them out. Everything else is kept, empty
+# or not: variables, bodies, meta data and the like are data the call uses.
+OMIT_EMPTY = {verb: frozenset(key for key, spec in schema['fields'].items()
+                              if spec['omit_empty'] and not spec['required'])
+              for verb, schema in VERB_SCHEMAS.items()}
+
+
+def _strip_empty(instruction):
+    if not isinstance(instruction, dict) or len(instruction) != 1:
+        return instruction
+    verb, params = next(iter(instruction.items()))
+    omit = OMIT_EMPTY.get(verb)
+    if not omit or not isinstance(params, dict):
+        return instruction
+    kept = {key: value for key, value in params.items()
+            if not (key in omit and isinstance(value, (dict, list, tuple)) and not value)}
+    return {verb: kept} if len(kept) != len(params) else instruction
+
+
+def strip_empty(actions):
+    # Drops the optional verb parameters marked omit_empty in the schema when their value is an empty mapping or list
+    return map_instructions(actions, _strip_empty)
+
+
+def _collapse_verb(instruction):
+    if isinstance(instruction, dict) and len(instruction) == 1:
+        verb, params = next(iter(instruction.items()))
+        if verb in VERB_SCHEMAS and (params is None or params == {}):
+            return verb
+    return instruction
+
+
+def collapse_verbs(actions):
+    # {"answer": {}} becomes "answer", the form Instruction.serialize already uses for instructions without params
+    return map_instructions(actions, _collapse_verb)
+
+
+def _dedupe_ai_functions(instruction):
+    if not isinstance(instruction, dict) or not isinstance(instruction.get('ai'), dict):
+        return instruction
+    params = instruction['ai']
+    swaig = params.get('SWAIG')
+    functions = swaig.get('functions') if isinstance(swaig, dict) else None
+    if not isinstance(functions, list):
+        return instruction
+    seen = set()
+    unique = []
+    for function in functions:
+        key = json.dumps(function, sort_keys=True, default=repr)
+        if key not in seen:
+            seen.add(key)
+            unique.append(function)
+    if len(unique) == len(functions):
+        return instruction
+    return {'ai': dict(params, SWAIG=dict(swaig, functions=unique))}
+
+
+def dedupe_functions(actions):
+    # Removes SWAIG function definitions repeated verbatim within one ai instruction, only the first one is used
+    return map_instructions(actions, _dedupe_ai_functions)
+
+
+# (name, pass) in the order they're applied
+PASSES = [
+    ('strip_empty', strip_empty),
+    ('collapse_verbs', collapse_verbs),
+    ('dedupe_functions', dedupe_functions),
+]
+
+
+def minimize_sections(sections: Dict[str, list], passes: List[str] = None) -> Dict[str, Dict[str, list]]:
+    # Returns the sections after each pass, keyed by pass name
+    names = [name for name, _ in PASSES]
+    unknown = set(passes or ()) - set(names) - {'compact'}
+    if unknown:
+        raise ValueError(f"Invalid minimizer pass(es): {', '.join(sorted(unknown))}. Valid passes are: "
+                         f"{', '.join(names + ['compact'])}.")
+    steps = {}
+    for name, function in PASSES:
+        if passes is None or name in passes:
+            sections = {section: function(actions) for section, actions in sections.items()}
+            steps[name] = sections
+    return steps
+
+
+class MinimizeReport:
+    # Encoded document sizes in bytes before and after minimizing, saved maps every pass that ran to what it saved
+    def __init__(self, original_size: int, saved: Dict[str, int]):
+        self.original_size = original_size
+        self.saved = saved
+
+    @property
+    def size(self):
+        return self.original_size - self.total_saved
+
+    @property
+    def total_saved(self):
+        return sum(self.saved.values())
+
+    def __repr__(self):
+        return f"MinimizeReport(original_size={self.original_size}, size={self.size}, saved={self.saved!r})"
@@ -1,33 +1,147 @@
 import json
 from typing import Union, Dict, Any, Optional, List, Tuple
 
+from . import Schema as _schema
+from .Hashing import hash_value
 
 
-class Instruction:
-    def __init__(self, class_name: str = None, **kwargs):
-        self.name = class_name
-        self.params = {k: v for k, v in kwargs.items() if v is not None and k != 'class_name'}
+_PACKAGE = __name__.rpartition('.')[0]
+
+
+class InstructionType(type):
+    # Gives the package's Instruction subclasses an empty __slots__ unless they declare their own, so instances only
+    # carry the 'name' and 'params' slots and no per-instance __dict__. Subclasses defined elsewhere are left alone and
+    # can set attributes of their own as usual.
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        module = namespace.get('__module__', '')
+        if module == _PACKAGE or module.startswith(_PACKAGE + '.'):
+            namespace.setdefault('__slots__', ())
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+
+class ExplicitParams(dict):
+    # Empty params of a loaded instruction written as {"verb": {}}, which serializes back to that form instead of "verb"
+    pass
+
+
+def _serialized_shape(instruction, params):
+    if instruction.name:
+        if not params and type(instruction.params) is not ExplicitParams:
+            return instruction.name  # Return name only if there are no parameters
+        return {instruction.name: params}
+    else:
+        return params  # Return only the serialized parameters if no name is provided
+
 
-    def serialize(self):
-        def serialize_recursively(obj):
+def serialize_value(value, memo: Optional[Dict[int, Any]] = None):
+    # Depth-first copy of a params tree with every Instruction replaced by its serialized form. It runs off an
+    # explicit stack so deep Cond/Switch nesting can't hit the recursion limit. Nested instructions met again with the
+    # same memo, e.g. one DataMap shared by many functions, reuse the first result instead of being walked again.
+    if isinstance(value, Instruction):
+        if value.frozen:
+            return value.section_serialized()
+        for child in value.params.values():
+            if isinstance(child, _CONTAINERS):
+                break
+        else:
+            # Most instructions only hold scalars. Those are copied in one go, which is cheaper than a memo lookup.
+            return _serialized_shape(value, dict(value.params))
+
+    if memo is None:
+        memo = {}
+    root = [None]
+    # (source value, output container, key or index in the output container)
+    stack = [(value, root, 0)]
+    while stack:
+        value, target, key = stack.pop()
+        if isinstance(value, Instruction):
+            if value.frozen:
+                # frozen instructions serialize once and share the result
+                target[key] = value.shared_serialized()
+                continue
+            cached = memo.get(id(value))
+            if cached is not None:
+                target[key] = cached[1]
+                continue
+            # The shape only depends on whether there are params, so it can be built before they're filled in
+            params = dict.fromkeys(value.params)
+            serialized = _serialized_shape(value, params)
+            # The instruction is kept in the memo so its id can't be reused by another object during the build
+            memo[id(value)] = (value, serialized)
+            target[key] = serialized
+            items = value.params.items()
+            output = params
+        elif isinstance(value, dict):
+            output = target[key] = dict.fromkeys(value)
+            items = value.items()
+        elif isinstance(value, list):
+            output = target[key] = [None] * len(value)
+            items = enumerate(value)
+        else:
+            target[key] = value
+            continue
 
-            if isinstance(obj, Instruction):
-                return obj.serialize()
-            elif isinstance(obj, dict):
-                return {k: serialize_recursively(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [serialize_recursively(item) for item in obj]
+        for child_key, child in items:
+            if isinstance(child, _CONTAINERS):
+                stack.append((child, output, child_key))
             else:
-                return obj
+                output[child_key] = child
+    return root[0]
+
 
-        serialized_params = serialize_recursively(self.params)
+class Instruction(metaclass=InstructionType):
+    __slots__ = ('name', 'params')
+    # True for the immutable copies returned by freeze
+    frozen = False
 
-        if self.name:
-            if not serialized_params:
-                return self.name  # Return name only if there are no parameters
-            return {self.name: serialized_params}
+    def __init__(self, class_name: str = None, **kwargs):
+        self.name = class_name
+        self.params = {k: v for k, v in kwargs.items() if v is not None}
+        if _schema.is_validation_enabled():
+            _schema.validate_instruction(self)
+
+    def serialize(self, memo: Optional[Dict[int, Any]] = None):
+        # Pass the same memo dict when serializing several instructions of one document to share their sub-objects
+        return serialize_value(self, memo)
+
+    def content_hash(self):
+        # SHA-256 of the serialized instruction, equal for instructions that generate the same SWML
+        return hash_value(self.serialize())
+
+    def freeze(self):
+        # Immutable, hashable and interned copy of the instruction, see Frozen.freeze
+        from .Frozen import freeze
+        return freeze(self)
+
+
+# values serialize_value has to walk into
+_CONTAINERS = (Instruction, dict, list)
+
+
+def estimate_size(value, limit: float = float('inf')) -> int:
+    # Rough size in bytes of the encoded value, Instruction objects included. Counting stops once it passes limit, so
+    # deciding whether a large document is large costs no more than walking limit bytes of it.
+    size = 0
+    stack = [value]
+    while stack and size <= limit:
+        value = stack.pop()
+        if isinstance(value, str):
+            size += len(value) + 4
+        elif isinstance(value, dict):
+            size += 2
+            for key, item in value.items():
+                size += len(key) + 4 if isinstance(key, str) else 8
+                stack.append(item)
+        elif isinstance(value, (list, tuple)):
+            size += 2 + len(value)
+            stack.extend(value)
+        elif isinstance(value, Instruction):
+            size += len(value.name or '') + 6
+            stack.append(value.params)
         else:
-            return serialized_params  # Return only the serialized parameters if no name is provided
+            size += 6
+    return size
+_schema._instruction_type = (Instruction,)
 
 
 class Action(Instruction):
@@ -210,6 +324,11 @@ class DataMap(Instruction):
             webhooks=webhooks
         )
 
+    def evaluate(self, args: Dict[str, Any], variables: Optional[Dict[str, Any]] = None):
+        # Output of the first expression matching args, see DataMaps.CompiledDataMap to evaluate many argument sets
+        from .DataMaps import evaluate_data_map
+        return evaluate_data_map(self, args, variables)
+
 
 # SWAIGFunction Class
 class SWAIGFunction(Instruction):
@@ -365,10 +484,6 @@ class Connect(Instruction):
                  serial_parallel: Optional[List[List[Dict[str, str]]]] = None,
                  serial: Optional[List[Dict[str, str]]] = None, parallel: Optional[List[Dict[str, str]]] = None,
                  to_number: Optional[str] = None):
-        dialing_params = [serial_parallel, serial, parallel, to_number]
-        if sum(param is not None for param in dialing_params) != 1:
-            raise ValueError(
-                "Exactly one of the dialing parameters (serial_parallel, serial, parallel, to_number) must be provided.")
         super().__init__(class_name='connect',
                          from_number=from_number,
                          headers=headers,
@@ -408,8 +523,6 @@ class Execute(Instruction):
 
 class Hangup(Instruction):
     def __init__(self, reason=None):
-        if reason is not None and reason not in ['busy', 'hangup', 'decline']:
-            raise ValueError("Hangup reason must be one of the following: 'hangup', 'busy', or 'decline'")
         super().__init__(class_name='hangup', reason=reason)
 
 
@@ -426,9 +539,6 @@ class Play(Instruction):
                  say_voice: Optional[str] = None,
                  silence: Optional[float] = None,
                  ring: Optional[Tuple[float, str]] = None):
-        if url is not None and urls is not None:
-            raise ValueError("Cannot provide both 'url' and 'urls'. Please provide only one.")
-
         super().__init__(class_name='play', urls=urls, url=url, volume=volume, say_voice=say_voice, silence=silence,
                          ring=ring)
 
@@ -484,12 +594,8 @@ class Record(Instruction):
                  input_sensitivity: Optional[float] = None,
                  initial_timeout: Optional[float] = None,
                  end_silence_timeout: Optional[float] = None):
-        if format_ is not None and format_ not in ['wav', 'mp3']:
-            raise ValueError("Format must be one of the following: 'wav', 'mp3'")
-        if direction is not None and direction not in ['speak', 'listen', 'both']:
-            raise ValueError("Direction must be one of the following: 'speak', 'listen', 'both'")
-
         super().__init__(
+            class_name='record',
             stereo=stereo,
             format=format_,
             direction=direction,
@@ -512,10 +618,6 @@ class RecordCall(Instruction):
                  input_sensitivity: Optional[float] = None,
                  initial_timeout: Optional[float] = None,
                  end_silence_timeout: Optional[float] = None):
-        if format_ is not None and format_ not in ['wav', 'mp3']:
-            raise ValueError("Format must be one of the following: 'wav', 'mp3'")
-        if direction is not None and direction not in ['speak', 'listen', 'both']:
-            raise ValueError("Direction must be one of the following: 'speak', 'listen', 'both'")
         super().__init__(
             class_name='record_call',
             control_id=control_id,
@@ -539,10 +641,6 @@ class Request(Instruction):
                  timeout: Optional[float] = None,
                  connect_timeout: Optional[float] = None,
                  save_variables: Optional[bool] = None):
-        if method not in ['GET', 'POST', 'PUT', 'DELETE']:
-            raise ValueError(
-                "Invalid request method. Method must be one of the following: 'GET', 'POST', 'PUT', 'PATCH', 'DELETE'")
-
         super().__init__(
             class_name='request',
             url=url,
@@ -626,12 +724,6 @@ class Tap(Instruction):
                  direction: Optional[str] = None,
                  codec: Optional[str] = None,
                  rtp_ptime: Optional[int] = None):
-        valid_directions = ["speak", "hear", "both"]
-        valid_codecs = ["PCMU", "PCMA"]
-        if direction and direction not in valid_directions:
-            raise ValueError(f"Invalid direction. Expected one of {valid_directions}")
-        if codec and codec not in valid_codecs:
-            raise ValueError(f"Invalid codec. Expected one of {valid_codecs}")
         super().__init__(class_name="tap", uri=uri, control_id=control_id, direction=direction, codec=codec,
                          rtp_ptime=rtp_ptime)
 
@@ -0,0 +1,480 @@
+import re
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from .Templates import Placeholder
+from .Expressions import compile_expression, UnsupportedExpression
+
+# Turns the per-instruction validation in Instruction.__init__ on or off: set_validation for the whole process, the
+# validation context manager for the current thread or task only. Whole documents can still be checked with
+# SignalWireML.validate when it's off.
+_validation_default = True
+_validation = ContextVar('swml_validation', default=None)
+
+# numbers written as strings, e.g. max_duration="30", are accepted by number fields
+NUMERIC_STRINGS = {
+    int: re.compile(r'\s*[-+]?\d+\s*'),
+    float: re.compile(r'\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*'),
+}
+
+STRING = (str,)
+NUMBER = (int, float)
+INTEGER = (int,)
+BOOLEAN = (bool,)
+LIST = (list, tuple)
+DICT = (dict,)
+ANY = (object,)
+
+# Set by SWMLTypes once Instruction exists. Built instructions nested in params were validated when constructed.
+_instruction_type = ()
+
+
+def field(*types, required: bool = False, choices: Optional[List[Any]] = None, message: Optional[str] = None,
+          schema: Optional[str] = None, values: Optional[str] = None, instructions: Optional[str] = None,
+          expression: bool = False, omit_empty: bool = False):
+    # types:        accepted Python types, any type when empty
+    # choices:      accepted values
+    # message:      error raised for a bad type or value instead of the generated one
+    # schema:       OBJECT_SCHEMAS entry a mapping value, or each mapping in a list value, must match
+    # values:       OBJECT_SCHEMAS entry every value of a mapping must match
+    # instructions: 'list' for a list of SWML instructions, 'map' for a mapping of such lists
+    # expression:   the string must compile as an expression, see Expressions
+    # omit_empty:   an empty mapping or list means the same as leaving the parameter out, see Minimizer.strip_empty
+    return {'types': types or ANY, 'required': required, 'choices': choices, 'message': message, 'schema': schema,
+            'values': values, 'instructions': instructions, 'expression': expression, 'omit_empty': omit_empty}
+
+
+RECORD_FIELDS = {
+    'stereo': field(bool),
+    'format': field(str, choices=['wav', 'mp3'], message="Format must be one of the following: 'wav', 'mp3'"),
+    'direction': field(str, choices=['speak', 'listen', 'both'],
+                       message="Direction must be one of the following: 'speak', 'listen', 'both'"),
+    'terminators': field(str),
+    'beep': field(bool),
+    'input_sensitivity': field(int, float),
+    'initial_timeout': field(int, float),
+    'end_silence_timeout': field(int, float),
+}
+
+# SWML verbs by name: 'fields' maps each parameter to its field(), 'exactly_one' and 'at_most_one' hold
+# (parameter names, message) rules across fields
+VERB_SCHEMAS = {
+    'ai': {'fields': {
+        'voice': field(str),
+        'prompt': field(dict, schema='PromptParams'),
+        'post_prompt': field(dict, schema='PromptParams'),
+        'post_prompt_url': field(str),
+        'post_prompt_auth_user': field(str),
+        'post_prompt_auth_password': field(str),
+        'params': field(dict, schema='AIParams'),
+        'SWAIG': field(dict, schema='SWAIGParams'),
+        'hints': field(list, tuple, omit_empty=True),
+        'languages': field(list, tuple, schema='LanguageParams', omit_empty=True),
+        'pronounce': field(dict, list, tuple, schema='Pronounce', omit_empty=True),
+    }},
+    'answer': {'fields': {'max_duration': field(int)}},
+    'cond': {'fields': {
+        'when': field(str, required=True, expression=True),
+        'then': field(instructions='list', omit_empty=True),
+        'else': field(instructions='list', omit_empty=True),
+    }},
+    'connect': {
+        'fields': {
+            'from_number': field(str),
+            'headers': field(dict, list, tuple, omit_empty=True),
+            'codecs': field(str),
+            'webrtc_media': field(bool),
+            'session_timeout': field(int),
+            'ringback': field(str, list, tuple),
+            'timeout': field(int),
+            'max_duration': field(int),
+            'answer_on_bridge': field(bool),
+            'call_state_url': field(str),
+            'call_state_events': field(list, tuple, omit_empty=True),
+            'result': field(dict, list, tuple),
+            'serial_parallel': field(list, tuple),
+            'serial': field(list, tuple),
+            'parallel': field(list, tuple),
+            'to_number': field(str),
+        },
+        'exactly_one': [(('serial_parallel', 'serial', 'parallel', 'to_number'),
+                         "Exactly one of the dialing parameters (serial_parallel, serial, parallel, to_number) must "
+                         "be provided.")],
+    },
+    'denoise': {'fields': {}},
+    'execute': {'fields': {'dest': field(str, required=True), 'params': field(dict)}},
+    'hangup': {'fields': {
+        'reason': field(str, choices=['busy', 'hangup', 'decline'],
+                        message="Hangup reason must be one of the following: 'hangup', 'busy', or 'decline'"),
+    }},
+    'join_room': {'fields': {'name': field(str, required=True)}},
+    'play': {
+        'fields': {
+            'urls': field(str, list, tuple, omit_empty=True),
+            'url': field(str),
+            'volume': field(int, float),
+            'say_voice': field(str),
+            'silence': field(int, float),
+            'ring': field(list, tuple),
+        },
+        'at_most_one': [(('url', 'urls'), "Cannot provide both 'url' and 'urls'. Please provide only one.")],
+    },
+    'prompt': {'fields': {
+        'play': field(str, list, tuple, required=True),
+        'volume': field(int, float),
+        'say_voice': field(str),
+        'say_language': field(str),
+        'say_gender': field(str),
+        'max_digits': field(int),
+        'terminators': field(str),
+        'digit_timeout': field(int, float),
+        'initial_timeout': field(int, float),
+        'speech_timeout': field(int, float),
+        'speech_end_timeout': field(int, float),
+        'speech_language': field(str),
+        'speech_hints': field(list, tuple, omit_empty=True),
+        'result': field(dict, list, tuple),
+    }},
+    'receive_fax': {'fields': {}},
+    'record': {'fields': RECORD_FIELDS},
+    'record_call': {'fields': dict(RECORD_FIELDS, control_id=field(str))},
+    'request': {'fields': {
+        'url': field(str, required=True),
+        'method': field(str, required=True, choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
+                        message="Invalid request method. Method must be one of the following: 'GET', 'POST', 'PUT', "
+                                "'PATCH', 'DELETE'"),
+        'headers': field(dict),
+        'body': field(str, dict),
+        'timeout': field(int, float),
+        'connect_timeout': field(int, float),
+        'save_variables': field(bool),
+    }},
+    'return': {'fields': {'return_value': field()}},
+    'send_digits': {'fields': {'digits': field(str, required=True)}},
+    'send_fax': {'fields': {'document': field(str, required=True), 'header_info': field(str),
+                            'identity': field(str)}},
+    'send_sms': {'fields': {
+        'to_number': field(str, required=True),
+        'from_number': field(str, required=True),
+        'body': field(str, required=True),
+        'media': field(list, tuple),
+        'region': field(str),
+        'tags': field(list, tuple),
+    }},
+    'set': {'fields': {'variables': field(dict, required=True)}},
+    'sip_refer': {'fields': {'to_uri': field(str, required=True), 'result': field(dict, list, tuple)}},
+    'stop_denoise': {'fields': {}},
+    'stop_record_call': {'fields': {'control_id': field(str)}},
+    'stop_tap': {'fields': {'control_id': field(str, required=True)}},
+    'switch': {'fields': {
+        'variable': field(str, required=True, expression=True),
+        'case': field(dict, instructions='map', omit_empty=True),
+        'default': field(instructions='list', omit_empty=True),
+    }},
+    'tap': {'fields': {
+        'uri': field(str, required=True),
+        'control_id': field(str),
+        'direction': field(str, choices=['speak', 'hear', 'both'],
+                           message="Invalid direction. Expected one of ['speak', 'hear', 'both']"),
+        'codec': field(str, choices=['PCMU', 'PCMA'], message="Invalid codec. Expected one of ['PCMU', 'PCMA']"),
+        'rtp_ptime': field(int),
+    }},
+    'transfer': {'fields': {'dest': field(str, required=True), 'params': field(dict), 'meta': field(dict),
+                            'result': field(dict, list, tuple)}},
+    'unset': {'fields': {'vars': field(str, list, tuple, required=True)}},
+}
+
+# Objects nested inside verbs and AI actions, by class name
+OBJECT_SCHEMAS = {
+    'PromptParams': {'fields': {
+        'text': field(str),
+        'language': field(str),
+        'temperature': field(int, float),
+        'top_p': field(int, float),
+        'confidence': field(int, float),
+        'presence_penalty': field(int, float),
+        'frequency_penalty': field(int, float),
+        'result': field(dict, list, tuple),
+    }},
+    'AIParams': {'fields': {
+        'direction': field(str),
+        'wait_for_user': field(bool),
+        'end_of_speech_timeout': field(int),
+        'attention_timeout': field(int),
+        'inactivity_timeout': field(int),
+        'background_file': field(str),
+        'background_file_loops': field(int),
+        'background_file_volume': field(int, float),
+        'ai_volume': field(int, float),
+        'local_tz': field(str),
+        'conscience': field(bool),
+        'save_conversation': field(bool),
+        'conversation_id': field(str),
+        'digit_timeout': field(int),
+        'digit_terminators': field(str),
+        'energy_level': field(int, float),
+        'swaig_allow_swml': field(bool),
+    }},
+    'SWAIGParams': {'fields': {
+        'functions': field(list, tuple, schema='SWAIGFunction'),
+        'defaults': field(dict, schema='SWAIGDefaults'),
+        'includes': field(list, tuple),
+    }},
+    'SWAIGDefaults': {'fields': {
+        'web_hook_url': field(str),
+        'web_hook_auth_user': field(str),
+        'web_hook_auth_password': field(str),
+        'meta_data': field(dict),
+        'meta_data_token': field(str),
+    }},
+    'SWAIGFunction': {'fields': {
+        'function': field(str, required=True),
+        'purpose': field(str, required=True),
+        'active': field(bool),
+        'web_hook_url': field(str),
+        'web_hook_auth_user': field(str),
+        'web_hook_auth_pass': field(str),
+        'argument': field(dict, schema='FunctionArgs'),
+        'data_map': field(dict, schema='DataMap'),
+    }},
+    'FunctionArgs': {'fields': {'type': field(str, required=True), 'properties': field(dict, values='PropertyDetail')}},
+    'PropertyDetail': {'fields': {'type': field(str), 'description': field(str)}},
+    'DataMap': {'fields': {
+        'expressions': field(list, tuple, schema='DataMapExpression'),
+        'webhooks': field(list, tuple, schema='DataMapWebhook'),
+    }},
+    'DataMapExpression': {'fields': {
+        'string': field(str, required=True),
+        'pattern': field(str, required=True),
+        'output': field(dict, required=True, schema='DataMapExpressionOutput'),
+    }},
+    'DataMapExpressionOutput': {'fields': {'response': field(str), 'action': field(list, tuple, dict)}},
+    'DataMapWebhook': {'fields': {
+        'url': field(str, required=True),
+        'headers': field(dict),
+        'method': field(str, required=True),
+        'output': field(dict, required=True, schema='DataMapWebhookOutput'),
+    }},
+    'DataMapWebhookOutput': {'fields': {'response': field(str), 'action': field(list, tuple, dict)}},
+    'LanguageParams': {'fields': {
+        'name': field(str),
+        'code': field(str),
+        'voice': field(str),
+        'fillers': field(list, tuple),
+        'engine': field(str),
+    }},
+    'Pronounce': {'fields': {'replace': field(str), 'with': field(str), 'ignore_case': field(bool)}},
+    'SWMLAction': {'fields': {'SWML': field(str, required=True)}},
+    'ContextSwitch': {'fields': {'system_prompt': field(str, required=True), 'user_prompt': field(str),
+                                 'consolidate': field(bool)}},
+    'Say': {'fields': {'say': field(str, required=True)}},
+    'Stop': {'fields': {'stop': field(bool)}},
+    'ToggleFunctions': {'fields': {'active': field(bool), 'functions': field(str, list, tuple)}},
+    'BackToBackFunctions': {'fields': {'back_to_back_functions': field(bool)}},
+    'SetMetaData': {'fields': {'meta_data': field(dict, required=True)}},
+    'PlaybackBG': {'fields': {'file': field(str, required=True), 'wait': field(bool)}},
+    'StopPlaybackBG': {'fields': {'stop_playback': field(bool)}},
+    'UserInput': {'fields': {'input_text': field(str, required=True)}},
+}
+
+
+class Reporter:
+    # Collects errors with their location in document mode, raises the first one everywhere else
+    __slots__ = ('errors',)
+
+    def __init__(self, errors: Optional[List[str]]):
+        self.errors = errors
+
+    def __call__(self, path: str, message: str):
+        if self.errors is None:
+            raise ValueError(message)
+        self.errors.append(f"{path}: {message}" if path else message)
+
+
+def _is_free(value):
+    # Placeholders and SWML variable substitutions ('%{vars.timeout}') are only known when the call runs
+    return isinstance(value, Placeholder) or (isinstance(value, str) and '%{' in value)
+
+
+def _join(parent: str, key) -> str:
+    return f"{parent}.{key}" if parent else str(key)
+
+
+def _compile_field(owner: str, key: str, spec: Dict[str, Any]) -> Callable:
+    types = tuple(spec['types'])
+    # bool is an int subclass, but true isn't a number in SWML
+    rejects_bool = bool not in types and any(issubclass(bool, accepted) for accepted in types) and object not in types
+    numeric_string = None
+    if str not in types and object not in types:
+        numeric_string = NUMERIC_STRINGS.get(float if float in types else int if int in types else None)
+    choices = frozenset(spec['choices']) if spec['choices'] else None
+    message = spec['message']
+    type_names = ', '.join(accepted.__name__ for accepted in types)
+    type_message = message or f"Invalid value for '{key}' in '{owner}'. Expected {type_names}."
+    choice_message = message or f"Invalid value for '{key}' in '{owner}'. Expected one of {sorted(choices or [])}."
+    schema, values, instructions = spec['schema'], spec['values'], spec['instructions']
+    expression = spec['expression']
+    nested = schema is not None or values is not None or instructions is not None
+
+    # Paths are only built when something is reported or nested, valid scalars cost a couple of type checks
+    def check(value, report, parent):
+        if not isinstance(value, types) or (rejects_bool and isinstance(value, bool)):
+            if numeric_string is not None and isinstance(value, str) and numeric_string.fullmatch(value):
+                if choices is not None and float(value) not in choices:
+                    report(_join(parent, key), choice_message)
+                return
+            # Built objects were validated when they were constructed
+            if not _is_free(value) and not isinstance(value, _instruction_type):
+                report(_join(parent, key), type_message)
+            return
+        if choices is not None and value not in choices:
+            if not _is_free(value):
+                report(_join(parent, key), choice_message)
+            return
+        if expression and not _is_free(value):
+            # compiled once per source string, later instructions with the same expression hit the cache
+            try:
+                compile_expression(value)
+            except UnsupportedExpression:
+                # possibly valid JavaScript, only evaluating it locally fails
+                pass
+            except ValueError as error:
+                report(_join(parent, key), f"Invalid value for '{key}' in '{owner}'. {error}")
+        if not nested:
+            return
+        path = _join(parent, key)
+        if schema is not None:
+            if isinstance(value, dict):
+                OBJECT_VALIDATORS[schema](value, report, path)
+            elif isinstance(value, LIST):
+                for index, item in enumerate(value):
+                    if isinstance(item, dict):
+                        OBJECT_VALIDATORS[schema](item, report, f"{path}[{index}]")
+        if values is not None:
+            for name, item in value.items():
+                if isinstance(item, dict):
+                    OBJECT_VALIDATORS[values](item, report, f"{path}.{name}")
+        if instructions == 'list':
+            _validate_instruction_list(value, report, path)
+        elif instructions == 'map':
+            for name, item in value.items():
+                _validate_instruction_list(item, report, f"{path}.{name}")
+
+    return check
+
+
+def compile_schema(owner: str, schema: Dict[str, Any]) -> Callable:
+    # Turns a schema table entry into a validator(params, report, path) closure with everything it needs precomputed
+    checks = {key: _compile_field(owner, key, spec) for key, spec in schema['fields'].items()}
+    # Values of these exact types are valid for their field without calling its check: no choices, no nesting
+    plain = {key: frozenset(spec['types'])
+             for key, spec in schema['fields'].items()
+             if not spec['choices'] and spec['schema'] is None and spec['values'] is None
+             and spec['instructions'] is None and not spec['expression'] and object not in spec['types']}
+    empty = frozenset()
+    required = tuple(key for key, spec in schema['fields'].items() if spec['required'])
+    exactly_one = tuple((tuple(keys), message) for keys, message in schema.get('exactly_one', ()))
+    at_most_one = tuple((tuple(keys), message) for keys, message in schema.get('at_most_one', ()))
+
+    def validator(params, report, path=''):
+        for key, value in params.items():
+            if type(value) in plain.get(key, empty):
+                continue
+            check = checks.get(key)
+            if check is not None:
+                check(value, report, path)
+        for key in required:
+            if params.get(key) is None:
+                report(path, f"Missing required parameter '{key}' in '{owner}'.")
+        for keys, message in exactly_one:
+            if sum(params.get(key) is not None for key in keys) != 1:
+                report(path, message)
+        for keys, message in at_most_one:
+            if sum(params.get(key) is not None for key in keys) > 1:
+                report(path, message)
+
+    return validator
+
+
+VERB_VALIDATORS = {verb: compile_schema(verb, schema) for verb, schema in VERB_SCHEMAS.items()}
+OBJECT_VALIDATORS = {name: compile_schema(name, schema) for name, schema in OBJECT_SCHEMAS.items()}
+
+# raises on the first problem, used while instructions are constructed
+raise_errors = Reporter(None)
+
+
+def _validate_serialized_instruction(instruction, report, path):
+    if isinstance(instruction, _instruction_type) or _is_free(instruction):
+        return
+    if isinstance(instruction, dict) and len(instruction) == 1:
+        verb, params = next(iter(instruction.items()))
+        validator = VERB_VALIDATORS.get(verb)
+        if validator is not None and isinstance(params, dict):
+            validator(params, report, f"{path}.{verb}")
+
+
+def _validate_instruction_list(instructions, report, path):
+    if isinstance(instructions, LIST):
+        for index, instruction in enumerate(instructions):
+            _validate_serialized_instruction(instruction, report, f"{path}[{index}]")
+    else:
+        _validate_serialized_instruction(instructions, report, path)
+
+
+# validator per (instruction class, verb name), None for instructions without a schema
+_validator_cache = {}
+_MISSING = object()
+
+
+def get_validator(instruction) -> Optional[Callable]:
+    key = (type(instruction), instruction.name)
+    try:
+        return _validator_cache[key]
+    except KeyError:
+        validator = VERB_VALIDATORS.get(instruction.name) or OBJECT_VALIDATORS.get(type(instruction).__name__)
+        _validator_cache[key] = validator
+        return validator
+
+
+def validate_instruction(instruction):
+    validator = _validator_cache.get((type(instruction), instruction.name), _MISSING)
+    if validator is _MISSING:
+        validator = get_validator(instruction)
+    if validator is not None:
+        validator(instruction.params, raise_errors)
+
+
+def validate_sections(sections: Dict[str, list]) -> List[str]:
+    # One pass over serialized sections, returns every problem found with its location
+    errors = []
+    report = Reporter(errors)
+    for name, actions in sections.items():
+        _validate_instruction_list(actions, report, f"sections.{name}")
+    return errors
+
+
+def is_validation_enabled() -> bool:
+    enabled = _validation.get()
+    return _validation_default if enabled is None else enabled
+
+
+def set_validation(enabled: bool):
+    # Process wide switch for the checks done when instructions are constructed, validation blocks override it
+    global _validation_default
+    _validation_default = enabled
+
+
+class validation:
+    # Context manager that sets validation on or off for a block and restores the previous setting afterwards,
+    # e.g. 'with validation(False):' in trusted batch jobs. It only applies to the current thread or asyncio task,
+    # so other threads building instructions at the same time keep their own setting.
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.token = None
+
+    def __enter__(self):
+        self.token = _validation.set(self.enabled)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _validation.reset(self.token)
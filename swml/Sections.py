@@ -1,21 +1,254 @@
+import inspect
+
 from .SWMLTypes import *
+from . import Schema
+from .Hashing import new_hasher, update_hasher, hash_value, combine_hashes
+from .Encoders import encode_yaml_fragment, encode_yaml_section_header, encode_yaml_instruction, JSON_BACKENDS
+from .Loader import materialize_instruction, VERBS
+
+
+def serialize_action(action, memo=None):
+    return action.serialize(memo) if isinstance(action, Instruction) else action
+
+
+# Rough encoded size in bytes above which iter_fragment streams the inside of a JSON value
+STREAM_SPLIT_SIZE = 64 * 1024
+
+
+def _is_large(value):
+    return estimate_size(value, STREAM_SPLIT_SIZE) > STREAM_SPLIT_SIZE
+
+
+# constructor argument name -> SWML parameter name per verb class, e.g. format_ -> format
+_argument_keys = {}
+
+
+def argument_keys(instruction_class):
+    keys = _argument_keys.get(instruction_class)
+    if keys is None:
+        parameters = list(inspect.signature(instruction_class.__init__).parameters)[1:]
+        keys = _argument_keys[instruction_class] = {name: name.rstrip('_') for name in parameters}
+    return keys
 
 
 class Section:
-    def __init__(self, name: str):
+    def __init__(self, name: str, lazy: bool = False):
         self.name = name
+        # lazy sections keep added Instruction objects and only serialize them when the document is generated
+        self.lazy = lazy
+        # serialized instructions, or live Instruction objects for lazy sections and accessed loaded instructions
         self._actions = []
+        # number of live Instruction objects in _actions. Those can be changed without the section knowing, so
+        # the section is only cached while there are none.
+        self._live = 0
+        # encoded '"name": [actions]' fragments per data format, dropped whenever the section is mutated
+        self._fragments = {}
+        # running hash of the serialized actions, appends update it and other mutations drop it
+        self._hasher = None
+        # (name, content hash) of the last content_hash call
+        self._hash = None
+
+    def __len__(self):
+        return len(self._actions)
+
+    def __getstate__(self):
+        # The running hasher can't be pickled, a section sent to a worker process starts a new one when it's needed
+        state = self.__dict__.copy()
+        state['_hasher'] = None
+        return state
+
+    def _invalidate_cache(self):
+        self._fragments.clear()
+        self._hasher = None
+        self._hash = None
+
+    def _appended(self, actions):
+        # Appending keeps the running hash, it's brought up to date with just the new actions
+        self._fragments.clear()
+        self._hash = None
+        if self._hasher is not None and not self._live:
+            update_hasher(self._hasher, actions)
+        else:
+            self._hasher = None
+
+    def _cached_hash(self):
+        if self._hash is not None and self._hash[0] == self.name:
+            return self._hash[1]
+        return None
+
+    def content_hash(self):
+        # SHA-256 of the section name and serialized actions, independent of the output format
+        cached = self._cached_hash()
+        if cached is not None:
+            return cached
+        if self._live:
+            return combine_hashes([hash_value(self.name), update_hasher(new_hasher(), self.serialized_actions())
+                                  .hexdigest()])
+        if self._hasher is None:
+            self._hasher = update_hasher(new_hasher(), self._actions)
+        digest = combine_hashes([hash_value(self.name), self._hasher.hexdigest()])
+        self._hash = (self.name, digest)
+        return digest
+
+    def _store_fragment(self, key, fragment):
+        if not self._live:
+            self._fragments[key] = (self.name, fragment)
 
-    def add_instruction(self, instruction):
+    def serialized_actions(self, memo=None):
+        if not self._live:
+            return self._actions
+        return [serialize_action(action, memo) for action in self._actions]
+
+    def get_instruction(self, index: int):
+        # Loaded instructions are kept serialized until they're accessed here. They're materialized from a deep copy,
+        # stored actions can share nested values with frozen instructions and other documents.
+        action = self._actions[index]
+        if isinstance(action, Instruction):
+            return action
+        instruction = self._actions[index] = materialize_instruction(serialize_value(action))
+        self._live += 1
+        self._invalidate_cache()
+        return instruction
+
+    def set_instruction(self, index: int, instruction):
+        serialized_instruction = self._serialize_instruction(instruction)
+        if isinstance(self._actions[index], Instruction):
+            self._live -= 1
+        self._actions[index] = serialized_instruction
+        self._invalidate_cache()
+
+    def remove_instruction(self, index: int):
+        if isinstance(self._actions.pop(index), Instruction):
+            self._live -= 1
+        self._invalidate_cache()
+
+    def _fragment_key(self, data_format: str, json_backend, compact: bool):
+        if data_format == 'json':
+            return data_format, json_backend, json_backend.is_compact(compact)
+        return data_format
+
+    def _cached_fragment(self, key):
+        cached = self._fragments.get(key)
+        # The name is part of the fragment, so a renamed section is re-encoded as well
+        if cached is not None and cached[0] == self.name:
+            return cached[1]
+        return None
+
+    def encode_fragment(self, data_format: str, json_backend=None, compact: bool = False, memo=None):
+        json_backend = json_backend or JSON_BACKENDS['stdlib']
+        key = self._fragment_key(data_format, json_backend, compact)
+        fragment = self._cached_fragment(key)
+        if fragment is not None:
+            return fragment
+        if data_format == 'json':
+            fragment = json_backend.encode_fragment(self.name, self.serialized_actions(memo), compact)
+        else:
+            fragment = encode_yaml_fragment(self.name, self.serialized_actions(memo))
+        self._store_fragment(key, fragment)
+        return fragment
+
+    def iter_fragment(self, data_format: str, json_backend=None, compact: bool = False):
+        # Yields the same text as encode_fragment one instruction at a time, without building or caching the whole
+        # fragment. An already cached fragment is yielded as is. JSON instructions larger than STREAM_SPLIT_SIZE are
+        # split further into their params, switch cases, SWAIG functions and so on; YAML ones are encoded whole.
+        json_backend = json_backend or JSON_BACKENDS['stdlib']
+        fragment = self._cached_fragment(self._fragment_key(data_format, json_backend, compact))
+        if fragment is not None:
+            yield fragment
+        elif data_format == 'json':
+            separator = json_backend.separators(compact)[0]
+            yield json_backend.section_head(self.name, compact)
+            for index, action in enumerate(self._actions):
+                if index:
+                    yield separator
+                yield from json_backend.iter_dumps(serialize_action(action), compact, _is_large)
+            yield json_backend.section_tail()
+        else:
+            header = encode_yaml_section_header(self.name) if self._actions else None
+            if header is None:
+                yield encode_yaml_fragment(self.name, self.serialized_actions())
+                return
+            yield header
+            for action in self._actions:
+                yield encode_yaml_instruction(serialize_action(action))
+
+    def _serialize_instruction(self, instruction, memo=None):
         if isinstance(instruction, Instruction):
-            serialized_instruction = instruction.serialize()
+            return instruction.serialize(memo)
         elif isinstance(instruction, dict):
-            # Handle dictionaries containing instructions
-            serialized_instruction = {k: v.serialize() if isinstance(v, Instruction) else v for k, v in
-                                      instruction.items()}
+            # Raw dictionaries are copied all the way down, the encoded section is cached and mustn't change when the
+            # caller later changes a nested value it still holds
+            return serialize_value(instruction, memo)
         else:
             raise TypeError("Invalid instruction type. Must be an instance of Instruction or dict.")
-        self._actions.append(serialized_instruction)
+
+    def add_instruction(self, instruction, lazy: Optional[bool] = None):
+        # lazy overrides the section's setting for this instruction, it only applies to Instruction objects
+        if (self.lazy if lazy is None else lazy) and isinstance(instruction, Instruction):
+            self._actions.append(instruction)
+            self._live += 1
+        else:
+            self._actions.append(self._serialize_instruction(instruction))
+        self._appended(self._actions[-1:])
+
+    def _append_batch(self, actions, live: int):
+        self._actions.extend(actions)
+        self._live += live
+        self._appended(actions)
+
+    def extend(self, instructions, lazy: Optional[bool] = None):
+        # Adds a batch of instructions in one pass with a shared serialization memo. Nothing is added if any of them
+        # is invalid.
+        lazy = self.lazy if lazy is None else lazy
+        memo = {}
+        actions = []
+        live = 0
+        for instruction in instructions:
+            if lazy and isinstance(instruction, Instruction):
+                actions.append(instruction)
+                live += 1
+            else:
+                actions.append(self._serialize_instruction(instruction, memo))
+        self._append_batch(actions, live)
+
+    def _serialize_batch(self, instructions, memo=None):
+        memo = {} if memo is None else memo
+        return [instruction.serialize(memo) for instruction in instructions]
+
+    def add_many(self, verb: str, lazy: Optional[bool] = None, **columns):
+        # Columnar bulk builder: every keyword is a list (or array) holding one constructor argument per instruction,
+        # e.g. add_many('play', url=urls, volume=volumes) adds len(urls) Play instructions. The params are built
+        # directly and checked with the verb's compiled validator, without a constructor call per row.
+        if verb not in VERBS:
+            raise ValueError(f"Invalid verb '{verb}'. Valid verbs are: {', '.join(VERBS)}.")
+        instruction_class = VERBS[verb]
+        lazy = self.lazy if lazy is None else lazy
+        keys = argument_keys(instruction_class)
+        unknown = [name for name in columns if name not in keys]
+        if unknown:
+            raise TypeError(f"Invalid argument(s) for '{verb}': {', '.join(unknown)}.")
+        if not columns:
+            raise ValueError(f"add_many('{verb}') needs at least one column, there's nothing to tell how many "
+                             f"instructions to add.")
+        names = [keys[name] for name in columns]
+        values = [column.tolist() if hasattr(column, 'tolist') else column for column in columns.values()]
+        if len({len(column) for column in values}) > 1:
+            raise ValueError("All columns passed to add_many must have the same length.")
+
+        validator = Schema.VERB_VALIDATORS[verb] if Schema.is_validation_enabled() else None
+        instructions = []
+        for row in zip(*values):
+            params = {name: value for name, value in zip(names, row) if value is not None}
+            if validator is not None:
+                validator(params, Schema.raise_errors)
+            instruction = instruction_class.__new__(instruction_class)
+            instruction.name = verb
+            instruction.params = params
+            instructions.append(instruction)
+        if lazy:
+            self._append_batch(instructions, len(instructions))
+        else:
+            self._append_batch(self._serialize_batch(instructions), 0)
 
     def ai(self, voice=None, prompt=None, post_prompt=None, post_prompt_url=None, post_prompt_auth_user=None,
            post_prompt_auth_password=None, params=None, SWAIG=None, hints=None, languages=None, pronounce=None):
@@ -0,0 +1,334 @@
+import asyncio
+import functools
+import inspect
+import json
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+from .SignalWireML import SignalWireML
+from .SWMLTypes import Instruction, serialize_value
+from .Compression import select_encoding
+from .DataMaps import swaig_functions
+from .Encoders import get_json_backend, to_output
+
+CONTENT_TYPES = {'json': b'application/json', 'yaml': b'application/yaml'}
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def _close_websocket(receive, send):
+    # The apps only speak HTTP, websocket connections are closed normally instead of being left hanging
+    message = await receive()
+    if message['type'] == 'websocket.connect':
+        await send({'type': 'websocket.close', 'code': 1000})
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored, the header can list tags or be *
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    return '*' in tags or any((tag[2:] if tag.startswith('W/') else tag) == opaque for tag in tags)
+
+
+class SWMLRequest:
+    # The parts of an ASGI HTTP request a SWML handler needs. SignalWire posts the call details as JSON.
+    __slots__ = ('scope', 'method', 'path', 'query_string', 'headers', 'body')
+
+    def __init__(self, scope: Dict, body: bytes):
+        self.scope = scope
+        self.method = scope.get('method', 'GET')
+        self.path = scope.get('path', '/')
+        self.query_string = scope.get('query_string', b'').decode('latin-1')
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                        for name, value in scope.get('headers', ())}
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+class SWMLApp:
+    # ASGI application answering every HTTP request with the SignalWireML document built by handler(request).
+    # handler can be a function or a coroutine function. A plain function runs in executor when build_in_executor is
+    # set, for handlers building large documents. Responses honour If-None-Match and Accept-Encoding, and hashing and
+    # encoding happen off the loop past an estimated threshold bytes, see SignalWireML.agenerate_swml.
+    def __init__(self, handler: Callable, data_format: str = 'json', json_backend: str = None, compact: bool = False,
+                 executor=None, threshold: Optional[int] = None, build_in_executor: bool = False,
+                 compress: bool = True):
+        if data_format not in CONTENT_TYPES:
+            raise ValueError(f"Invalid data format '{data_format}'. Valid formats are 'json' and 'yaml'.")
+        self.handler = handler
+        self.data_format = data_format
+        self.json_backend = json_backend
+        self.compact = compact
+        self.executor = executor
+        self.threshold = threshold
+        self.build_in_executor = build_in_executor
+        self.compress = compress
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await _lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await _close_websocket(receive, send)
+
+    async def build(self, request: SWMLRequest):
+        if inspect.iscoroutinefunction(self.handler):
+            document = await self.handler(request)
+        elif self.build_in_executor:
+            document = await asyncio.get_running_loop().run_in_executor(self.executor, self.handler, request)
+        else:
+            document = self.handler(request)
+        if inspect.isawaitable(document):
+            document = await document
+        if not isinstance(document, SignalWireML):
+            raise TypeError(f"Invalid handler result type '{type(document)}'. Handlers must return SignalWireML.")
+        return document
+
+    async def _http(self, scope, receive, send):
+        request = SWMLRequest(scope, await _read_body(receive))
+        document = await self.build(request)
+
+        # hashing a large document happens off the loop, like encoding it
+        etag = await document.aetag(self.data_format, self.json_backend, self.compact, self.executor, self.threshold)
+        headers = [(b'etag', etag.encode('ascii')), (b'vary', b'accept-encoding')]
+        if _etag_matches(request.headers.get('if-none-match'), etag):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        encoding = select_encoding(request.headers.get('accept-encoding')) if self.compress else None
+        if encoding:
+            body = await document.agenerate_compressed(encoding, self.data_format, self.json_backend, self.compact,
+                                                       self.executor, self.threshold)
+            headers.append((b'content-encoding', encoding.encode('ascii')))
+        else:
+            body = await document.agenerate_swml(self.data_format, self.json_backend, self.compact, as_bytes=True,
+                                                 executor=self.executor, threshold=self.threshold)
+        headers += [(b'content-type', CONTENT_TYPES[self.data_format]),
+                    (b'content-length', str(len(body)).encode('ascii'))]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+# JSON schema types of SWAIG function arguments
+ARGUMENT_TYPES = {'string': (str,), 'integer': (int,), 'number': (int, float), 'boolean': (bool,), 'array': (list,),
+                  'object': (dict,), 'null': (type(None),)}
+
+
+def compile_arguments(function: Dict[str, Any]):
+    # {argument name: (accepted types, rejects bool)} from the declared FunctionArgs, unknown types accept anything
+    properties = (function.get('argument') or {}).get('properties') or {}
+    checks = {}
+    for name, detail in properties.items():
+        types = ARGUMENT_TYPES.get((detail or {}).get('type'))
+        if types is not None:
+            checks[name] = (types, bool not in types)
+    return checks
+
+
+def build_response(response: Optional[str] = None, actions=None) -> Dict[str, Any]:
+    # SWAIG function result. Actions are Action instructions or their serialized dicts, frozen actions reuse their
+    # cached serialized form.
+    result = {}
+    if response is not None:
+        result['response'] = response
+    if actions is not None:
+        if isinstance(actions, (Instruction, dict)):
+            actions = (actions,)
+        result['action'] = [serialize_value(action) if isinstance(action, Instruction) else action
+                            for action in actions]
+    return result
+
+
+class SWAIGApp:
+    # ASGI application answering the SWAIG webhooks of the functions declared in functions (an AI instruction,
+    # SWAIGParams or a list of SWAIGFunction). Requests are routed by their 'function' to the handler registered for
+    # it, with the arguments checked against the function's declared argument types. Handlers get (args, payload) and
+    # return a response string, one or more actions, a (response, actions) tuple or a complete result dict. At most
+    # max_concurrency handlers run at once, plain functions run in executor when handle_in_executor is set.
+    def __init__(self, functions, max_concurrency: int = 100, json_backend: str = None, executor=None,
+                 handle_in_executor: bool = False):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.arguments = {function['function']: compile_arguments(function) for function in swaig_functions(functions)}
+        self.handlers: Dict[str, Callable] = {}
+        self.max_concurrency = max_concurrency
+        self.backend = get_json_backend(json_backend or SignalWireML.json_backend)
+        self.executor = executor
+        self.handle_in_executor = handle_in_executor
+        # handlers running right now, and the most seen at once
+        self.active = 0
+        self.peak = 0
+        # by event loop, without keeping closed loops alive
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def function(self, name: str, handler: Callable = None):
+        # Registers handler for the declared function name, usable as a decorator
+        if name not in self.arguments:
+            raise ValueError(f"Function '{name}' is not declared in the SWAIG functions.")
+        if handler is None:
+            return functools.partial(self.function, name)
+        self.handlers[name] = handler
+        return handler
+
+    def parse_arguments(self, name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        argument = payload.get('argument')
+        if isinstance(argument, dict) and ('parsed' in argument or 'raw' in argument):
+            parsed = argument.get('parsed')
+            if parsed:
+                args = parsed[0] if isinstance(parsed, list) else parsed
+            else:
+                raw = argument.get('raw')
+                try:
+                    args = json.loads(raw) if raw else {}
+                except ValueError:
+                    raise ValueError(f"Invalid arguments for function '{name}'. Expected a JSON object.") from None
+        else:
+            args = argument if argument is not None else {}
+        if not isinstance(args, dict):
+            raise ValueError(f"Invalid arguments for function '{name}'. Expected a JSON object.")
+        for key, (types, rejects_bool) in self.arguments[name].items():
+            value = args.get(key)
+            if value is not None and (not isinstance(value, types) or (rejects_bool and isinstance(value, bool))):
+                expected = next(kind for kind, accepted in ARGUMENT_TYPES.items() if accepted == types)
+                raise ValueError(f"Invalid argument '{key}' for function '{name}'. Expected {expected}.")
+        return args
+
+    def _semaphore(self):
+        # asyncio primitives belong to one event loop, the app may be used from several
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def route(self, payload: Dict[str, Any]):
+        # (handler, args) for one SWAIG request payload. ValueError for unknown functions and invalid arguments.
+        name = payload.get('function')
+        handler = self.handlers.get(name)
+        if handler is None:
+            raise ValueError(f"No handler for function '{name}'.")
+        return handler, self.parse_arguments(name, payload)
+
+    async def dispatch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Result dict for one SWAIG request payload
+        handler, args = self.route(payload)
+        return await self.call(handler, args, payload)
+
+    async def call(self, handler: Callable, args: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._semaphore():
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                if inspect.iscoroutinefunction(handler):
+                    result = await handler(args, payload)
+                elif self.handle_in_executor:
+                    result = await asyncio.get_running_loop().run_in_executor(self.executor, handler, args, payload)
+                else:
+                    result = handler(args, payload)
+                if inspect.isawaitable(result):
+                    result = await result
+            finally:
+                self.active -= 1
+        return self.to_result(result)
+
+    @staticmethod
+    def to_result(result) -> Dict[str, Any]:
+        if isinstance(result, str):
+            return {'response': result}
+        if isinstance(result, tuple):
+            return build_response(*result)
+        if isinstance(result, (Instruction, list)):
+            return build_response(actions=result)
+        if isinstance(result, dict):
+            return result
+        raise TypeError(f"Invalid handler result type '{type(result)}'. Handlers must return a response string, "
+                        f"actions, a (response, actions) tuple or a dict.")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await _lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await _close_websocket(receive, send)
+
+    async def _http(self, scope, receive, send):
+        request = SWMLRequest(scope, await _read_body(receive))
+        if request.method != 'POST':
+            await self._send(send, 405, {'error': "SWAIG requests must be POSTed."})
+            return
+        try:
+            payload = request.json()
+            if not isinstance(payload, dict):
+                raise ValueError("Invalid SWAIG request. Expected a JSON object.")
+            handler, args = self.route(payload)
+        except ValueError as error:
+            await self._send(send, 400, {'error': str(error)})
+            return
+        try:
+            result = await self.call(handler, args, payload)
+        except Exception:
+            # a failing handler is the app's error, not the request's. It's raised on for the server to log.
+            await self._send(send, 500, {'error': f"Function '{payload.get('function')}' failed."})
+            raise
+        await self._send(send, 200, result)
+
+    async def _send(self, send, status: int, result: Dict[str, Any]):
+        body = to_output(self.backend.dumps(result, compact=True), as_bytes=True)
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode('ascii'))]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+class LocalClient:
+    # Stand-in HTTP client calling an ASGI app (SWMLApp, SWAIGApp) in process, for tests and load runs without a
+    # server or sockets
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str = '/', body: bytes = b'', headers: List = ()):
+        received = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return received.pop() if received else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+                 'headers': [(b'content-type', b'application/json')] + list(headers)}
+        await self.app(scope, receive, send)
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        return sent[0]['status'], dict(sent[0]['headers']), body
+
+    async def post_json(self, path: str, data, headers: List = ()):
+        status, headers, body = await self.request('POST', path, json.dumps(data).encode('utf-8'), headers)
+        return status, headers, json.loads(body) if body else None
@@ -1,33 +1,64 @@
-import yaml
-from typing import Dict, Union
+from typing import Dict, List, Union
 from .Sections import Section
+from .Templates import SWMLTemplate
+from .Loader import parse_document
+from .Schema import validate_sections
+from .Graph import SectionGraph
+from .Interpreter import Interpreter
+from .Minimizer import minimize_sections, MinimizeReport
+from .Compression import CompressionCache, get_compressor
+from .Hashing import combine_hashes
+from .SWMLTypes import estimate_size
+from .Encoders import CustomDumper, represent_str, dump_yaml, join_yaml_fragments, to_output, JSON_BACKENDS, \
+    JSONBackend, get_json_backend, strip_yaml_document_end, YAML_HEADER, YAML_DOCUMENT_END
+import asyncio
+import functools
+import io
 import json
 
 SUPPORTED_FORMATS = ['json', 'yaml']
 
 
-class CustomDumper(yaml.Dumper):
-    pass
-
-
-def represent_str(dumper, data):
-    # Check if the string contains newlines
-    if '\n' in data:
-        # Use block literal style for multiline strings
-        return dumper.represent_scalar('tag:yaml.org,2002:str', data, style='|')
+class SignalWireML:
+    # registry of JSON encoders by name, 'orjson' and 'ujson' are only present when those packages are installed
+    json_backends = JSON_BACKENDS
+    # backend used when generate_swml isn't given one, change it for every document with set_json_backend
+    json_backend = 'stdlib'
+    # agenerate_swml encodes documents whose uncached sections are estimated at this many bytes or more in an executor
+    offload_threshold = 64 * 1024
 
-    else:
-        # Use plain style for other strings
-        return dumper.represent_scalar('tag:yaml.org,2002:str', data, style=None)
+    def __init__(self, lazy: bool = False):
+        # a dictionary of sections containing a list of _actions (instructions) for each section
+        self._sections: Dict[str, Section] = {}
+        # whether sections created by add_section serialize their instructions at generate time
+        self.lazy = lazy
+        # compressed outputs by ETag, changed sections produce a new tag and miss the old entries
+        self._compressed = CompressionCache(maxsize=16)
 
+    @classmethod
+    def from_dict(cls, document: dict):
+        # Sections keep the loaded instructions as plain data, they only become Instruction objects when accessed
+        # through Section.get_instruction
+        if not isinstance(document, dict) or not isinstance(document.get('sections'), dict):
+            raise ValueError("Invalid SWML document. Expected a mapping with a 'sections' mapping.")
+        response = cls()
+        for name, actions in document['sections'].items():
+            if not isinstance(actions, list):
+                raise ValueError(f"Invalid SWML document. Section '{name}' must be a list of instructions.")
+            section = Section(name=name)
+            # a copy, so the caller's lists aren't changed along with the section
+            section._actions = list(actions)
+            response._sections[name] = section
+        return response
 
-CustomDumper.add_representer(str, represent_str)
+    @classmethod
+    def loads(cls, data: Union[str, bytes], data_format: str = None, json_backend: str = None):
+        # data_format is detected from the first character when it isn't given
+        return cls.from_dict(parse_document(data, data_format, get_json_backend(json_backend or cls.json_backend)))
 
-
-class SignalWireML:
-    def __init__(self):
-        # a dictionary of sections containing a list of _actions (instructions) for each section
-        self._sections: Dict[str, Section] = {}
+    @classmethod
+    def load(cls, fp, data_format: str = None, json_backend: str = None):
+        return cls.loads(fp.read(), data_format, json_backend)
 
     def __repr__(self):
         # This is the string representation of the object
@@ -47,27 +78,243 @@ class SignalWireML:
         elif isinstance(new_section, str):
             if new_section in self._sections:
                 raise ValueError(f"Section with name '{new_section}' already exists.")
-            section = Section(name=new_section)
+            section = Section(name=new_section, lazy=self.lazy)
             self._sections[section.name] = section
             return section
         else:
             raise ValueError(f"Invalid section type '{type(new_section)}'. Valid types are 'str' and 'Section'.")
 
+    def get_section(self, name: str):
+        if name not in self._sections:
+            raise ValueError(f"Section with name '{name}' does not exist.")
+        return self._sections[name]
+
     def serialize_sections(self):
         # Iterate through the sections and get their actions
-        return {section.name: section._actions for section in self._sections.values()}
+        # One memo for the whole document, so instructions shared between sections are serialized once
+        memo = {}
+        return {section.name: section.serialized_actions(memo) for section in self._sections.values()}
+
+    def validate(self):
+        # Checks every instruction of the document against the verb schemas in one pass, including raw dicts, loaded
+        # instructions and ones built while validation was turned off. All problems are reported together.
+        errors = validate_sections(self.serialize_sections())
+        if errors:
+            raise ValueError("Invalid SWML document:\n" + "\n".join(errors))
 
-    def generate_swml(self, data_format: str = 'json'):
+    def analyze(self, root: str = 'main'):
+        # Builds the execute/transfer graph between sections, see SectionGraph for the dangling references, cycles and
+        # sections that can't be reached from root
+        return SectionGraph.from_sections(self.serialize_sections(), root)
+
+    def interpreter(self, evaluator=None, stubs: Dict = None, max_steps: int = 10000):
+        # Snapshot of the document for running simulated calls, see Interpreter.run
+        return Interpreter(self.serialize_sections(), evaluator, stubs, max_steps)
+
+    def prune(self, root: str = 'main'):
+        # Removes the sections that can't be reached from root and returns their names
+        if root not in self._sections:
+            raise ValueError(f"Section with name '{root}' does not exist.")
+        unreachable = self.analyze(root).unreachable
+        for name in unreachable:
+            del self._sections[name]
+        return unreachable
+
+    def minimize(self, data_format: str = 'json', json_backend: str = None, passes: List[str] = None,
+                 as_bytes: bool = False):
+        # Generates the smallest equivalent SWML and returns it with a MinimizeReport of the bytes saved by each pass.
+        # The document itself isn't changed. passes selects from Minimizer.PASSES and 'compact', by default all run.
+        self._check_generate(data_format)
+        sections = self.serialize_sections()
+        steps = minimize_sections(sections, passes)
+
+        def encode(sections, compact=False):
+            return type(self).from_dict({'sections': sections}).generate_swml(data_format, json_backend, compact,
+                                                                             as_bytes=True)
+
+        original_size = size = len(self.generate_swml(data_format, json_backend, as_bytes=True))
+        saved = {}
+        for name, sections in steps.items():
+            new_size = len(encode(sections))
+            saved[name] = size - new_size
+            size = new_size
+        compact = data_format == 'json' and (passes is None or 'compact' in passes)
+        output = encode(sections, compact)
+        if compact:
+            saved['compact'] = size - len(output)
+        return to_output(output, as_bytes), MinimizeReport(original_size, saved)
+
+    def _check_generate(self, data_format: str):
         if not self._sections:
             raise ValueError("No sections found. Please add at least one section to the SignalWireML object.")
 
         if data_format not in SUPPORTED_FORMATS:
             raise ValueError(f"Invalid data format '{data_format}'. Valid formats are 'json' and 'yaml'.")
 
-        # Use the serialize_sections method to get serialized sections
-        serialized_sections = self.serialize_sections()
+    @staticmethod
+    def _encode(document, data_format: str):
+        if data_format == 'json':
+            return json.dumps(document)
+        elif data_format == 'yaml':
+            return dump_yaml(document)
+
+    @classmethod
+    def register_json_backend(cls, name: str, backend: JSONBackend):
+        if not isinstance(backend, JSONBackend):
+            raise ValueError(f"Invalid JSON backend type '{type(backend)}'. Backends must subclass JSONBackend.")
+        cls.json_backends[name] = backend
+
+    @classmethod
+    def set_json_backend(cls, name: str):
+        get_json_backend(name)
+        cls.json_backend = name
 
+    def generate_swml(self, data_format: str = 'json', json_backend: str = None, compact: bool = False,
+                      as_bytes: bool = False):
+        self._check_generate(data_format)
+
+        # Each section caches its own encoded fragment, so only sections changed since the last call are re-encoded
+        memo = {}
         if data_format == 'json':
-            return json.dumps({'sections': serialized_sections})
+            backend = get_json_backend(json_backend or self.json_backend)
+            fragments = [section.encode_fragment(data_format, backend, compact, memo)
+                         for section in self._sections.values()]
+            output = backend.join_fragments(fragments, compact)
         elif data_format == 'yaml':
-            return yaml.dump({'sections': serialized_sections}, Dumper=CustomDumper, sort_keys=False, indent=2)
+            output = join_yaml_fragments([section.encode_fragment(data_format, memo=memo)
+                                          for section in self._sections.values()])
+
+        return to_output(output, as_bytes)
+
+    def generate_compressed(self, encoding: str = 'gzip', data_format: str = 'json', json_backend: str = None,
+                            compact: bool = False):
+        # Returns the output compressed for a Content-Encoding response ('gzip', or 'br' when brotli is installed).
+        # Nothing is generated or compressed again while the document is unchanged.
+        tag = self.etag(data_format, json_backend, compact)
+        compressed = self._compressed.get(encoding, tag)
+        if compressed is None:
+            compressed = self._compressed.compress(self.generate_swml(data_format, json_backend, compact,
+                                                                      as_bytes=True), encoding, tag)
+        return compressed
+
+    def _pending_size(self, sections, limit):
+        # Estimated encoded size of sections, counted up to limit
+        size = 0
+        for section in sections:
+            size += estimate_size(section._actions, limit - size)
+            if size >= limit:
+                break
+        return size
+
+    def _unencoded_sections(self, data_format: str, json_backend: str, compact: bool):
+        # Sections generate_swml would have to encode, the ones with a cached fragment cost nothing
+        backend = get_json_backend(json_backend) if data_format == 'json' else None
+        return [section for section in self._sections.values()
+                if section._cached_fragment(section._fragment_key(data_format, backend, compact)) is None]
+
+    async def _offload(self, function, sections, executor, threshold):
+        # Runs function inline when the sections it has to work through are estimated below threshold bytes. One huge
+        # instruction counts as much as many small ones.
+        threshold = self.offload_threshold if threshold is None else threshold
+        if self._pending_size(sections, threshold) < threshold:
+            return function()
+        return await asyncio.get_running_loop().run_in_executor(executor, function)
+
+    async def agenerate_swml(self, data_format: str = 'json', json_backend: str = None, compact: bool = False,
+                             as_bytes: bool = False, executor=None, threshold: int = None):
+        # generate_swml for asyncio code. Small or cached documents are generated inline, larger ones in executor
+        # (the loop's default thread pool when None), so encoding them doesn't block the event loop. A process pool
+        # works too, the document is pickled to it and its caches are not updated.
+        self._check_generate(data_format)
+        # resolved here, a backend set with set_json_backend doesn't exist in a worker process
+        json_backend = json_backend or self.json_backend
+        function = functools.partial(self.generate_swml, data_format, json_backend, compact, as_bytes)
+        return await self._offload(function, self._unencoded_sections(data_format, json_backend, compact), executor,
+                                   threshold)
+
+    async def agenerate_compressed(self, encoding: str = 'gzip', data_format: str = 'json', json_backend: str = None,
+                                   compact: bool = False, executor=None, threshold: int = None):
+        # generate_compressed for asyncio code, offloaded like agenerate_swml
+        json_backend = json_backend or self.json_backend
+        tag = await self.aetag(data_format, json_backend, compact, executor, threshold)
+        compressed = self._compressed.get(encoding, tag)
+        if compressed is None:
+            function = functools.partial(_compress_output, self, get_compressor(encoding), data_format, json_backend,
+                                         compact)
+            sections = self._unencoded_sections(data_format, json_backend, compact)
+            compressed = self._compressed.put(encoding, tag, await self._offload(function, sections, executor,
+                                                                                 threshold))
+        return compressed
+
+    async def aetag(self, data_format: str = 'json', json_backend: str = None, compact: bool = False, executor=None,
+                    threshold: int = None):
+        # etag for asyncio code. Hashing sections without a cached hash is offloaded like agenerate_swml.
+        self._check_generate(data_format)
+        json_backend = json_backend or self.json_backend
+        function = functools.partial(self.etag, data_format, json_backend, compact)
+        sections = [section for section in self._sections.values()
+                    if section._live or section._cached_hash() is None]
+        return await self._offload(function, sections, executor, threshold)
+
+    def content_hash(self):
+        # Combines the cached section hashes, so only sections changed since the last call are hashed again. Equal
+        # documents have equal hashes whatever format they're generated in.
+        return combine_hashes([section.content_hash() for section in self._sections.values()])
+
+    def etag(self, data_format: str = 'json', json_backend: str = None, compact: bool = False):
+        # Weak HTTP ETag of the output generate_swml returns for the same arguments. The content hash ignores key
+        # order, so documents with the same tag are equivalent but not always byte for byte the same.
+        self._check_generate(data_format)
+        representation = data_format
+        if data_format == 'json':
+            backend = json_backend or self.json_backend
+            get_json_backend(backend)
+            representation = f"{data_format}-{backend}{'-compact' if compact else ''}"
+        return f'W/"{self.content_hash()}-{representation}"'
+
+    def stream_swml(self, data_format: str = 'json', json_backend: str = None, compact: bool = False,
+                    as_bytes: bool = False):
+        # Checked here rather than in the generator so bad arguments fail on the call, not on the first chunk
+        self._check_generate(data_format)
+        if data_format == 'json':
+            return self._stream_json(get_json_backend(json_backend or self.json_backend), compact, as_bytes)
+        return self._stream_yaml(as_bytes)
+
+    def _stream_json(self, backend: JSONBackend, compact: bool, as_bytes: bool):
+        separator = backend.separators(compact)[0]
+        yield to_output(backend.document_head(compact), as_bytes)
+        for index, section in enumerate(self._sections.values()):
+            if index:
+                yield to_output(separator, as_bytes)
+            for chunk in section.iter_fragment('json', backend, compact):
+                yield to_output(chunk, as_bytes)
+        yield to_output(backend.document_tail(), as_bytes)
+
+    def _stream_yaml(self, as_bytes: bool):
+        yield to_output(YAML_HEADER, as_bytes)
+        # The '...' document end is held back until we know the open-ended chunk was the last one
+        open_ended = False
+        for section in self._sections.values():
+            for chunk in section.iter_fragment('yaml'):
+                chunk, open_ended = strip_yaml_document_end(chunk)
+                yield to_output(chunk, as_bytes)
+        if open_ended:
+            yield to_output(YAML_DOCUMENT_END, as_bytes)
+
+    def write_to(self, fp, data_format: str = 'json', json_backend: str = None, compact: bool = False):
+        # Streams the document into a text or binary file object and returns the number of characters/bytes written
+        binary = isinstance(fp, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(fp, 'mode', '')
+        written = 0
+        for chunk in self.stream_swml(data_format, json_backend, compact, as_bytes=binary):
+            fp.write(chunk)
+            written += len(chunk)
+        return written
+
+    def compile(self, data_format: str = 'json'):
+        # Encode the document once, leaving Placeholder values as slots to be filled in by SWMLTemplate.render
+        self._check_generate(data_format)
+        return SWMLTemplate.compile(self, data_format)
+
+
+def _compress_output(document, compressor, data_format: str, json_backend: str, compact: bool):
+    return compressor(document.generate_swml(data_format, json_backend, compact, as_bytes=True))
@@ -0,0 +1,113 @@
+import json
+import uuid
+from typing import Any, Dict, List
+
+from .Compression import CompressionCache
+
+_MISSING = object()
+
+
+class Placeholder:
+    # A named slot that is filled in when a compiled template is rendered. Placeholders can be passed anywhere an
+    # instruction parameter value is expected, e.g. Connect(to_number=Placeholder('to_number')).
+    __slots__ = ('name', 'default')
+
+    def __init__(self, name: str, default: Any = _MISSING):
+        if not isinstance(name, str) or not name:
+            raise ValueError("Placeholder name must be a non-empty string.")
+        self.name = name
+        self.default = default
+
+    def __repr__(self):
+        return f"Placeholder({self.name!r})"
+
+
+def _replace_placeholders(obj, token_for):
+    # Walk the serialized document and swap every Placeholder for its sentinel token string
+    if isinstance(obj, Placeholder):
+        return token_for(obj)
+    elif isinstance(obj, dict):
+        return {k: _replace_placeholders(v, token_for) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_replace_placeholders(item, token_for) for item in obj]
+    else:
+        return obj
+
+
+class SWMLTemplate:
+    # A SignalWireML document encoded once, with the placeholder positions kept as slots. Rendering only encodes the
+    # slot values and joins them with the pre-encoded static chunks.
+    def __init__(self, chunks: List[str], slots: List[str], defaults: Dict[str, Any], data_format: str):
+        self._chunks = chunks
+        self._slots = slots
+        self._defaults = defaults
+        self.data_format = data_format
+        self.placeholders = frozenset(slots)
+        self._compressed = CompressionCache()
+
+    @classmethod
+    def compile(cls, document, data_format: str = 'json'):
+        # The token only uses characters that both JSON and YAML emit verbatim, so it can be located in the output
+        prefix = f"swmlslot{uuid.uuid4().hex}n"
+        defaults = {}
+        tokens = {}
+
+        def token_for(placeholder):
+            if placeholder.default is not _MISSING:
+                if placeholder.name in defaults and defaults[placeholder.name] != placeholder.default:
+                    raise ValueError(f"Placeholder '{placeholder.name}' is declared with conflicting defaults.")
+                defaults[placeholder.name] = placeholder.default
+            if placeholder.name not in tokens:
+                tokens[placeholder.name] = f"{prefix}{len(tokens)}end"
+            return tokens[placeholder.name]
+
+        serialized = _replace_placeholders({'sections': document.serialize_sections()}, token_for)
+        encoded = document._encode(serialized, data_format)
+
+        # JSON keeps the token inside quotes, those are replaced together with the token
+        quote = '"' if data_format == 'json' else ''
+        names = {token: name for name, token in tokens.items()}
+        chunks = []
+        slots = []
+        position = 0
+        marker = quote + prefix
+        while True:
+            start = encoded.find(marker, position)
+            if start == -1:
+                chunks.append(encoded[position:])
+                break
+            end = encoded.index('end', start + len(marker)) + 3
+            token = encoded[start + len(quote):end]
+            if token not in names:
+                raise ValueError("Placeholders can only be used as whole parameter values.")
+            chunks.append(encoded[position:start])
+            slots.append(names[token])
+            position = end + len(quote)
+
+        return cls(chunks, slots, defaults, data_format)
+
+    def render(self, **values):
+        unknown = set(values) - self.placeholders
+        if unknown:
+            raise ValueError(f"Unknown placeholder(s): {', '.join(sorted(unknown))}.")
+
+        # Every distinct slot is encoded once, even when it appears several times in the document. JSON values are
+        # also valid YAML flow scalars, YAML only needs non-ASCII text kept as-is since it can't decode surrogate pairs.
+        ensure_ascii = self.data_format == 'json'
+        encoded = {}
+        for name in self.placeholders:
+            value = values.get(name, self._defaults.get(name, _MISSING))
+            if value is _MISSING:
+                raise ValueError(f"Missing value for placeholder '{name}'.")
+            encoded[name] = json.dumps(value, ensure_ascii=ensure_ascii)
+
+        chunks = self._chunks
+        parts = [chunks[0]]
+        for index, name in enumerate(self._slots, 1):
+            parts.append(encoded[name])
+            parts.append(chunks[index])
+        return ''.join(parts)
+
+    def render_compressed(self, encoding: str = 'gzip', /, **values):
+        # Renders and compresses, renders seen recently are served from the cache without compressing again
+        return self._compressed.compress(self.render(**values).encode('utf-8'), encoding)
@@ -0,0 +1,218 @@
+import http.client
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import quote, urlsplit
+
+from .DataMaps import CompiledDataMap, compile_template, expand, lookup, _output, _stringify
+from .SWMLTypes import Instruction, DataMapWebhookOutput, serialize_value
+
+# Runs DataMapWebhook definitions for real: the url and headers are expanded with the function arguments, the request
+# goes out over a pooled keep-alive connection, and the output is expanded with the arguments and the JSON response.
+# Responses of GET and HEAD requests are cached by method, expanded url and expanded headers.
+
+RETRYABLE = (http.client.RemoteDisconnected, http.client.CannotSendRequest, http.client.BadStatusLine,
+             ConnectionResetError, BrokenPipeError)
+# only these are sent again when a reused connection turns out to be closed, the others may have been received
+IDEMPOTENT = frozenset(('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'))
+
+
+class ConnectionPool:
+    # Idle keep-alive connections by (scheme, host, port), shared by every thread using the pool
+    def __init__(self, max_idle: int = 8, timeout: float = 10.0):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.opened = 0
+        self._idle: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme: str, host: str, port: Optional[int]):
+        # Returns (connection, reused)
+        with self._lock:
+            idle = self._idle.get((scheme, host, port))
+            if idle:
+                return idle.pop(), True
+        return self.connect(scheme, host, port), False
+
+    def connect(self, scheme: str, host: str, port: Optional[int]):
+        # A new connection, it opens on its first request
+        with self._lock:
+            self.opened += 1
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, port, timeout=self.timeout)
+
+    def release(self, scheme: str, host: str, port: Optional[int], connection):
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+class ResponseCache:
+    # LRU of parsed webhook responses that expire ttl seconds after they were stored. maxsize=0 turns caching off.
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def expand_url(template: str, variables: Dict[str, Any]) -> str:
+    # Values expanded into a url are percent-encoded, a template that is a single reference is used as it is
+    compiled = compile_template(template)
+    if isinstance(compiled, tuple):
+        return str(lookup(compiled, variables))
+    return ''.join(part if isinstance(part, str) else quote(_stringify(lookup(part, variables)), safe='')
+                   for part in compiled)
+
+
+class WebhookExecutor:
+    # Executes data map webhooks. stats holds the request count, cache hits and the seconds spent waiting on webhooks,
+    # to see the latency data maps add to AI turns, pool.opened the number of connections opened. Only the responses
+    # of cache_methods are cached.
+    def __init__(self, pool: Optional[ConnectionPool] = None, cache: Optional[ResponseCache] = None,
+                 cache_methods: Iterable[str] = ('GET', 'HEAD')):
+        self.pool = pool or ConnectionPool()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.cache_methods = frozenset(method.upper() for method in cache_methods)
+        self.stats = {'requests': 0, 'cache_hits': 0, 'seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def fetch(self, method: str, url: str, headers: Dict[str, str] = None):
+        # Parsed JSON response of one request, from the cache when it's still fresh. ConnectionError for error
+        # statuses and responses that aren't JSON, OSError when the webhook can't be reached.
+        headers = headers or {}
+        # the headers are part of the key, responses to one caller's credentials aren't given to another
+        key = (method, url, tuple(sorted(headers.items()))) if method in self.cache_methods else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._stats_lock:
+                    self.stats['cache_hits'] += 1
+                return cached
+        start = time.perf_counter()
+        try:
+            data = self._request(method, url, headers)
+        finally:
+            with self._stats_lock:
+                self.stats['requests'] += 1
+                self.stats['seconds'] += time.perf_counter() - start
+        if key is not None:
+            self.cache.put(key, data)
+        return data
+
+    def _request(self, method: str, url: str, headers: Dict[str, str]):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Invalid webhook url '{url}'.")
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        endpoint = (parts.scheme, parts.hostname, parts.port)
+        connection, reused = self.pool.acquire(*endpoint)
+        try:
+            try:
+                connection.request(method, target, headers=headers)
+                response = connection.getresponse()
+            except RETRYABLE:
+                if not reused or method not in IDEMPOTENT:
+                    raise
+                # the server closed the idle connection, try once more on a new one
+                connection.close()
+                connection = self.pool.connect(*endpoint)
+                connection.request(method, target, headers=headers)
+                response = connection.getresponse()
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self.pool.release(*endpoint, connection)
+
+        if not 200 <= response.status < 300:
+            raise ConnectionError(f"Webhook {method} {url} returned status {response.status}.")
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            raise ConnectionError(f"Webhook {method} {url} didn't return JSON.") from None
+
+    def execute(self, webhook, args: Dict[str, Any], variables: Optional[Dict[str, Any]] = None):
+        # Expanded DataMapWebhookOutput of one DataMapWebhook. The output can use ${args...}, ${response...} and the
+        # top level keys of the JSON response directly.
+        if isinstance(webhook, Instruction):
+            webhook = serialize_value(webhook)
+        scope = dict(variables or (), args=args)
+        url = expand_url(webhook['url'], scope)
+        headers = {name: _stringify(value) for name, value in expand(webhook.get('headers') or {}, scope).items()}
+        data = self.fetch(webhook.get('method', 'GET').upper(), url, headers)
+        if isinstance(data, dict):
+            scope = dict(data, **scope)
+        scope['response'] = data
+        return _output(expand(webhook.get('output') or {}, scope), DataMapWebhookOutput)
+
+    def evaluate(self, data_map, args: Dict[str, Any], variables: Optional[Dict[str, Any]] = None):
+        # Answers a function call the way the data map would: the first matching expression, else the first webhook
+        # that succeeds. None when nothing answers.
+        if isinstance(data_map, Instruction):
+            data_map = serialize_value(data_map)
+        output = CompiledDataMap(data_map).evaluate(args, variables)
+        if output is not None:
+            return output
+        for webhook in data_map.get('webhooks') or ():
+            try:
+                return self.execute(webhook, args, variables)
+            except OSError:
+                continue
+        return None
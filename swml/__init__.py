@@ -7,4 +7,12 @@ from .SWMLTypes import Answer, Hangup, Prompt, Play, Record, RecordCall, StopRec
 
 from .Sections import Section
 
+from .Templates import Placeholder, SWMLTemplate
+
+from .Encoders import JSONBackend
+
 from .SignalWireML import SignalWireML
+
+from .Server import SWMLApp, SWAIGApp
+
+from .Instrumentation import Profiler
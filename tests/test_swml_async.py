@@ -0,0 +1,145 @@
+import gzip
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from swml import SignalWireML, SWMLApp
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.calls = 0
+
+    def submit(self, *args, **kwargs):
+        self.calls += 1
+        return super().submit(*args, **kwargs)
+
+
+def build_document(request=None):
+    response = SignalWireML()
+    main_section = response.add_section('main')
+    main_section.answer()
+    main_section.add_many('play', url=[f"say:Step {index}" for index in range(20)])
+    if request is not None:
+        main_section.play(url=f"say:{request.json()['call']['from']}")
+    return response
+
+
+class TestSWMLAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.executor = CountingExecutor()
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    async def test_small_documents_stay_inline(self):
+        response = build_document()
+        output = await response.agenerate_swml(executor=self.executor)
+        self.assertEqual(output, response.generate_swml())
+        self.assertEqual(self.executor.calls, 0)
+
+    async def test_large_documents_are_offloaded(self):
+        response = build_document()
+        for data_format in ('json', 'yaml'):
+            output = await response.agenerate_swml(data_format, executor=self.executor, threshold=10)
+            self.assertEqual(output, response.generate_swml(data_format))
+        self.assertEqual(self.executor.calls, 2)
+        # the sections cached their fragments in the worker thread
+        await response.agenerate_swml(executor=self.executor, threshold=10)
+        self.assertEqual(self.executor.calls, 2)
+
+    async def test_compressed(self):
+        response = build_document()
+        compressed = await response.agenerate_compressed(executor=self.executor, threshold=10)
+        self.assertEqual(gzip.decompress(compressed).decode(), response.generate_swml())
+        self.assertIs(await response.agenerate_compressed(executor=self.executor, threshold=10), compressed)
+        # hashing for the tag and compressing, each once
+        self.assertEqual(self.executor.calls, 2)
+
+    async def test_offloaded_by_size(self):
+        response = SignalWireML()
+        response.add_section('main').ai(prompt={'text': "x" * 100000})
+        self.assertEqual(await response.aetag(executor=self.executor), response.etag())
+        await response.agenerate_swml(executor=self.executor)
+        self.assertEqual(self.executor.calls, 2)
+
+    async def test_process_pool(self):
+        response = build_document()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            output = await response.agenerate_swml('yaml', executor=executor, threshold=0)
+        self.assertEqual(output, response.generate_swml('yaml'))
+
+    async def test_process_pool_after_hashing(self):
+        response = build_document()
+        etag = response.etag()
+        response.add_section('other').hangup()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            output = await response.agenerate_swml(executor=executor, threshold=0)
+        self.assertEqual(output, response.generate_swml())
+        self.assertNotEqual(response.etag(), etag)
+
+
+class TestSWMLApp(unittest.IsolatedAsyncioTestCase):
+    async def request(self, app, headers=()):
+        body = json.dumps({"call": {"from": "+15551234567"}}).encode()
+        received = iter([{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                         {'type': 'http.request', 'body': body[10:]}])
+        sent = []
+
+        async def receive():
+            return next(received)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/swml', 'headers': list(headers)}
+        await app(scope, receive, send)
+        return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+    async def test_response(self):
+        status, headers, body = await self.request(SWMLApp(build_document))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        self.assertEqual(json.loads(body)['sections']['main'][-1], {"play": {"url": "say:+15551234567"}})
+
+    async def test_async_handler_compression_and_etag(self):
+        async def handler(request):
+            return build_document(request)
+
+        app = SWMLApp(handler, data_format='yaml')
+        status, headers, body = await self.request(app, [(b'accept-encoding', b'gzip')])
+        self.assertEqual(headers[b'content-encoding'], b'gzip')
+        self.assertEqual(headers[b'content-type'], b'application/yaml')
+        self.assertIn('say:+15551234567', gzip.decompress(body).decode())
+
+        etag = headers[b'etag']
+        self.assertTrue(etag.startswith(b'W/"'))
+        status, headers, body = await self.request(app, [(b'if-none-match', etag)])
+        self.assertEqual((status, body), (304, b''))
+        status, _, body = await self.request(app, [(b'if-none-match', b'"other", ' + etag[2:])])
+        self.assertEqual((status, body), (304, b''))
+        status, _, _ = await self.request(app, [(b'if-none-match', b'W/"other"')])
+        self.assertEqual(status, 200)
+
+    async def test_build_in_executor(self):
+        with CountingExecutor() as executor:
+            status, _, _ = await self.request(SWMLApp(build_document, executor=executor, build_in_executor=True))
+            self.assertEqual(status, 200)
+            self.assertEqual(executor.calls, 1)
+
+    async def test_websocket_is_closed(self):
+        sent = []
+
+        async def receive():
+            return {'type': 'websocket.connect'}
+
+        async def send(message):
+            sent.append(message)
+
+        await SWMLApp(build_document)({'type': 'websocket', 'path': '/'}, receive, send)
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 1000}])
+
+    async def test_invalid_handler_result(self):
+        with self.assertRaises(TypeError):
+            await self.request(SWMLApp(lambda request: "not a document"))
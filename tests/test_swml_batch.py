@@ -0,0 +1,79 @@
+import functools
+import os
+import tempfile
+import unittest
+
+from swml import SignalWireML
+from swml.Batch import render_batch
+
+
+def build_tenant(number: int):
+    if number == 3:
+        raise ValueError("Tenant 3 has no flow.")
+    response = SignalWireML()
+    response.add_section('main').play(url=f"say:Welcome tenant {number}")
+    return response
+
+
+def crash():
+    # the worker process dies without an exception
+    os._exit(1)
+
+
+class TestSWMLBatch(unittest.TestCase):
+    def setUp(self):
+        self.items = [functools.partial(build_tenant, number) for number in range(10)]
+        self.items[5] = {'sections': {'main': ['answer', 'hangup']}}
+        self.items[6] = build_tenant(6)
+
+    def check(self, results):
+        self.assertEqual(len(results), 10)
+        for result in results:
+            if result.index == 3:
+                self.assertFalse(result.ok)
+                self.assertIn("Tenant 3 has no flow.", result.error)
+            elif result.index == 5:
+                self.assertEqual(result.output, '{"sections": {"main": ["answer", "hangup"]}}')
+            else:
+                self.assertEqual(result.output, build_tenant(result.index).generate_swml())
+
+    def test_ordered(self):
+        results = list(render_batch(self.items, processes=2, chunksize=3))
+        self.assertEqual([result.index for result in results], list(range(10)))
+        self.check(results)
+
+    def test_unordered(self):
+        results = list(render_batch(iter(self.items), processes=2, chunksize=2, ordered=False))
+        self.check(sorted(results, key=lambda result: result.index))
+
+    def test_in_process(self):
+        self.check(list(render_batch(self.items, processes=1, chunksize=4)))
+
+    def test_write_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, '{index}.yaml')
+            results = list(render_batch(self.items, 'yaml', path=path, processes=2))
+            self.assertEqual(results[0].path, path.format(index=0))
+            self.assertIsNone(results[0].output)
+            with open(results[0].path, 'rb') as fp:
+                self.assertEqual(fp.read(), build_tenant(0).generate_swml('yaml', as_bytes=True))
+            self.assertFalse(os.path.exists(path.format(index=3)))
+
+    def test_invalid_items_and_arguments(self):
+        results = list(render_batch(["not a document"], processes=1))
+        self.assertIn("TypeError", results[0].error)
+        # raised by the call, not by the first next()
+        with self.assertRaises(ValueError):
+            render_batch(self.items, data_format='xml')
+        with self.assertRaises(ValueError):
+            render_batch(self.items, chunksize=0)
+
+    def test_failed_chunks_are_retried_item_by_item(self):
+        self.items[1] = lambda: build_tenant(1)
+        self.items[7] = crash
+        results = list(render_batch(self.items, processes=2, chunksize=3))
+        self.assertEqual([result.index for result in results], list(range(10)))
+        self.assertIn("pickle", results[1].error)
+        self.assertIn("BrokenProcessPool", results[7].error)
+        self.assertEqual([result.index for result in results if not result.ok], [1, 3, 7])
+        self.assertEqual(results[8].output, build_tenant(8).generate_swml())
@@ -0,0 +1,66 @@
+import unittest
+
+from swml import SignalWireML, Section, Play, Answer, Hangup
+
+
+class TestSWMLBulk(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        self.main_section = self.response.add_section('main')
+
+    def test_extend(self):
+        self.main_section.extend([Answer(), Play(url="say:Hello"), {"execute": "voicemail"}, Hangup()])
+        expected_swml = '{"sections": {"main": ["answer", {"play": {"url": "say:Hello"}}, ' \
+                        '{"execute": "voicemail"}, "hangup"]}}'
+        self.assertEqual(self.response.generate_swml(), expected_swml)
+
+    def test_extend_is_all_or_nothing(self):
+        self.main_section.answer()
+        with self.assertRaises(TypeError):
+            self.main_section.extend([Hangup(), "not an instruction"])
+        self.assertEqual(len(self.main_section), 1)
+
+    def test_extend_lazy(self):
+        play = Play(url="say:Hello")
+        section = Section('main', lazy=True)
+        section.extend([play, {"execute": "voicemail"}])
+        self.assertIs(section.get_instruction(0), play)
+
+    def test_add_many_matches_single_calls(self):
+        urls = [f"say:Step {index}" for index in range(50)]
+        volumes = [index / 10 for index in range(50)]
+        self.main_section.add_many('play', url=urls, volume=volumes)
+        self.main_section.add_many('send_digits', digits=["1", "2#"])
+        self.main_section.add_many('set', variables=[{"step": index} for index in range(3)])
+
+        expected = SignalWireML()
+        expected_section = expected.add_section('main')
+        for url, volume in zip(urls, volumes):
+            expected_section.play(url=url, volume=volume)
+        expected_section.send_digits("1")
+        expected_section.send_digits("2#")
+        for index in range(3):
+            expected_section.set({"step": index})
+        self.assertEqual(self.response.generate_swml(), expected.generate_swml())
+
+    def test_add_many_accepts_array_like_columns(self):
+        class Column(list):
+            def tolist(self):
+                return list(self)
+
+        self.main_section.add_many('hangup', reason=Column(["busy", "decline"]))
+        self.assertEqual(self.response.generate_swml(),
+                         '{"sections": {"main": [{"hangup": {"reason": "busy"}}, {"hangup": {"reason": "decline"}}]}}')
+
+    def test_add_many_errors(self):
+        with self.assertRaises(ValueError):
+            self.main_section.add_many('unknown', url=["say:a"])
+        with self.assertRaises(ValueError):
+            self.main_section.add_many('play', url=["say:a", "say:b"], volume=[1.0])
+        with self.assertRaises(ValueError):
+            self.main_section.add_many('hangup', reason=["busy", "invalid"])
+        with self.assertRaises(ValueError):
+            self.main_section.add_many('denoise')
+        with self.assertRaises(ValueError):
+            self.main_section.add_many('play', lazy=True)
+        self.assertEqual(len(self.main_section), 0)
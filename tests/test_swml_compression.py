@@ -0,0 +1,61 @@
+import gzip
+import unittest
+
+from swml import SignalWireML, Placeholder
+from swml.Compression import CompressionCache, select_encoding, COMPRESSORS
+
+
+class TestSWMLCompression(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        self.main_section = self.response.add_section('main')
+        self.main_section.answer()
+        self.main_section.play(url="say:Hello")
+
+    def test_gzip_round_trip(self):
+        for data_format in ('json', 'yaml'):
+            compressed = self.response.generate_compressed('gzip', data_format)
+            self.assertEqual(gzip.decompress(compressed).decode(), self.response.generate_swml(data_format))
+
+    def test_output_is_cached_until_sections_change(self):
+        compressed = self.response.generate_compressed()
+        self.assertIs(self.response.generate_compressed(), compressed)
+        self.main_section.hangup()
+        changed = self.response.generate_compressed()
+        self.assertEqual(gzip.decompress(changed).decode(), self.response.generate_swml())
+        self.assertEqual(self.response.generate_compressed(compact=True),
+                         gzip.compress(self.response.generate_swml(compact=True).encode(), 9, mtime=0))
+
+    def test_output_is_deterministic(self):
+        other = SignalWireML()
+        other_section = other.add_section('main')
+        other_section.answer()
+        other_section.play(url="say:Hello")
+        self.assertEqual(other.generate_compressed(), self.response.generate_compressed())
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            self.response.generate_compressed('compress')
+
+    def test_template(self):
+        response = SignalWireML()
+        response.add_section('main').play(url=Placeholder('url'))
+        template = response.compile()
+        compressed = template.render_compressed(url="say:Hi")
+        self.assertEqual(gzip.decompress(compressed).decode(), template.render(url="say:Hi"))
+        self.assertIs(template.render_compressed('gzip', url="say:Hi"), compressed)
+
+    def test_cache_is_bounded(self):
+        cache = CompressionCache(maxsize=2)
+        first = cache.compress(b"first")
+        cache.compress(b"second")
+        cache.compress(b"first")
+        cache.compress(b"third")
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.compress(b"first"), first)
+
+    def test_select_encoding(self):
+        self.assertEqual(select_encoding("gzip, deflate"), "gzip")
+        self.assertIsNone(select_encoding("gzip;q=0, identity"))
+        self.assertIsNone(select_encoding(None))
+        self.assertEqual(select_encoding("*"), "br" if "br" in COMPRESSORS else "gzip")
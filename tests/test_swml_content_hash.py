@@ -0,0 +1,75 @@
+import unittest
+
+from swml import SignalWireML, Section, Play, AI, Answer
+from swml.Hashing import hash_value
+
+
+class TestSWMLContentHash(unittest.TestCase):
+    def build(self, url="say:Hello"):
+        response = SignalWireML()
+        main_section = response.add_section('main')
+        main_section.answer()
+        main_section.play(url=url, volume=2.0)
+        response.add_section('other').hangup()
+        return response
+
+    def test_equal_documents_have_equal_hashes(self):
+        self.assertEqual(self.build().content_hash(), self.build().content_hash())
+        self.assertNotEqual(self.build().content_hash(), self.build("say:Bye").content_hash())
+
+    def test_instruction_hash_ignores_key_order(self):
+        self.assertEqual(Play(url="say:a", volume=1.0).content_hash(), Play(volume=1.0, url="say:a").content_hash())
+        self.assertEqual(AI(prompt=AI.PromptParams(text="Hi")).content_hash(),
+                         hash_value({"ai": {"prompt": {"text": "Hi"}}}))
+
+    def test_incremental_hash_matches_full_hash(self):
+        section = Section('main')
+        section.answer()
+        section.content_hash()
+        section.play(url="say:a")
+        section.extend([{"execute": "voicemail"}, Play(url="say:b")])
+        section.add_many('send_digits', digits=["1", "2"])
+        expected = Section('main')
+        expected._actions = section.serialized_actions()
+        self.assertEqual(section.content_hash(), expected.content_hash())
+
+    def test_mutation_changes_hash(self):
+        response = self.build()
+        before = response.content_hash()
+        main_section = response.get_section('main')
+        main_section.remove_instruction(0)
+        self.assertNotEqual(response.content_hash(), before)
+        main_section.set_instruction(0, Answer())
+        self.assertNotEqual(response.content_hash(), before)
+        main_section.add_instruction(Play(url="say:Hello", volume=2.0))
+        self.assertEqual(response.content_hash(), before)
+        main_section.name = 'renamed'
+        self.assertNotEqual(response.content_hash(), before)
+
+    def test_lazy_sections_follow_live_changes(self):
+        response = SignalWireML(lazy=True)
+        main_section = response.add_section('main')
+        main_section.play(url="say:a")
+        before = response.content_hash()
+        main_section.get_instruction(0).params['url'] = "say:b"
+        self.assertNotEqual(response.content_hash(), before)
+
+    def test_loaded_documents_hash_like_built_ones(self):
+        response = self.build()
+        self.assertEqual(SignalWireML.loads(response.generate_swml('yaml')).content_hash(), response.content_hash())
+
+    def test_etag(self):
+        response = self.build()
+        self.assertEqual(response.etag(), f'W/"{response.content_hash()}-json-stdlib"')
+        self.assertNotEqual(response.etag('yaml'), response.etag())
+        self.assertNotEqual(response.etag(compact=True), response.etag())
+        with self.assertRaises(ValueError):
+            response.etag(json_backend='unknown')
+
+    def test_mixed_key_types(self):
+        # JSON writes the number keys as strings, the hash does the same
+        response = SignalWireML()
+        response.add_section('main').add_instruction({"switch": {"variable": "vars.a", "case": {1: ["hangup"],
+                                                                                                 "b": ["hangup"]}}})
+        self.assertEqual(response.content_hash(), SignalWireML.loads(response.generate_swml()).content_hash())
+        self.assertEqual(hash_value({1: 1, 'a': 2}), hash_value({'1': 1, 'a': 2}))
@@ -0,0 +1,65 @@
+import unittest
+
+from swml import AI, DataMap, DataMapExpression, DataMapExpressionOutput, SWAIGFunction, SWAIGParams, Say, \
+    SetMetaData
+from swml.DataMaps import CompiledDataMap, compile_pattern, evaluate_table, expand
+
+
+class TestSWMLDataMap(unittest.TestCase):
+    def setUp(self):
+        self.data_map = DataMap(expressions=[
+            DataMapExpression(string="${args.type}", pattern="/^jokes?$/i",
+                              output=DataMapExpressionOutput(response="Telling a joke about %{args.topic}",
+                                                             action=[Say("Here is one about ${args.topic}")])),
+            DataMapExpression(string="${args.city}", pattern=r"^(?<city>\w+), (\w+)$",
+                              output={'response': "Weather for ${match.city} in ${match.2}",
+                                      'action': [SetMetaData(meta_data={'city': "${match.1}",
+                                                                        'args': "${args}"})]}),
+            DataMapExpression(string="fallback", pattern=".*", output=DataMapExpressionOutput(response="Sorry")),
+        ])
+        self.ai = AI(prompt={'text': "Help"}, SWAIG=SWAIGParams(functions=[
+            SWAIGFunction(function="lookup", purpose="Look things up", data_map=self.data_map),
+            SWAIGFunction(function="webhook_only", purpose="Remote", web_hook_url="https://example.com"),
+        ]))
+
+    def test_first_matching_expression(self):
+        output = self.data_map.evaluate({'type': "Joke", 'topic': "cats"})
+        self.assertIsInstance(output, DataMapExpressionOutput)
+        self.assertEqual(output.serialize(), {'response': "Telling a joke about cats",
+                                              'action': [{'say': "Here is one about cats"}]})
+
+    def test_match_groups(self):
+        args = {'city': "Tampa, Florida"}
+        output = self.data_map.evaluate(args)
+        self.assertEqual(output.params['response'], "Weather for Tampa in Florida")
+        self.assertEqual(output.params['action'], [{'set_meta_data': {'meta_data': {'city': "Tampa", 'args': args}}}])
+
+    def test_no_match(self):
+        data_map = CompiledDataMap({'expressions': [{'string': "${args.a}", 'pattern': "^x$",
+                                                     'output': {'response': "x"}}]})
+        self.assertIsNone(data_map.evaluate({'a': "y"}))
+        self.assertIsNone(data_map.evaluate({}))
+
+    def test_extra_variables(self):
+        self.assertEqual(expand("Hi ${meta_data.name}, ${missing}!", {'meta_data': {'name': "Ann"}}), "Hi Ann, !")
+
+    def test_patterns_are_shared(self):
+        self.assertIs(compile_pattern("/^jokes?$/i"), compile_pattern("/^jokes?$/i"))
+        with self.assertRaises(ValueError):
+            compile_pattern("(unclosed")
+        with self.assertRaises(ValueError):
+            compile_pattern("/a/x")
+
+    def test_evaluate_table(self):
+        table = {'lookup': [{'type': "jokes", 'topic': "dogs"}, {'city': "Paris, France"}, {'type': "other"}] * 500}
+        results = evaluate_table(self.ai, table)
+        responses = [output.params['response'] for output in results['lookup'][:3]]
+        self.assertEqual(responses, ["Telling a joke about dogs", "Weather for Paris in France", "Sorry"])
+        self.assertEqual(len(results['lookup']), 1500)
+        with self.assertRaises(ValueError) as context:
+            evaluate_table(self.ai, {'webhook_only': [{}]})
+        self.assertEqual(str(context.exception), "No data map for function(s): webhook_only.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import math
+import unittest
+
+from swml import Cond, Switch, SignalWireML
+from swml.Expressions import compile_expression, evaluate, is_true, UnsupportedExpression
+
+
+class TestSWMLExpressions(unittest.TestCase):
+    def setUp(self):
+        self.context = {'vars': {'count': "3", 'name': "ann", 'flag': False, 'items': [1, 2], 'nested': {'a': 1}},
+                        'call': {'to': "+15551234567"}, 'params': {'team': "east"}}
+
+    def test_paths_and_scopes(self):
+        self.assertEqual(evaluate("vars.name", self.context), "ann")
+        self.assertEqual(evaluate("name", self.context), "ann")
+        self.assertEqual(evaluate("call.to", self.context), "+15551234567")
+        self.assertEqual(evaluate("params['team']", self.context), "east")
+        self.assertEqual(evaluate("vars.items[1]", self.context), 2)
+        self.assertEqual(evaluate("items.length", self.context), 2)
+        self.assertEqual(evaluate("vars.nested.a", self.context), 1)
+        self.assertIsNone(evaluate("vars.missing.deeper", self.context))
+        # plain variable dictionaries without scopes
+        self.assertTrue(is_true("a > 1 && b == 'x'", {'a': 2, 'b': "x"}))
+
+    def test_operators(self):
+        self.assertTrue(is_true("vars.count > 2 && name == 'ann'", self.context))
+        self.assertTrue(is_true("flag || call.to != '+2'", self.context))
+        self.assertTrue(is_true("!flag", self.context))
+        self.assertFalse(is_true("vars.missing >= 1", self.context))
+        self.assertEqual(evaluate("(1 + 2) * 3 - 4 / 2", {}), 7)
+        self.assertEqual(evaluate("1 + 2 * 3", {}), 7)
+        self.assertEqual(evaluate("10 % 4", {}), 2)
+        self.assertEqual(evaluate("'n' + count", self.context), "n3")
+        self.assertEqual(evaluate("-count + 1", self.context), -2)
+        self.assertEqual(evaluate("flag || 'fallback'", self.context), "fallback")
+        self.assertEqual(evaluate("count > 5 ? 'many' : count > 1 ? 'some' : 'one'", self.context), "some")
+        self.assertTrue(math.isnan(evaluate("'a' * 2", {})))
+
+    def test_loose_and_strict_equality(self):
+        self.assertTrue(is_true("count == 3", self.context))
+        self.assertFalse(is_true("count === 3", self.context))
+        self.assertTrue(is_true("count === '3'", self.context))
+        self.assertTrue(is_true("missing == null", self.context))
+        self.assertFalse(is_true("missing == 0", self.context))
+        self.assertTrue(is_true("flag == 0", self.context))
+
+    def test_calls_regex_and_in(self):
+        context = dict(self.context, call={'from': "+15551234567"})
+        self.assertTrue(is_true("call.from.startsWith('+1')", context))
+        self.assertTrue(is_true("vars.items.includes(2) && !items.includes('2')", context))
+        self.assertTrue(is_true("vars.name.toUpperCase() == 'ANN'", context))
+        self.assertTrue(is_true("/^\\+1555/.test(call.from)", context))
+        self.assertEqual(evaluate("call.from.match(/^\\+(\\d)(\\d{3})/)[2]", context), "555")
+        self.assertEqual(evaluate("name.replace(/n/g, 'm')", context), "amm")
+        self.assertEqual(evaluate("call.from.slice(-4)", context), "4567")
+        self.assertEqual(evaluate("['a', 'b'].join('-')", context), "a-b")
+        self.assertEqual(evaluate("parseInt('42px') + 1", context), 43)
+        self.assertTrue(is_true("'a' in vars.nested && !('b' in nested) && 1 in items", context))
+        # a slash after an operand still divides
+        self.assertEqual(evaluate("(8) / 2 / count", context), 4 / 3)
+        self.assertEqual(compile_expression("call.from.startsWith(vars.prefix)").names,
+                         frozenset({'call.from', 'vars.prefix'}))
+        with self.assertRaises(ValueError):
+            evaluate("vars.nested.trim()", context)
+
+    def test_compiled_once(self):
+        expression = compile_expression("vars.count > 2")
+        self.assertIs(compile_expression("vars.count > 2"), expression)
+        self.assertEqual(expression.names, frozenset({'vars.count'}))
+        self.assertTrue(expression.test(self.context))
+        self.assertEqual(repr(expression), "Expression('vars.count > 2')")
+
+    def test_syntax_errors(self):
+        cases = {
+            "vars.a ==": "Invalid expression 'vars.a ==': unexpected end of expression at position 9.",
+            "(a": "Invalid expression '(a': unexpected end of expression, expected ')' at position 2.",
+            "a b": "Invalid expression 'a b': unexpected 'b' at position 2.",
+            "a # b": "Invalid expression 'a # b': unexpected character '#' at position 2.",
+            "": "Invalid expression '': empty expression at position 0.",
+            "/a/x.test(b)": "Invalid expression '/a/x.test(b)': invalid regex flag 'x' at position 0.",
+        }
+        for source, message in cases.items():
+            with self.assertRaises(ValueError) as context:
+                compile_expression(source)
+            self.assertEqual(str(context.exception), message)
+
+    def test_unsupported_javascript(self):
+        cases = {
+            "typeof vars.x === 'undefined'": "'typeof' at position 0",
+            "vars.x?.y": "'?.' at position 6",
+            "vars.x ?? 1": "'??' at position 7",
+            "`${vars.x} calls`": "'`' at position 0",
+            "new Date().getHours() < 17": "'new' at position 0",
+            "isFinite(vars.x)": "function 'isFinite' at position 8",
+        }
+        for source, problem in cases.items():
+            with self.assertRaises(UnsupportedExpression) as context:
+                compile_expression(source)
+            self.assertEqual(str(context.exception), f"Unsupported expression {source!r}: {problem}.")
+            # left to the call, the instructions can still be built
+            Cond(when=source, then=["hangup"], else_=[])
+            Switch(variable=source, case={'1': ["hangup"]})
+        self.assertEqual(evaluate("vars.new && vars.a?.5:0", {"vars": {"new": 1, "a": 1}}), 0.5)
+
+    def test_checked_at_build_time(self):
+        with self.assertRaises(ValueError) as context:
+            Cond(when="vars.a == ", then=["hangup"], else_=["hangup"])
+        self.assertEqual(str(context.exception), "Invalid value for 'when' in 'cond'. Invalid expression "
+                                                 "'vars.a == ': unexpected end of expression at position 10.")
+        with self.assertRaises(ValueError):
+            Switch(variable="vars.[a]", case={'1': ["hangup"]})
+        # substitutions are only known on the call
+        Switch(variable="%{vars.choice}", case={'1': ["hangup"]})
+        Cond(when="call.from.startsWith('+1') && /^\\d+$/.test(vars.pin)", then=["hangup"], else_=[])
+        Switch(variable="vars.choice.toLowerCase()", case={'yes': ["hangup"]})
+
+    def test_document_validation(self):
+        response = SignalWireML()
+        response.add_section('main').add_instruction({'cond': {'when': "a &&", 'then': ["hangup"]}})
+        with self.assertRaises(ValueError) as context:
+            response.validate()
+        self.assertIn("sections.main[0].cond.when", str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import gc
+import json
+import pickle
+import unittest
+
+from swml import SignalWireML, Play, Hangup, AI, Connect, Set
+from swml.Frozen import freeze, FrozenParams, interned_count
+
+
+class TestSWMLFrozen(unittest.TestCase):
+    def test_equal_instructions_are_interned(self):
+        play = Play(url="say:Hello", volume=2.0).freeze()
+        self.assertIs(Play(volume=2.0, url="say:Hello").freeze(), play)
+        self.assertIsNot(Play(url="say:Bye").freeze(), play)
+        self.assertIsInstance(play, Play)
+        self.assertTrue(play.frozen)
+        self.assertIs(play.freeze(), play)
+        self.assertEqual(len({play, freeze(Play(url="say:Hello", volume=2.0)), Hangup().freeze()}), 2)
+
+    def test_value_types_are_kept(self):
+        integer = Set(variables={"a": 1}).freeze()
+        boolean = Set(variables={"a": True}).freeze()
+        self.assertIsNot(boolean, integer)
+        self.assertNotEqual(boolean, integer)
+        self.assertEqual(boolean.serialize(), {"set": {"variables": {"a": True}}})
+        self.assertIs(Set(variables={"a": True}).freeze(), boolean)
+
+        volume = Play(url="say:Hello", volume=1).freeze()
+        self.assertIn('"volume": 1.0', json.dumps(Play(url="say:Hello", volume=1.0).freeze().serialize()))
+        self.assertIsNot(Play(url="say:Hello", volume=1.0).freeze(), volume)
+
+    def test_immutable(self):
+        connect = Connect(to_number="+15551234567", headers=[{"name": "X-Id", "value": "1"}]).freeze()
+        with self.assertRaises(TypeError):
+            connect.params['timeout'] = 30
+        with self.assertRaises(TypeError):
+            connect.params.update(timeout=30)
+        with self.assertRaises(AttributeError):
+            connect.params = {}
+        self.assertIsInstance(connect.params['headers'][0], FrozenParams)
+        with self.assertRaises(TypeError):
+            connect.params['headers'][0]['name'] = "X-Other"
+
+    def test_serialization_matches_and_is_shared(self):
+        defaults = AI.SWAIGDefaults(web_hook_url="https://example.com/swaig", meta_data={"tier": ["gold"]})
+        frozen = defaults.freeze()
+        self.assertEqual(frozen.serialize(), defaults.serialize())
+
+        documents = []
+        for _ in range(2):
+            response = SignalWireML()
+            main_section = response.add_section('main')
+            main_section.add_instruction(Play(url="say:Hello").freeze())
+            main_section.ai(SWAIG=AI.SWAIGParams(defaults=frozen))
+            main_section.add_instruction(Hangup().freeze())
+            documents.append(response)
+
+        expected = SignalWireML()
+        expected_section = expected.add_section('main')
+        expected_section.play(url="say:Hello")
+        expected_section.ai(SWAIG=AI.SWAIGParams(defaults=defaults))
+        expected_section.hangup()
+        for data_format in ('json', 'yaml'):
+            self.assertEqual(documents[0].generate_swml(data_format), expected.generate_swml(data_format))
+
+        first, second = (document.get_section('main')._actions for document in documents)
+        self.assertIs(first[1]['ai']['SWAIG']['defaults'], second[1]['ai']['SWAIG']['defaults'])
+        # the top level is copied, changing one document's loaded instruction doesn't change the other
+        documents[0].get_section('main').get_instruction(0).params['url'] = "say:Changed"
+        self.assertEqual(second[0], {"play": {"url": "say:Hello"}})
+
+    def test_nested_values_are_not_shared_with_callers(self):
+        documents = []
+        for _ in range(2):
+            response = SignalWireML()
+            response.add_section('main').add_instruction(Set(variables={'a': {'x': 1}, 'b': [1]}).freeze())
+            documents.append(response)
+        instruction = documents[0].get_section('main').get_instruction(0)
+        instruction.params['variables']['a']['x'] = 99
+        instruction.params['variables']['b'].append(2)
+        self.assertEqual(json.loads(documents[1].generate_swml())['sections']['main'],
+                         [{'set': {'variables': {'a': {'x': 1}, 'b': [1]}}}])
+
+        frozen = Set(variables={'a': {'x': 1}}).freeze()
+        frozen.serialize()['set']['variables']['a']['x'] = 99
+        frozen.thaw().params['variables']['a']['x'] = 99
+        self.assertEqual(frozen.serialize(), {'set': {'variables': {'a': {'x': 1}}}})
+
+    def test_thaw_and_pickle(self):
+        frozen = Play(urls=["say:a", "say:b"]).freeze()
+        thawed = frozen.thaw()
+        thawed.params['urls'].append("say:c")
+        self.assertEqual(frozen.serialize(), {"play": {"urls": ["say:a", "say:b"]}})
+        self.assertIs(pickle.loads(pickle.dumps(frozen)), frozen)
+
+    def test_interned_instances_are_released(self):
+        Play(url="say:Released once unused").freeze()
+        gc.collect()
+        before = interned_count()
+        play = Play(url="say:Released once unused").freeze()
+        self.assertEqual(interned_count(), before + 1)
+        del play
+        gc.collect()
+        self.assertEqual(interned_count(), before)
+
+    def test_unhashable_values(self):
+        with self.assertRaises(TypeError):
+            freeze(Set(variables={"ids": {1, 2}}))
+        with self.assertRaises(TypeError):
+            freeze({"play": {}})
@@ -0,0 +1,50 @@
+import unittest
+
+from swml import SignalWireML, Cond, Switch, Transfer, Execute
+from swml.Graph import SectionGraph
+
+
+class TestSWMLGraph(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.answer()
+        main_section.add_instruction(Cond(when="vars.vip", then=[Execute(dest="vip")],
+                                          else_=[Switch(variable="vars.lang", case={"es": [Transfer(dest="spanish")]},
+                                                        default=[{"execute": "english"}])]))
+        main_section.transfer(dest="https://example.com/swml")
+        self.response.add_section('vip').execute(dest="missing")
+        self.response.add_section('spanish').transfer(dest="english")
+        self.response.add_section('english').transfer(dest="%{vars.next}")
+        self.response.add_section('retry').transfer(dest="dead_end")
+        self.response.add_section('dead_end').transfer(dest="retry")
+
+    def test_edges_follow_nested_branches(self):
+        graph = self.response.analyze()
+        self.assertEqual(graph.edges['main'], ['vip', 'spanish', 'english'])
+        self.assertEqual(graph.edges['english'], [])
+
+    def test_dangling_cycles_and_unreachable(self):
+        graph = self.response.analyze()
+        self.assertEqual(graph.dangling, [('vip', 'missing')])
+        self.assertEqual(graph.cycles, [['retry', 'dead_end']])
+        self.assertEqual(graph.unreachable, ['retry', 'dead_end'])
+
+    def test_self_reference_is_a_cycle(self):
+        graph = SectionGraph({'main': ['main'], 'other': []})
+        self.assertEqual(graph.cycles, [['main']])
+        self.assertEqual(graph.unreachable, ['other'])
+
+    def test_long_chain(self):
+        edges = {f"section_{index}": [f"section_{index + 1}"] for index in range(5000)}
+        edges['section_5000'] = ['section_0']
+        graph = SectionGraph(edges, root='section_0')
+        self.assertEqual(len(graph.cycles), 1)
+        self.assertEqual(len(graph.cycles[0]), 5001)
+        self.assertEqual(graph.unreachable, [])
+
+    def test_prune(self):
+        self.assertEqual(self.response.prune(), ['retry', 'dead_end'])
+        self.assertNotIn('retry', self.response.generate_swml())
+        with self.assertRaises(ValueError):
+            self.response.prune('unknown')
@@ -0,0 +1,50 @@
+import copy
+import pickle
+import unittest
+
+from swml import AI, Play, DataMapExpression, DataMapExpressionOutput
+from swml.SWMLTypes import Instruction
+
+
+class TestSWMLInstructionLayout(unittest.TestCase):
+    def test_instances_have_no_dict(self):
+        instances = [Play(url="say:hello"),
+                     AI.SWAIGFunction.FunctionArgs.PropertyDetail(type_="string", description="Location"),
+                     DataMapExpression(string="${args.city}", pattern=".*",
+                                       output=DataMapExpressionOutput(response="ok")),
+                     AI.LanguageParams(name="English", code="en-US")]
+        for instance in instances:
+            self.assertFalse(hasattr(instance, '__dict__'), type(instance).__name__)
+            with self.assertRaises(AttributeError):
+                instance.unknown_attribute = True
+
+    def test_subclasses_can_declare_slots(self):
+        class Custom(Instruction):
+            __slots__ = ('extra',)
+
+            def __init__(self, value):
+                super().__init__(class_name='custom', value=value)
+                self.extra = value
+
+        custom = Custom(1)
+        self.assertEqual(custom.extra, 1)
+        self.assertEqual(custom.serialize(), {"custom": {"value": 1}})
+
+    def test_subclasses_outside_the_package_keep_their_dict(self):
+        class MyPlay(Play):
+            def __init__(self, url, note):
+                super().__init__(url=url)
+                self.note = note
+
+        play = MyPlay("say:hello", "greeting")
+        self.assertEqual(play.note, "greeting")
+        self.assertEqual(play.serialize(), {"play": {"url": "say:hello"}})
+        frozen = play.freeze()
+        self.assertEqual(frozen.serialize(), play.serialize())
+        self.assertEqual(frozen.thaw().serialize(), play.serialize())
+
+    def test_copy_and_pickle(self):
+        play = Play(url="say:hello", volume=1.0)
+        for clone in (copy.copy(play), copy.deepcopy(play), pickle.loads(pickle.dumps(play))):
+            self.assertIsInstance(clone, Play)
+            self.assertEqual(clone.serialize(), play.serialize())
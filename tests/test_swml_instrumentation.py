@@ -0,0 +1,100 @@
+import threading
+import unittest
+from unittest import mock
+
+from swml import SignalWireML, Section, Play, Profiler
+from swml import Instrumentation
+from swml.SWMLTypes import InstructionType
+
+
+class TestSWMLInstrumentation(unittest.TestCase):
+    def build(self):
+        response = SignalWireML()
+        main_section = response.add_section('main')
+        main_section.answer()
+        main_section.play(url="say:Hello")
+        main_section.play(url="say:Bye")
+        response.add_section('other').extend([Play(url="say:Other")])
+        return response
+
+    def test_records_construction_sections_and_generate(self):
+        with Profiler() as profiler:
+            response = self.build()
+            output = response.generate_swml()
+            response.generate_swml('yaml')
+            response.generate_swml(data_format='yaml')
+        stats = profiler.export()
+
+        self.assertEqual(stats['constructions']['play']['count'], 3)
+        self.assertEqual(stats['constructions']['answer']['count'], 1)
+        self.assertEqual(stats['sections']['main']['add']['count'], 3)
+        self.assertEqual(stats['sections']['other']['add']['count'], 1)
+        self.assertEqual(stats['sections']['main']['encode']['count'], 3)
+        self.assertEqual(stats['generate']['json'], {'count': 1, 'seconds': stats['generate']['json']['seconds'],
+                                                     'bytes': len(output)})
+        self.assertEqual(stats['generate']['yaml']['count'], 2)
+        self.assertGreater(stats['generate']['yaml']['seconds'], 0)
+
+    def test_eager_sections_report_serialize_time(self):
+        response = SignalWireML()
+        main_section = response.add_section('main')
+        with Profiler() as profiler:
+            for index in range(3):
+                main_section.ai(prompt={'text': f"Prompt {index}"}, hints=["one", "two"])
+            main_section.add_many('play', url=["say:a", "say:b"])
+        serialize = profiler.export()['sections']['main']['serialize']
+        self.assertEqual(serialize['count'], 4)
+        self.assertGreater(serialize['seconds'], 0)
+
+    def test_other_threads_are_not_recorded(self):
+        with Profiler() as profiler:
+            thread = threading.Thread(target=lambda: self.build().generate_swml())
+            thread.start()
+            thread.join()
+            Play(url="say:a")
+        self.assertEqual(profiler.export(), {'constructions': {'play': {'count': 1, 'seconds': mock.ANY}},
+                                             'sections': {}, 'generate': {}})
+
+    def test_generated_size_is_in_bytes(self):
+        # the built-in encoders escape non-ASCII characters, a custom backend may not
+        hook = Instrumentation._generate_hook(lambda document, data_format, *args: "café")
+        with Profiler() as profiler:
+            hook(None, 'json')
+        self.assertEqual(profiler.export()['generate']['json']['bytes'], 5)
+
+    def test_hooks_are_removed_when_stopped(self):
+        generate_swml = SignalWireML.generate_swml
+        add_instruction = Section.add_instruction
+        profiler = Profiler().start()
+        self.assertIsNot(SignalWireML.generate_swml, generate_swml)
+        self.assertIn('__call__', InstructionType.__dict__)
+        profiler.stop()
+        self.assertIs(SignalWireML.generate_swml, generate_swml)
+        self.assertIs(Section.add_instruction, add_instruction)
+        self.assertNotIn('__call__', InstructionType.__dict__)
+
+        self.build().generate_swml()
+        self.assertEqual(profiler.export(), {'constructions': {}, 'sections': {}, 'generate': {}})
+
+    def test_nested_profilers(self):
+        with Profiler() as outer:
+            Play(url="say:a")
+            with Profiler() as inner:
+                Play(url="say:b")
+            Play(url="say:c")
+        self.assertEqual(outer.export()['constructions']['play']['count'], 3)
+        self.assertEqual(inner.export()['constructions']['play']['count'], 1)
+        with self.assertRaises(ValueError):
+            outer.stop()
+
+    def test_custom_record(self):
+        events = []
+
+        class Forwarding(Profiler):
+            def record(self, kind, key, seconds, size=0):
+                events.append((kind, key))
+                super().record(kind, key, seconds, size)
+
+        with Forwarding():
+            Play(url="say:a")
+        self.assertEqual(events, [('construct', 'play')])
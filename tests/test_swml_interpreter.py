@@ -0,0 +1,120 @@
+import unittest
+
+from swml import SignalWireML, Cond, Switch, Execute, Transfer, Prompt, Play, Set, Unset, Return, Hangup, Request
+from swml.Interpreter import Interpreter
+
+
+class TestSWMLInterpreter(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.answer()
+        main_section.add_instruction(Set(variables={'attempts': 0, 'caller': "%{call.from}"}))
+        main_section.add_instruction(Prompt(play="say:Press 1 for sales, 2 for support", max_digits=1))
+        main_section.add_instruction(Switch(variable="prompt_value", case={
+            "1": [Execute(dest="sales", params={'team': "east"})],
+            "2": [Transfer(dest="support")],
+        }, default=[Transfer(dest="https://example.com/fallback")]))
+        main_section.add_instruction(Cond(when="vars.return_value == 'closed'", then=[Hangup(reason="busy")],
+                                          else_=[Play(url="say:Connecting")]))
+        main_section.add_instruction(Unset(vars_="attempts"))
+        sales = self.response.add_section('sales')
+        sales.add_instruction(Set(variables={'team': "%{params.team}"}))
+        sales.add_instruction(Request(url="https://example.com/hours", method="GET", save_variables=True))
+        sales.add_instruction(Cond(when="vars.open == true", then=[Return(return_value="open")],
+                                   else_=[Return(return_value="closed")]))
+        sales.add_instruction(Play(url="say:Never reached"))
+        support = self.response.add_section('support')
+        support.add_instruction(Play(url="say:Support"))
+        support.add_instruction(Return(return_value="done"))
+        self.interpreter = self.response.interpreter()
+
+    def test_execute_returns_to_caller(self):
+        result = self.interpreter.run(call={'from': "+15551234567"}, inputs=["1"],
+                                      responses={"https://example.com/hours": {'open': True}})
+        self.assertEqual(result.outcome, 'completed')
+        self.assertEqual(result.verbs, ['answer', 'set', 'prompt', 'switch', 'execute', 'set', 'request', 'cond',
+                                        'return', 'cond', 'play', 'unset'])
+        self.assertEqual(result.variables['caller'], "+15551234567")
+        self.assertEqual(result.variables['team'], "east")
+        self.assertEqual(result.variables['return_value'], "open")
+        self.assertNotIn('attempts', result.variables)
+
+    def test_cond_else_branch_hangs_up(self):
+        result = self.interpreter.run(inputs=["1"], responses={"https://example.com/hours": {'open': False}})
+        self.assertEqual(result.outcome, 'hangup')
+        self.assertEqual(result.hangup_reason, "busy")
+        self.assertEqual(result.verbs[-1], 'hangup')
+
+    def test_transfer_to_section_and_return(self):
+        result = self.interpreter.run(inputs=["2"])
+        self.assertEqual(result.outcome, 'return')
+        self.assertEqual(result.return_value, "done")
+        self.assertEqual([section for section, _, _ in result.trace][-2:], ['support', 'support'])
+
+    def test_transfer_to_url_and_no_input(self):
+        result = self.interpreter.run()
+        self.assertEqual(result.outcome, 'transferred')
+        self.assertEqual(result.transfer_dest, "https://example.com/fallback")
+        self.assertEqual(result.variables['prompt_result'], 'no_input')
+
+    def test_missing_section(self):
+        response = SignalWireML()
+        response.add_section('main').execute(dest="missing")
+        with self.assertRaises(ValueError) as context:
+            response.interpreter().run()
+        self.assertEqual(str(context.exception), "Section with name 'missing' does not exist.")
+
+    def test_step_limit(self):
+        response = SignalWireML()
+        response.add_section('main').transfer(dest="main")
+        result = response.interpreter(max_steps=50).run()
+        self.assertEqual(result.outcome, 'step_limit')
+        self.assertEqual(result.steps, 50)
+
+    def test_shorthands(self):
+        interpreter = Interpreter({'main': [{'set': {'variables': {'a': 1}}}, {'unset': "a"}, {'execute': "sub"}],
+                                   'sub': [{'return': 7}]})
+        result = interpreter.run()
+        self.assertEqual(result.return_value, 7)
+        self.assertNotIn('a', result.variables)
+
+    def test_custom_stub(self):
+        interpreter = self.response.interpreter(stubs={'request': lambda params, context: {'open': False}})
+        self.assertEqual(interpreter.run(inputs=["1"]).outcome, 'hangup')
+
+    def test_expressions_in_substitutions(self):
+        interpreter = Interpreter({'main': [{'set': {'variables': {'total': "%{vars.count * 2}",
+                                                                   'label': "Total: %{vars.count + 1}"}}},
+                                            {'switch': {'variable': "%{vars.count > 1 ? 'many' : 'one'}",
+                                                        'case': {'many': ["hangup"]}}}]})
+        result = interpreter.run(variables={'count': 2})
+        self.assertEqual(result.variables['total'], 4)
+        self.assertEqual(result.variables['label'], "Total: 3")
+        self.assertEqual(result.outcome, 'hangup')
+
+    def test_run_many(self):
+        # throughput is measured by the interpreter.run_many_1000 benchmark
+        calls = [{'inputs': [str(index % 3 + 1)], 'responses': {"https://example.com/hours": {'open': True}}}
+                 for index in range(30)]
+        results = self.interpreter.run_many(calls)
+        self.assertEqual({result.outcome for result in results}, {'completed', 'return', 'transferred'})
+
+    def test_snapshot_is_independent(self):
+        interpreter = self.response.interpreter()
+        self.response.get_section('support')._actions[0]['play']['url'] = "say:Changed"
+        self.response._sections['support']._actions.append({'hangup': {}})
+        result = interpreter.run(inputs=["2"])
+        self.assertEqual(result.trace[-2][2], {'url': "say:Support"})
+        self.assertEqual(result.outcome, 'return')
+
+    def test_scripted_inputs_of_any_type(self):
+        interpreter = Interpreter({'main': [{'prompt': {'play': "say:Pin"}}, {'record': {}}]})
+        result = interpreter.run(inputs=[1234, 5])
+        self.assertEqual(result.variables['prompt_result'], 'match_digits')
+        self.assertEqual(result.variables['prompt_value'], "1234")
+        self.assertEqual(result.variables['record_url'], "5")
+
+
+if __name__ == '__main__':
+    unittest.main()
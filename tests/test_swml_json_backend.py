@@ -0,0 +1,64 @@
+import json
+import unittest
+
+from swml import SignalWireML, JSONBackend
+from swml.Encoders import orjson
+
+
+class UpperCaseBackend(JSONBackend):
+    def dumps(self, data, compact=False):
+        return json.dumps(data).upper()
+
+
+class TestSWMLJsonBackend(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.answer()
+        main_section.play(url="say:Héllo")
+        self.response.add_section('other').hangup(reason='busy')
+
+    def tearDown(self):
+        SignalWireML.set_json_backend('stdlib')
+        SignalWireML.json_backends.pop('upper', None)
+
+    def test_default_output_unchanged(self):
+        expected_swml = ('{"sections": {"main": ["answer", {"play": {"url": "say:H\\u00e9llo"}}], '
+                         '"other": [{"hangup": {"reason": "busy"}}]}}')
+        self.assertEqual(self.response.generate_swml(), expected_swml)
+
+    def test_compact(self):
+        expected_swml = ('{"sections":{"main":["answer",{"play":{"url":"say:H\\u00e9llo"}}],'
+                         '"other":[{"hangup":{"reason":"busy"}}]}}')
+        self.assertEqual(self.response.generate_swml(compact=True), expected_swml)
+
+    def test_bytes_output(self):
+        output = self.response.generate_swml(as_bytes=True)
+        self.assertIsInstance(output, bytes)
+        self.assertEqual(output.decode(), self.response.generate_swml())
+        self.assertEqual(self.response.generate_swml('yaml', as_bytes=True).decode(),
+                         self.response.generate_swml('yaml'))
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_orjson_backend(self):
+        output = self.response.generate_swml(json_backend='orjson', as_bytes=True)
+        self.assertIsInstance(output, bytes)
+        self.assertEqual(json.loads(output), json.loads(self.response.generate_swml()))
+        self.assertEqual(self.response.generate_swml(json_backend='orjson'),
+                         json.dumps(json.loads(output), separators=(',', ':'), ensure_ascii=False))
+
+    def test_global_and_per_call_backend(self):
+        SignalWireML.register_json_backend('upper', UpperCaseBackend())
+        SignalWireML.set_json_backend('upper')
+        self.assertTrue(self.response.generate_swml().startswith('{"sections": {"MAIN": ["ANSWER"'))
+        self.assertEqual(self.response.generate_swml(json_backend='stdlib'),
+                         self.response.generate_swml(json_backend='stdlib', compact=False))
+        self.assertIn('"main"', self.response.generate_swml(json_backend='stdlib'))
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            self.response.generate_swml(json_backend='missing')
+        with self.assertRaises(ValueError):
+            SignalWireML.set_json_backend('missing')
+        with self.assertRaises(ValueError):
+            SignalWireML.register_json_backend('bad', json)
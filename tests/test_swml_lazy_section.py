@@ -0,0 +1,55 @@
+import unittest
+
+from swml import SignalWireML, Section, Play, AI, Hangup
+
+
+class TestSWMLLazySection(unittest.TestCase):
+    def build(self, lazy):
+        response = SignalWireML(lazy=lazy)
+        main_section = response.add_section('main')
+        main_section.answer()
+        main_section.play(url="say:Welcome")
+        main_section.ai(prompt=AI.PromptParams(text="You are a helpful assistant."), hints=["one"])
+        main_section.add_instruction({"execute": "voicemail"})
+        response.add_section('other').hangup(reason='busy')
+        return response
+
+    def test_output_matches_eager(self):
+        lazy, eager = self.build(True), self.build(False)
+        for data_format in ('json', 'yaml'):
+            self.assertEqual(lazy.generate_swml(data_format), eager.generate_swml(data_format))
+            self.assertEqual(''.join(lazy.stream_swml(data_format)), eager.generate_swml(data_format))
+
+    def test_instructions_are_kept(self):
+        response = self.build(True)
+        main_section = response.get_section('main')
+        self.assertIsInstance(main_section.get_instruction(1), Play)
+        self.assertEqual(main_section._actions[3], {"execute": "voicemail"})
+
+    def test_changes_after_add_are_rendered(self):
+        response = self.build(True)
+        response.generate_swml()
+        main_section = response.get_section('main')
+        main_section.get_instruction(1).params['url'] = "say:Changed"
+        self.assertIn('"url": "say:Changed"', response.generate_swml())
+        self.assertIn('url: say:Changed', response.generate_swml('yaml'))
+
+    def test_per_instruction_override(self):
+        section = Section('main')
+        hangup = Hangup()
+        section.add_instruction(hangup, lazy=True)
+        section.add_instruction(Play(url="say:bye"))
+        self.assertIs(section.get_instruction(0), hangup)
+        self.assertEqual(section._actions[1], {"play": {"url": "say:bye"}})
+
+        lazy_section = Section('other', lazy=True)
+        lazy_section.add_instruction(hangup, lazy=False)
+        self.assertEqual(lazy_section._actions[0], "hangup")
+
+    def test_shared_instruction_serialized_once_per_document(self):
+        response = SignalWireML(lazy=True)
+        prompt = AI(prompt=AI.PromptParams(text="Shared prompt"))
+        response.add_section('main').add_instruction(prompt)
+        response.add_section('other').add_instruction(prompt)
+        sections = response.serialize_sections()
+        self.assertIs(sections['main'][0], sections['other'][0])
@@ -0,0 +1,102 @@
+import io
+import unittest
+
+from swml import SignalWireML, Answer, Connect, Switch, Transfer, AI
+from swml.SWMLTypes import Instruction
+from swml.Encoders import orjson
+
+
+class TestSWMLLoader(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.answer()
+        main_section.connect(to_number="+1XXXXXXXXXX", timeout=30)
+        main_section.add_instruction(Switch(variable="prompt_value", case={"1": [Transfer(dest="sales")]},
+                                            default=[Transfer(dest="main")]))
+        main_section.ai(prompt=AI.PromptParams(text="You are a helpful assistant.\nKeep it short."))
+        main_section.add_instruction({"execute": "voicemail"})
+        self.response.add_section('sales').hangup(reason='busy')
+
+    def test_round_trip(self):
+        for data_format in ('json', 'yaml'):
+            swml = self.response.generate_swml(data_format)
+            self.assertEqual(SignalWireML.loads(swml).generate_swml(data_format), swml)
+            self.assertEqual(SignalWireML.loads(swml, data_format).generate_swml(data_format), swml)
+
+    def test_load_from_file_and_bytes(self):
+        swml = self.response.generate_swml()
+        self.assertEqual(SignalWireML.load(io.StringIO(swml)).generate_swml(), swml)
+        self.assertEqual(SignalWireML.loads(swml.encode()).generate_swml(), swml)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_load_with_orjson(self):
+        swml = self.response.generate_swml()
+        self.assertEqual(SignalWireML.loads(swml, json_backend='orjson').generate_swml(), swml)
+
+    def test_instructions_are_typed_on_access(self):
+        loaded = SignalWireML.loads(self.response.generate_swml())
+        main_section = loaded.get_section('main')
+        self.assertEqual(len(main_section), 5)
+        self.assertIsInstance(main_section._actions[1], dict)
+
+        self.assertIsInstance(main_section.get_instruction(0), Answer)
+        connect = main_section.get_instruction(1)
+        self.assertIsInstance(connect, Connect)
+        self.assertEqual(connect.params, {"to_number": "+1XXXXXXXXXX", "timeout": 30})
+        self.assertIsInstance(main_section.get_instruction(2), Switch)
+        self.assertIsInstance(main_section.get_instruction(3), AI)
+        self.assertIs(main_section.get_instruction(1), connect)
+
+        # shorthand is held by a nameless Instruction that serializes back to it
+        shorthand = main_section.get_instruction(4)
+        self.assertEqual(type(shorthand), Instruction)
+        self.assertEqual(shorthand.serialize(), {"execute": "voicemail"})
+
+    def test_unknown_verb_uses_generic_instruction(self):
+        loaded = SignalWireML.loads('{"sections": {"main": [{"custom_verb": {"key": "value"}}]}}')
+        instruction = loaded.get_section('main').get_instruction(0)
+        self.assertEqual(type(instruction), Instruction)
+        self.assertEqual(instruction.serialize(), {"custom_verb": {"key": "value"}})
+
+    def test_patch_and_re_emit(self):
+        loaded = SignalWireML.loads(self.response.generate_swml())
+        loaded.generate_swml()
+        main_section = loaded.get_section('main')
+        main_section.get_instruction(1).params['timeout'] = 60
+        self.assertIn('"timeout": 60', loaded.generate_swml())
+        main_section.get_instruction(1).params['timeout'] = 90
+        self.assertIn('timeout: 90', loaded.generate_swml('yaml'))
+        self.assertEqual(''.join(loaded.stream_swml()), loaded.generate_swml())
+
+        main_section.set_instruction(0, Answer(max_duration=10))
+        main_section.remove_instruction(4)
+        loaded.add_section('other').hangup()
+        self.assertTrue(loaded.generate_swml().startswith('{"sections": {"main": [{"answer": {"max_duration": 10}}'))
+        self.assertNotIn('voicemail', loaded.generate_swml())
+
+    def test_shorthand_edits_and_forms_are_kept(self):
+        loaded = SignalWireML.loads('{"sections": {"main": [{"answer": {}}, "hangup", {"execute": "voicemail"}]}}')
+        main_section = loaded.get_section('main')
+        self.assertIsInstance(main_section.get_instruction(0), Answer)
+        main_section.get_instruction(1)
+        main_section.get_instruction(2).params['execute'] = "sales"
+        self.assertEqual(loaded.generate_swml(),
+                         '{"sections": {"main": [{"answer": {}}, "hangup", {"execute": "sales"}]}}')
+
+        bad = SignalWireML.loads('{"sections": {"main": [42]}}')
+        with self.assertRaises(ValueError):
+            bad.get_section('main').get_instruction(0)
+
+    def test_input_lists_are_copied(self):
+        document = {"sections": {"main": ["answer"]}}
+        SignalWireML.from_dict(document).get_section('main').hangup()
+        self.assertEqual(document, {"sections": {"main": ["answer"]}})
+
+    def test_invalid_documents(self):
+        with self.assertRaises(ValueError):
+            SignalWireML.loads('{"main": []}')
+        with self.assertRaises(ValueError):
+            SignalWireML.loads('sections:\n  main: answer\n')
+        with self.assertRaises(ValueError):
+            SignalWireML.loads('{}', data_format='xml')
@@ -0,0 +1,71 @@
+import copy
+import json
+import unittest
+
+from swml import SignalWireML, AI
+from swml.Minimizer import collapse_verbs, strip_empty, dedupe_functions
+
+
+class TestSWMLMinimizer(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.add_instruction({"answer": {}})
+        function = AI.SWAIGFunction(function="get_weather", purpose="Look up the weather",
+                                    argument=AI.SWAIGFunction.FunctionArgs(type_="object", properties={}))
+        main_section.ai(prompt=AI.PromptParams(text="Hello"), hints=[],
+                        SWAIG=AI.SWAIGParams(functions=[function, function]))
+        main_section.add_instruction({"cond": {"when": "vars.a == 1", "then": [{"hangup": {}}], "else": []}})
+        main_section.add_instruction({"set": {"variables": {}}})
+
+    def test_passes(self):
+        actions = [{"cond": {"when": "vars.a", "then": [{"hangup": {}}]}}, {"denoise": None}]
+        self.assertEqual(collapse_verbs(actions), [{"cond": {"when": "vars.a", "then": ["hangup"]}}, "denoise"])
+        self.assertEqual(strip_empty([{"play": {"urls": [], "url": "say:a"}}, {"set": {"variables": {}}}]),
+                         [{"play": {"url": "say:a"}}, {"set": {"variables": {}}}])
+        functions = [{"function": "a", "purpose": "b"}, {"purpose": "b", "function": "a"}, {"function": "c"}]
+        self.assertEqual(dedupe_functions([{"ai": {"SWAIG": {"functions": functions}}}]),
+                         [{"ai": {"SWAIG": {"functions": [functions[0], functions[2]]}}}])
+
+    def test_user_data_is_kept(self):
+        actions = [{"set": {"variables": {"queue": [], "opts": {}}}},
+                   {"request": {"url": "https://example.com", "method": "POST", "body": {}}},
+                   {"execute": {"dest": "a", "params": {"list": [], "map": {}}, "meta_data": {}}},
+                   {"ai": {"hints": [], "SWAIG": {"functions": [{"function": "f", "argument": {"properties": {}}}]}}},
+                   {"transfer": {"dest": "a", "params": {"answer": {}}}}]
+        self.assertEqual(strip_empty(actions), actions[:3] + [
+            {"ai": {"SWAIG": {"functions": [{"function": "f", "argument": {"properties": {}}}]}}}, actions[4]])
+        kept = actions[:3]
+        self.assertIs(strip_empty(kept), kept)
+
+    def test_unchanged_actions_are_reused(self):
+        actions = ["answer", {"play": {"url": "say:a"}}]
+        self.assertIs(collapse_verbs(actions), actions)
+        self.assertIs(strip_empty(actions), actions)
+
+    def test_minimize(self):
+        before = copy.deepcopy(self.response.serialize_sections())
+        original = self.response.generate_swml()
+        output, report = self.response.minimize()
+
+        self.assertEqual(json.loads(output), {"sections": {"main": [
+            "answer",
+            {"ai": {"prompt": {"text": "Hello"}, "SWAIG": {"functions": [
+                {"function": "get_weather", "purpose": "Look up the weather", "argument": {"type": "object", "properties": {}}}]}}},
+            {"cond": {"when": "vars.a == 1", "then": ["hangup"]}},
+            {"set": {"variables": {}}}]}})
+        self.assertNotIn(' ', output.replace("Look up the weather", "").replace("vars.a == 1", ""))
+        self.assertEqual(list(report.saved), ['strip_empty', 'collapse_verbs', 'dedupe_functions', 'compact'])
+        self.assertTrue(all(saved > 0 for saved in report.saved.values()))
+        self.assertEqual(report.original_size, len(original))
+        self.assertEqual(report.size, len(output))
+        # the document itself is left as it was
+        self.assertEqual(self.response.serialize_sections(), before)
+        self.assertEqual(self.response.generate_swml(), original)
+
+    def test_minimize_selected_passes_and_yaml(self):
+        output, report = self.response.minimize('yaml', passes=['collapse_verbs'])
+        self.assertEqual(list(report.saved), ['collapse_verbs'])
+        self.assertIn("- answer\n", output)
+        with self.assertRaises(ValueError):
+            self.response.minimize(passes=['unknown'])
@@ -0,0 +1,23 @@
+from swml import SignalWireML, Record
+import unittest
+
+class TestSWMLRecord(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+
+    def test_record_method(self):
+        main_section = self.response.add_section('main')
+        main_section.record(stereo=True, format_="wav", direction="speak", terminators="#", beep=True)
+
+        expected_swml = '{"sections": {"main": [{"record": {"stereo": true, "format": "wav", "direction": "speak", "terminators": "#", "beep": true}}]}}'
+        self.assertEqual(self.response.generate_swml(), expected_swml)
+
+    def test_add_instruction_with_record_instance(self):
+        main_section = self.response.add_section('main')
+        main_section.add_instruction(Record(format_="mp3", end_silence_timeout=3.0))
+        expected_swml = '{"sections": {"main": [{"record": {"format": "mp3", "end_silence_timeout": 3.0}}]}}'
+        self.assertEqual(self.response.generate_swml(), expected_swml)
+
+    def test_record_invalid_format(self):
+        with self.assertRaises(ValueError):
+            Record(format_="ogg")
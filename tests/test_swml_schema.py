@@ -0,0 +1,104 @@
+import threading
+import unittest
+
+from swml import SignalWireML, Answer, Request, Hangup, Play, Connect, Tap, AI, Cond, Placeholder
+from swml.Schema import set_validation, validation, VERB_SCHEMAS
+from swml.Loader import VERBS
+
+
+class TestSWMLSchema(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        self.main_section = self.response.add_section('main')
+
+    def test_every_verb_has_a_schema(self):
+        self.assertEqual(set(VERBS), set(VERB_SCHEMAS))
+
+    def test_request_accepts_patch(self):
+        self.main_section.add_instruction(Request(url="https://example.com", method="PATCH"))
+        self.assertEqual(self.response.generate_swml(),
+                         '{"sections": {"main": [{"request": {"url": "https://example.com", "method": "PATCH"}}]}}')
+
+    def test_existing_messages(self):
+        with self.assertRaisesRegex(ValueError, "Hangup reason must be one of the following"):
+            Hangup("later")
+        with self.assertRaisesRegex(ValueError, "Cannot provide both 'url' and 'urls'"):
+            Play(url="say:a", urls=["say:b"])
+        with self.assertRaisesRegex(ValueError, "Exactly one of the dialing parameters"):
+            Connect(from_number="+1555")
+        with self.assertRaisesRegex(ValueError, r"Invalid codec. Expected one of \['PCMU', 'PCMA'\]"):
+            Tap(uri="rtp://127.0.0.1:5000", codec="OPUS")
+
+    def test_types_and_nested_objects(self):
+        with self.assertRaises(ValueError):
+            Play(url="say:a", volume="loud")
+        with self.assertRaises(ValueError):
+            Play(url="say:a", volume=True)
+        with self.assertRaises(ValueError):
+            AI(params={"wait_for_user": "yes"})
+        with self.assertRaises(ValueError):
+            AI(SWAIG={"functions": [{"function": "get_weather"}]})
+        with self.assertRaises(ValueError):
+            AI.PromptParams(temperature="hot")
+
+    def test_numeric_strings_pass(self):
+        self.assertEqual(Answer(max_duration="30").params, {"max_duration": "30"})
+        Play(url="say:a", volume="-2.5")
+        with self.assertRaises(ValueError):
+            Answer(max_duration="2.5")
+
+    def test_placeholders_and_variables_pass(self):
+        Play(url="say:a", volume=Placeholder('volume'))
+        Play(url="say:a", volume="%{vars.volume}")
+
+    def test_validation_can_be_turned_off(self):
+        with validation(False):
+            hangup = Hangup("later")
+        self.assertEqual(hangup.params, {"reason": "later"})
+        set_validation(False)
+        try:
+            Hangup("later")
+        finally:
+            set_validation(True)
+        with self.assertRaises(ValueError):
+            Hangup("later")
+
+    def test_validation_block_only_applies_to_its_thread(self):
+        errors = []
+        with validation(False):
+            Hangup("later")
+            thread = threading.Thread(target=lambda: errors.append(self.assertRaises(ValueError, Hangup, "later")))
+            thread.start()
+            thread.join()
+        self.assertEqual(len(errors), 1)
+
+    def test_document_validation_reports_every_error(self):
+        with validation(False):
+            self.main_section.hangup("later")
+            self.main_section.add_instruction(Cond(when="vars.a == 1", then=[Play(url="say:a", urls=["say:b"])],
+                                                   else_=["hangup"]))
+        self.main_section.add_instruction({"request": {"url": "https://example.com", "method": "FETCH"}})
+        self.response.add_section('other').add_instruction({"tap": {"uri": "rtp://host", "direction": "up"}})
+
+        with self.assertRaises(ValueError) as context:
+            self.response.validate()
+        message = str(context.exception)
+        self.assertIn("sections.main[0].hangup.reason: Hangup reason", message)
+        self.assertIn("sections.main[1].cond.then[0].play: Cannot provide both", message)
+        self.assertIn("sections.main[2].request.method: Invalid request method", message)
+        self.assertIn("sections.other[0].tap.direction: Invalid direction", message)
+
+    def test_document_validation_passes(self):
+        self.main_section.answer()
+        self.main_section.add_instruction({"unknown_verb": {"anything": 1}})
+        self.main_section.hangup()
+        self.response.validate()
+
+    def test_add_many_is_validated(self):
+        with self.assertRaises(ValueError):
+            self.main_section.add_many('play', url=["say:a"], volume=["loud"])
+        with self.assertRaises(TypeError):
+            self.main_section.add_many('play', link=["say:a"])
+        self.main_section.add_many('record', format_=["wav", "mp3"])
+        self.assertEqual(self.response.generate_swml(),
+                         '{"sections": {"main": [{"record": {"format": "wav"}}, {"record": {"format": "mp3"}}]}}')
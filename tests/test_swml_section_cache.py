@@ -0,0 +1,66 @@
+import json
+import unittest
+
+import yaml
+
+from swml import SignalWireML, AI
+from swml.Encoders import CustomDumper
+
+
+class TestSWMLSectionCache(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        self.main_section = self.response.add_section('main')
+        self.main_section.answer()
+        self.main_section.ai(prompt=AI.PromptParams(text="You are a helpful assistant.\n\nKeep answers short, "
+                                                         "friendly and on topic even when the caller asks about "
+                                                         "something else entirely."),
+                             hints=["one", "two"])
+        self.other_section = self.response.add_section('1')
+        self.other_section.play(url="say:" + "a very long sentence that wraps " * 5)
+        self.other_section.hangup()
+
+    def full_encoding(self, data_format):
+        document = {'sections': self.response.serialize_sections()}
+        if data_format == 'json':
+            return json.dumps(document)
+        return yaml.dump(document, Dumper=CustomDumper, sort_keys=False, indent=2)
+
+    def test_output_matches_full_encoding(self):
+        for data_format in ('json', 'yaml'):
+            self.assertEqual(self.response.generate_swml(data_format), self.full_encoding(data_format))
+
+    def test_unchanged_sections_are_reused(self):
+        self.response.generate_swml()
+        fragment = self.main_section.encode_fragment('json')
+        self.other_section.hangup()
+        self.response.generate_swml()
+        self.assertIs(self.main_section.encode_fragment('json'), fragment)
+
+    def test_mutation_invalidates_section(self):
+        for data_format in ('json', 'yaml'):
+            self.response.generate_swml(data_format)
+            self.main_section.hangup()
+            self.assertEqual(self.response.generate_swml(data_format), self.full_encoding(data_format))
+
+    def test_raw_instructions_are_copied(self):
+        variables = {'a': 1, 'list': [1]}
+        self.main_section.add_instruction({'set': {'variables': variables}})
+        swml = self.response.generate_swml()
+        variables['a'] = 2
+        variables['list'].append(2)
+        self.assertEqual(self.response.generate_swml(), swml)
+        self.assertEqual(self.response.serialize_sections()['main'][-1], {'set': {'variables': {'a': 1, 'list': [1]}}})
+
+    def test_rename_invalidates_section(self):
+        self.response.generate_swml('yaml')
+        self.other_section.name = 'renamed'
+        self.assertIn('  renamed:\n', self.response.generate_swml('yaml'))
+
+    def test_open_ended_literal_in_middle_section(self):
+        response = SignalWireML()
+        response.add_section('main').play(url="say:trailing newlines\n\n")
+        response.add_section('other').hangup()
+        document = {'sections': response.serialize_sections()}
+        self.assertEqual(response.generate_swml('yaml'),
+                         yaml.dump(document, Dumper=CustomDumper, sort_keys=False, indent=2))
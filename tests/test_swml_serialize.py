@@ -0,0 +1,49 @@
+import unittest
+
+from swml import SignalWireML, AI, DataMap, Cond, Transfer, Switch, Play
+
+
+class TestSWMLSerialize(unittest.TestCase):
+    def setUp(self):
+        self.data_map = DataMap(expressions=[DataMap.Expressions(
+            string="${args.city}", pattern=".*", output=DataMap.Expressions.DataMapExpressionOutput(response="ok"))])
+        self.ai = AI(SWAIG=AI.SWAIGParams(functions=[
+            AI.SWAIGFunction(function=f"function_{index}", purpose="Lookup", data_map=self.data_map)
+            for index in range(3)]))
+
+    def test_shared_sub_objects_are_serialized_once(self):
+        functions = self.ai.serialize()['ai']['SWAIG']['functions']
+        self.assertIs(functions[0]['data_map'], functions[1]['data_map'])
+        self.assertEqual(functions[2]['data_map'], {"expressions": [
+            {"string": "${args.city}", "pattern": ".*", "output": {"response": "ok"}}]})
+
+    def test_memo_is_shared_between_calls(self):
+        memo = {}
+        first = self.data_map.serialize(memo)
+        self.assertIs(self.ai.serialize(memo)['ai']['SWAIG']['functions'][0]['data_map'], first)
+        self.assertIsNot(self.data_map.serialize(), first)
+
+    def test_shared_output_is_not_aliased_in_yaml(self):
+        response = SignalWireML()
+        response.add_section('main').add_instruction(self.ai)
+        swml = response.generate_swml('yaml')
+        self.assertNotIn('&id', swml)
+        self.assertEqual(swml.count('pattern: .*'), 3)
+
+    def test_deep_nesting(self):
+        instruction = Transfer(dest="main")
+        for depth in range(5000):
+            instruction = Cond(when=f"vars.depth == {depth}", then=[instruction], else_=[Play(url="say:no")])
+        serialized = instruction.serialize()
+        for _ in range(5000):
+            serialized = serialized['cond']['then'][0]
+        self.assertEqual(serialized, {"transfer": {"dest": "main"}})
+
+    def test_output_shape(self):
+        switch = Switch(variable="prompt_value", case={"1": [Transfer(dest="sales"), "hangup"]},
+                        default=[{"play": {"urls": ["say:a", "say:b"]}}])
+        self.assertEqual(switch.serialize(), {"switch": {
+            "variable": "prompt_value",
+            "case": {"1": [{"transfer": {"dest": "sales"}}, "hangup"]},
+            "default": [{"play": {"urls": ["say:a", "say:b"]}}]}})
+        self.assertEqual(AI.PromptParams().serialize(), {})
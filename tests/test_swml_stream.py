@@ -0,0 +1,79 @@
+import io
+import json
+import unittest
+
+from swml import SignalWireML, Switch, Transfer, AI
+from swml.Encoders import orjson, JSON_BACKENDS
+
+
+class TestSWMLStream(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.answer()
+        main_section.add_instruction(Switch(variable="call.to",
+                                            case={f"+1555{index:07d}": [Transfer(dest="sales")]
+                                                  for index in range(500)},
+                                            default=[Transfer(dest="main")]))
+        main_section.ai(prompt=AI.PromptParams(text="You are a helpful assistant.\nKeep it short."),
+                        hints=[f"hint {index}" for index in range(100)])
+        sales_section = self.response.add_section('sales')
+        sales_section.play(url="say:Welcome to Sales")
+        sales_section.hangup()
+        self.response.add_section('empty')
+
+    def test_stream_matches_generate(self):
+        for data_format in ('json', 'yaml'):
+            for compact in (False, True):
+                streamed = ''.join(self.response.stream_swml(data_format, compact=compact))
+                self.assertEqual(streamed, self.response.generate_swml(data_format, compact=compact))
+
+    def test_stream_yields_per_instruction(self):
+        chunks = list(self.response.stream_swml('yaml'))
+        self.assertGreaterEqual(len(chunks), 7)
+        self.assertEqual(chunks[0], 'sections:\n')
+        self.assertEqual(chunks[1], '  main:\n')
+
+    def test_stream_bytes(self):
+        chunks = list(self.response.stream_swml(as_bytes=True))
+        self.assertTrue(all(isinstance(chunk, bytes) for chunk in chunks))
+        self.assertEqual(b''.join(chunks), self.response.generate_swml(as_bytes=True))
+
+    def test_large_instructions_are_split(self):
+        for name in JSON_BACKENDS:
+            for compact in (False, True):
+                # a new document each time, generate_swml caches the fragment that stream_swml would then reuse
+                response = SignalWireML()
+                response.add_section('main').add_instruction(Switch(
+                    variable="call.to", case={f"+1555{index:07d}": [Transfer(dest="sales")] for index in range(5000)}))
+                chunks = list(response.stream_swml(json_backend=name, compact=compact, as_bytes=True))
+                self.assertLess(max(map(len, chunks)), 1000)
+                self.assertEqual(b''.join(chunks), response.generate_swml(json_backend=name, compact=compact,
+                                                                          as_bytes=True))
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_stream_orjson(self):
+        streamed = b''.join(self.response.stream_swml(json_backend='orjson', as_bytes=True))
+        self.assertEqual(streamed, self.response.generate_swml(json_backend='orjson', as_bytes=True))
+
+    def test_write_to_text_and_binary(self):
+        text_file = io.StringIO()
+        written = self.response.write_to(text_file)
+        self.assertEqual(text_file.getvalue(), self.response.generate_swml())
+        self.assertEqual(written, len(text_file.getvalue()))
+
+        binary_file = io.BytesIO()
+        self.response.write_to(binary_file, 'yaml')
+        self.assertEqual(binary_file.getvalue(), self.response.generate_swml('yaml', as_bytes=True))
+
+    def test_stream_after_mutation(self):
+        self.response.generate_swml()
+        self.response._sections['sales'].hangup()
+        self.assertEqual(json.loads(''.join(self.response.stream_swml()))['sections']['sales'][-1], 'hangup')
+        self.assertEqual(''.join(self.response.stream_swml()), self.response.generate_swml())
+
+    def test_invalid_format_fails_on_call(self):
+        with self.assertRaises(ValueError):
+            self.response.stream_swml('xml')
+        with self.assertRaises(ValueError):
+            SignalWireML().stream_swml()
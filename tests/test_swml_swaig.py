@@ -0,0 +1,119 @@
+import asyncio
+import gc
+import json
+import unittest
+
+from swml import AI, SWAIGApp, SWAIGFunction, SWAIGParams, Say, Stop, SetMetaData, SWMLAction
+from swml.Server import LocalClient, build_response
+
+
+def build_ai():
+    argument = SWAIGFunction.FunctionArgs(type_="object", properties={
+        'city': SWAIGFunction.FunctionArgs.PropertyDetail(type_="string", description="City"),
+        'days': SWAIGFunction.FunctionArgs.PropertyDetail(type_="integer", description="Days"),
+    })
+    return AI(prompt={'text': "Help"}, SWAIG=SWAIGParams(functions=[
+        SWAIGFunction(function="get_weather", purpose="Weather", argument=argument),
+        SWAIGFunction(function="transfer", purpose="Transfer the call"),
+    ]))
+
+
+def payload(function, args):
+    return {'function': function, 'argument': {'parsed': [args], 'raw': json.dumps(args)}, 'call_id': "abc"}
+
+
+class TestSWMLSWAIG(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.app = SWAIGApp(build_ai(), max_concurrency=8)
+        self.client = LocalClient(self.app)
+
+        @self.app.function("get_weather")
+        async def get_weather(args, request):
+            await asyncio.sleep(0)
+            return f"Sunny in {args['city']} for {args.get('days', 1)} days", [Say("Looking it up"),
+                                                                              SetMetaData({'city': args['city']})]
+
+        self.app.function("transfer", lambda args, request: [SWMLAction({'sections': {'main': ["hangup"]}}),
+                                                             Stop()])
+
+    async def test_dispatch(self):
+        status, headers, body = await self.client.post_json('/swaig', payload("get_weather", {'city': "Tampa",
+                                                                                              'days': 3}))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        self.assertEqual(body, {'response': "Sunny in Tampa for 3 days",
+                                'action': [{'say': "Looking it up"}, {'set_meta_data': {'meta_data': {'city': "Tampa"}}}]})
+
+        status, _, body = await self.client.post_json('/swaig', payload("transfer", {}))
+        self.assertEqual(body, {'action': [{'SWML': '{"sections": {"main": ["hangup"]}}'}, {'stop': True}]})
+
+    async def test_raw_arguments(self):
+        result = await self.app.dispatch({'function': "get_weather", 'argument': {'raw': '{"city": "Paris"}'}})
+        self.assertEqual(result['response'], "Sunny in Paris for 1 days")
+
+    async def test_errors(self):
+        cases = [
+            (payload("get_weather", {'city': 5}), "Invalid argument 'city' for function 'get_weather'. Expected string."),
+            (payload("get_weather", {'city': "a", 'days': True}),
+             "Invalid argument 'days' for function 'get_weather'. Expected integer."),
+            (payload("unknown", {}), "No handler for function 'unknown'."),
+            ({'function': "get_weather", 'argument': {'raw': "{not json"}},
+             "Invalid arguments for function 'get_weather'. Expected a JSON object."),
+        ]
+        for data, message in cases:
+            status, _, body = await self.client.post_json('/swaig', data)
+            self.assertEqual((status, body), (400, {'error': message}))
+        status, _, _ = await self.client.request('GET', '/swaig')
+        self.assertEqual(status, 405)
+        with self.assertRaises(ValueError):
+            self.app.function("undeclared", lambda args, request: "")
+
+    async def test_handler_errors_are_server_errors(self):
+        def failing(args, request):
+            raise ValueError("bug in the handler")
+
+        self.app.function("transfer", failing)
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': json.dumps(payload("transfer", {})).encode()}
+
+        async def send(message):
+            sent.append(message)
+
+        with self.assertRaisesRegex(ValueError, "bug in the handler"):
+            await self.app({'type': 'http', 'method': 'POST', 'path': '/swaig', 'headers': []}, receive, send)
+        self.assertEqual(sent[0]['status'], 500)
+        self.assertEqual(json.loads(sent[1]['body']), {'error': "Function 'transfer' failed."})
+        self.assertEqual(self.app.active, 0)
+
+    def test_semaphores_dont_keep_loops_alive(self):
+        app = SWAIGApp(build_ai())
+        app.function("transfer", lambda args, request: "ok")
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(app.dispatch(payload("transfer", {})))
+        loop.close()
+        self.assertEqual(len(app._semaphores), 1)
+        del loop
+        gc.collect()
+        self.assertEqual(len(app._semaphores), 0)
+
+    async def test_bounded_concurrency(self):
+        calls = [self.client.post_json('/swaig', payload("get_weather", {'city': f"City {index}"}))
+                 for index in range(1000)]
+        results = await asyncio.gather(*calls)
+        self.assertTrue(all(status == 200 for status, _, _ in results))
+        self.assertEqual(results[999][2]['response'], "Sunny in City 999 for 1 days")
+        self.assertEqual(self.app.peak, 8)
+        self.assertEqual(self.app.active, 0)
+
+    def test_build_response(self):
+        stop = Stop().freeze()
+        self.assertEqual(build_response("ok", stop), {'response': "ok", 'action': [{'stop': True}]})
+        self.assertEqual(build_response("ok"), {'response': "ok"})
+        with self.assertRaises(TypeError):
+            SWAIGApp.to_result(42)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+import yaml
+
+from swml import SignalWireML, Connect, AI, Placeholder
+
+
+class TestSWMLTemplate(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.answer()
+        main_section.add_instruction(Connect(from_number=Placeholder('from_number', default='+10000000000'),
+                                             to_number=Placeholder('to_number')))
+        main_section.ai(prompt=AI.PromptParams(text="You are a helpful assistant.\nBe brief."),
+                        params=AI.AIParams(conversation_id=Placeholder('conversation_id')))
+
+    def build_expected(self, from_number, to_number, conversation_id):
+        expected = SignalWireML()
+        main_section = expected.add_section('main')
+        main_section.answer()
+        main_section.connect(from_number=from_number, to_number=to_number)
+        main_section.ai(prompt=AI.PromptParams(text="You are a helpful assistant.\nBe brief."),
+                        params=AI.AIParams(conversation_id=conversation_id))
+        return expected
+
+    def test_render_json(self):
+        template = self.response.compile()
+        expected = self.build_expected('+10000000000', '+15551234567', 'abc')
+        self.assertEqual(template.render(to_number='+15551234567', conversation_id='abc'), expected.generate_swml())
+
+    def test_render_overrides_default(self):
+        template = self.response.compile()
+        expected = self.build_expected('+19999999999', '+15551234567', 'abc')
+        rendered = template.render(from_number='+19999999999', to_number='+15551234567', conversation_id='abc')
+        self.assertEqual(rendered, expected.generate_swml())
+
+    def test_render_yaml(self):
+        template = self.response.compile('yaml')
+        expected = self.build_expected('+10000000000', '+15551234567', 'line\nbreak é')
+        rendered = template.render(to_number='+15551234567', conversation_id='line\nbreak é')
+        self.assertEqual(yaml.safe_load(rendered), yaml.safe_load(expected.generate_swml('yaml')))
+
+    def test_placeholder_used_twice(self):
+        response = SignalWireML()
+        response.add_section('main').send_sms(to_number=Placeholder('number'), from_number=Placeholder('number'),
+                                              body="hi")
+        template = response.compile()
+        self.assertEqual(template.render(number='+1555'),
+                         '{"sections": {"main": [{"send_sms": {"to_number": "+1555", "from_number": "+1555", '
+                         '"body": "hi"}}]}}')
+
+    def test_missing_and_unknown_placeholders(self):
+        template = self.response.compile()
+        with self.assertRaises(ValueError):
+            template.render(conversation_id='abc')
+        with self.assertRaises(ValueError):
+            template.render(to_number='+1555', conversation_id='abc', unknown='value')
+
+    def test_template_is_independent_of_later_changes(self):
+        template = self.response.compile()
+        self.response.add_section('other').hangup()
+        expected = self.build_expected('+10000000000', '+15551234567', 'abc')
+        self.assertEqual(template.render(to_number='+15551234567', conversation_id='abc'), expected.generate_swml())
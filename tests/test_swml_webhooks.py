@@ -0,0 +1,147 @@
+import http.client
+import json
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from swml import DataMap, DataMapExpression, DataMapExpressionOutput, DataMapWebhook, DataMapWebhookOutput, Say
+from swml.Webhooks import ConnectionPool, ResponseCache, WebhookExecutor
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        parts = urlsplit(self.path)
+        if parts.path == '/weather':
+            city = parse_qs(parts.query)['city'][0]
+            body = json.dumps({'city': city, 'current': {'temp': 21}, 'key': self.headers.get('X-Key')}).encode()
+            status = 200
+        elif parts.path == '/text':
+            body, status = b"not json", 200
+        else:
+            body, status = b"{}", 500
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSWMLWebhooks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+        cls.server.daemon_threads = True
+        cls.server.connections = cls.server.requests = 0
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.connections = self.server.requests = 0
+        self.clock = [0.0]
+        self.executor = WebhookExecutor(cache=ResponseCache(maxsize=2, ttl=10, clock=lambda: self.clock[0]))
+        self.webhook = DataMapWebhook(url=self.base + "/weather?city=${args.city}", headers={'X-Key': "${meta.key}"},
+                                      method="GET", output=DataMapWebhookOutput(
+                                          response="It is ${current.temp} degrees in ${response.city}",
+                                          action=[Say("${args.city} looked up with ${key}")]))
+
+    def tearDown(self):
+        self.executor.close()
+
+    def test_execute(self):
+        output = self.executor.execute(self.webhook, {'city': "New York"}, {'meta': {'key': "secret"}})
+        self.assertIsInstance(output, DataMapWebhookOutput)
+        self.assertEqual(output.serialize(), {'response': "It is 21 degrees in New York",
+                                              'action': [{'say': "New York looked up with secret"}]})
+
+    def test_keep_alive_and_cache(self):
+        for city in ["Tampa", "Paris", "Tampa", "Rome", "Paris"]:
+            self.executor.execute(self.webhook, {'city': city})
+        # Paris was evicted by Rome from the two entry LRU
+        self.assertEqual(self.executor.stats['requests'], 4)
+        self.assertEqual(self.executor.stats['cache_hits'], 1)
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.executor.pool.opened, 1)
+
+        self.clock[0] = 11
+        self.executor.execute(self.webhook, {'city': "Paris"})
+        self.assertEqual(self.executor.stats['requests'], 5)
+
+    def test_cache_key_and_methods(self):
+        for key in ["a", "b", "a"]:
+            output = self.executor.execute(self.webhook, {'city': "Tampa"}, {'meta': {'key': key}})
+            self.assertEqual(output.params['action'], [{'say': f"Tampa looked up with {key}"}])
+        self.assertEqual(self.executor.stats['requests'], 2)
+        self.assertEqual(self.executor.stats['cache_hits'], 1)
+
+        for _ in range(2):
+            self.executor.fetch('POST', self.base + "/weather?city=Oslo")
+        self.assertEqual(self.executor.stats['requests'], 4)
+        executor = WebhookExecutor(cache_methods=['GET', 'post'])
+        with executor:
+            for _ in range(2):
+                executor.fetch('POST', self.base + "/weather?city=Oslo")
+        self.assertEqual(executor.stats['requests'], 1)
+
+    def test_reconnects_after_server_closes(self):
+        self.executor.execute(self.webhook, {'city': "Tampa"})
+        for connections in self.executor.pool._idle.values():
+            for connection in connections:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+        self.executor.execute(self.webhook, {'city': "Oslo"})
+        self.assertEqual(self.executor.pool.opened, 2)
+
+        # a POST may have been received, it isn't sent again
+        for connections in self.executor.pool._idle.values():
+            for connection in connections:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+        with self.assertRaises((http.client.HTTPException, OSError)):
+            self.executor.fetch('POST', self.base + "/weather?city=Oslo")
+        self.assertEqual(self.executor.pool.opened, 2)
+
+    def test_errors(self):
+        with self.assertRaises(ConnectionError) as context:
+            self.executor.fetch('GET', self.base + "/missing")
+        self.assertEqual(str(context.exception), f"Webhook GET {self.base}/missing returned status 500.")
+        with self.assertRaises(ConnectionError):
+            self.executor.fetch('GET', self.base + "/text")
+        with self.assertRaises(ValueError):
+            self.executor.fetch('GET', "ftp://example.com")
+
+    def test_evaluate_falls_back_to_webhooks(self):
+        data_map = DataMap(
+            expressions=[DataMapExpression(string="${args.city}", pattern="^Home$",
+                                           output=DataMapExpressionOutput(response="You are home"))],
+            webhooks=[DataMapWebhook(url=self.base + "/missing", headers={}, method="POST",
+                                     output=DataMapWebhookOutput(response="never")), self.webhook])
+        self.assertEqual(self.executor.evaluate(data_map, {'city': "Home"}).params['response'], "You are home")
+        self.assertEqual(self.executor.evaluate(data_map, {'city': "Lima"}).params['response'],
+                         "It is 21 degrees in Lima")
+        closed = WebhookExecutor(pool=ConnectionPool(timeout=1))
+        data_map = DataMap(webhooks=[DataMapWebhook(url="http://127.0.0.1:9/", headers={}, method="GET",
+                                                    output=DataMapWebhookOutput(response="never"))])
+        self.assertIsNone(closed.evaluate(data_map, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
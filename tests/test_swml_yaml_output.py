@@ -0,0 +1,58 @@
+import unittest
+from unittest import mock
+
+from swml import SignalWireML, AI
+from swml import Encoders
+
+
+class TestSWMLYamlOutput(unittest.TestCase):
+    def setUp(self):
+        self.response = SignalWireML()
+        main_section = self.response.add_section('main')
+        main_section.answer()
+        main_section.ai(prompt=AI.PromptParams(text="You are a helpful assistant.\nKeep it short.\n" * 10),
+                        hints=["one", "two"])
+        main_section.play(url="say:" + "a long sentence that needs to be wrapped " * 4)
+
+    def pure_python(self, data_format='yaml'):
+        with mock.patch.object(Encoders, 'CustomCDumper', None):
+            self.response._sections['main']._invalidate_cache()
+            return self.response.generate_swml(data_format)
+
+    @unittest.skipIf(Encoders.CustomCDumper is None, "PyYAML was built without libyaml")
+    def test_libyaml_matches_pure_python(self):
+        accelerated = self.response.generate_swml('yaml')
+        self.assertEqual(accelerated, self.pure_python())
+        self.assertIn("text: |\n", accelerated)
+
+    def test_escaped_strings_match_pure_python(self):
+        self.response.add_section('other').play(url="say:café \t " * 20)
+        self.assertEqual(self.response.generate_swml('yaml'), self.pure_python())
+
+    def test_trailing_newlines_match_pure_python(self):
+        self.response.add_section('other').play(url="say:done\n\n")
+        self.response.add_section('last').hangup()
+        self.assertEqual(self.response.generate_swml('yaml'), self.pure_python())
+
+    def test_block_literals_match_pure_python(self):
+        for index, text in enumerate(("\n", "a\n", "a\nb\n", "a\n\n", "a\nb\n\n\n")):
+            self.response.add_section(f'other{index}').play(url=text)
+            self.assertEqual(self.response.generate_swml('yaml'), self.pure_python())
+
+    def test_keys_match_pure_python(self):
+        self.response.add_section('other').add_instruction({"set": {"variables": {"": 1, "k" * 100: 2}}})
+        self.assertEqual(self.response.generate_swml('yaml'), self.pure_python())
+
+    @unittest.skipIf(Encoders.CustomCDumper is None, "PyYAML was built without libyaml")
+    def test_dumped_once(self):
+        data = {"pattern": "^\\d+$", "text": "a\nb"}
+        with mock.patch.object(Encoders.yaml, 'dump', wraps=Encoders.yaml.dump) as dump:
+            Encoders.dump_yaml(data)
+            Encoders.dump_yaml({"url": "say:café"})
+            Encoders.dump_yaml({"text": "a\nb\n"})
+            Encoders.dump_yaml({"text": "a\nb\n\n"})
+        self.assertEqual([call.kwargs['Dumper'] for call in dump.call_args_list],
+                         [Encoders.CustomCDumper, Encoders.CustomDumper, Encoders.CustomCDumper, Encoders.CustomDumper])
+
+    def test_fallback_without_libyaml(self):
+        self.assertTrue(self.pure_python().startswith("sections:\n  main:\n  - answer\n"))